@@ -1,10 +1,22 @@
 from fastapi import (
     APIRouter,
+    Query,
+    Request,
     status,
     UploadFile
 )
-from typing import List
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from typing import List, Literal, Optional
 from .main_engine import Detect, DownLoad_JSON
+from .jobs import job_manager
+from .streams import stream_manager
+from .triage import triage_files
+from .events import detection_stream
+from .cache import result_cache
+from .metrics import metrics
+from .index import result_index
+from .subgraph import subgraph_service
+from .reports import NDJSON_MEDIA, result_lines
 
 route = APIRouter(tags=["input"])
 
@@ -12,14 +24,23 @@ route = APIRouter(tags=["input"])
     "/input/files",
     status_code=status.HTTP_200_OK
 )
-async def get_files(files: List[UploadFile]):
+async def get_files(files: List[UploadFile], format: Literal["json", "ndjson"] = "json"):
     detect = Detect()
 
     out_dict = await detect.handle_files(files=files)
 
     report = await detect.run_detction_pipeline(input_dict=out_dict)
+    if format == "ndjson":
+        return StreamingResponse(result_lines(report), media_type=NDJSON_MEDIA)
     return report
 
+@route.post(
+    "/input/files/events",
+    status_code=status.HTTP_200_OK
+)
+async def get_files_events(files: List[UploadFile]):
+    return await detection_stream.open(files=files)
+
 @route.get(
     "/show/output/files",
     status_code=status.HTTP_200_OK
@@ -35,8 +56,199 @@ async def show_file():
     "/download/{file_name}",
     status_code=status.HTTP_200_OK
 )
-async def download_file(file_name: str):
+async def download_file(
+    file_name: str,
+    request: Request,
+    offset: int = 0,
+    limit: Optional[int] = None,
+):
     json_out_handler = DownLoad_JSON()
 
-    return await json_out_handler.download_file(file_name=file_name)
+    return await json_out_handler.download_file(
+        file_name=file_name,
+        accept_encoding=request.headers.get("accept-encoding"),
+        offset=offset,
+        limit=limit,
+    )
+
+
+
+job_route = APIRouter(tags=["jobs"])
+
+@job_route.post(
+    "/jobs/files",
+    status_code=status.HTTP_202_ACCEPTED
+)
+async def submit_job(files: List[UploadFile]):
+    return await job_manager.submit(files=files)
+
+@job_route.get(
+    "/jobs",
+    status_code=status.HTTP_200_OK
+)
+async def list_jobs():
+    return job_manager.list_jobs()
+
+@job_route.get(
+    "/jobs/{job_id}",
+    status_code=status.HTTP_200_OK
+)
+async def job_status(job_id: str):
+    return job_manager.status(job_id=job_id)
+
+@job_route.get(
+    "/jobs/{job_id}/result",
+    status_code=status.HTTP_200_OK
+)
+async def job_result(job_id: str, format: Literal["json", "ndjson"] = "json"):
+    result = job_manager.result(job_id=job_id)
+    if format == "ndjson":
+        return StreamingResponse(result_lines(result), media_type=NDJSON_MEDIA)
+    return result
+
+
+
+stream_route = APIRouter(tags=["streams"])
+
+@stream_route.post(
+    "/streams/{stream_id}/transactions",
+    status_code=status.HTTP_200_OK
+)
+async def append_transactions(stream_id: str, files: List[UploadFile]):
+    return await stream_manager.append(stream_id=stream_id, files=files)
+
+@stream_route.get(
+    "/streams",
+    status_code=status.HTTP_200_OK
+)
+async def list_streams():
+    return stream_manager.list_streams()
+
+@stream_route.get(
+    "/streams/{stream_id}/report",
+    status_code=status.HTTP_200_OK
+)
+async def stream_report(stream_id: str):
+    return await stream_manager.report(stream_id=stream_id)
+
+@stream_route.delete(
+    "/streams/{stream_id}",
+    status_code=status.HTTP_200_OK
+)
+async def drop_stream(stream_id: str):
+    return stream_manager.drop(stream_id=stream_id)
+
+
+
+cache_route = APIRouter(tags=["cache"])
+
+@cache_route.get(
+    "/cache/stats",
+    status_code=status.HTTP_200_OK
+)
+async def cache_stats():
+    return result_cache.stats()
+
+@cache_route.delete(
+    "/cache",
+    status_code=status.HTTP_200_OK
+)
+async def clear_cache():
+    return result_cache.clear()
+
+
+
+metrics_route = APIRouter(tags=["metrics"])
+
+@metrics_route.get(
+    "/metrics",
+    status_code=status.HTTP_200_OK,
+    response_class=PlainTextResponse
+)
+async def get_metrics():
+    return PlainTextResponse(
+        metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
+
+query_route = APIRouter(tags=["query"])
+
+@query_route.get(
+    "/query/analyses",
+    status_code=status.HTTP_200_OK
+)
+def list_analyses():
+    return result_index.analyses()
+
+@query_route.post(
+    "/query/sync",
+    status_code=status.HTTP_200_OK
+)
+def sync_index():
+    return result_index.sync()
+
+@query_route.get(
+    "/query/analyses/{analysis_id}/accounts",
+    status_code=status.HTTP_200_OK
+)
+def top_accounts(
+    analysis_id: int,
+    limit: int = Query(50, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    risk_level: Optional[Literal["HIGH", "MED", "LOW"]] = None,
+    min_score: Optional[float] = None,
+):
+    return result_index.top_accounts(
+        analysis_id=analysis_id, limit=limit, cursor=cursor,
+        risk_level=risk_level, min_score=min_score,
+    )
+
+@query_route.get(
+    "/query/analyses/{analysis_id}/rings",
+    status_code=status.HTTP_200_OK
+)
+def list_rings(analysis_id: int, limit: int = Query(50, ge=1, le=1000), cursor: Optional[str] = None):
+    return result_index.rings(analysis_id=analysis_id, limit=limit, cursor=cursor)
 
+@query_route.get(
+    "/query/analyses/{analysis_id}/rings/{ring_id}",
+    status_code=status.HTTP_200_OK
+)
+def ring_members(analysis_id: int, ring_id: str):
+    return result_index.ring(analysis_id=analysis_id, ring_id=ring_id)
+
+@query_route.get(
+    "/query/analyses/{analysis_id}/subgraph",
+    status_code=status.HTTP_200_OK
+)
+def subgraph(
+    analysis_id: int,
+    ring_id: Optional[str] = None,
+    account_id: Optional[str] = None,
+    hops: int = Query(1, ge=0, le=3),
+    max_nodes: int = Query(300, ge=10, le=5000),
+    max_edges: int = Query(1000, ge=10, le=20000),
+):
+    return subgraph_service.subgraph(
+        analysis_id=analysis_id, ring_id=ring_id, account_id=account_id,
+        hops=hops, max_nodes=max_nodes, max_edges=max_edges,
+    )
+
+@query_route.get(
+    "/query/accounts/{account_id}",
+    status_code=status.HTTP_200_OK
+)
+def account_lookup(account_id: str):
+    return result_index.account(account_id=account_id)
+
+
+
+triage_route = APIRouter(tags=["triage"])
+
+@triage_route.post(
+    "/triage/files",
+    status_code=status.HTTP_200_OK
+)
+async def triage(files: List[UploadFile], exact: bool = True):
+    return await triage_files(files=files, exact=exact)
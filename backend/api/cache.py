@@ -0,0 +1,138 @@
+import os
+import json
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from graphs.engine import MainEngine
+
+
+CACHE_DIR       = os.getenv("DETECT_CACHE_DIR", "cache/")
+CACHE_MAX_BYTES = int(float(os.getenv("DETECT_CACHE_MAX_MB", "256")) * 1024 * 1024)
+
+# Bump when the shape of a stored result changes
+CACHE_FORMAT = 7
+
+
+def engine_fingerprint() -> str:
+    """Hash of everything besides the file content that shapes a report."""
+    params = {"format": CACHE_FORMAT, "engine": MainEngine.parameters()}
+    blob   = json.dumps(params, sort_keys=True, default=str).encode()
+    return hashlib.sha256(blob).hexdigest()[:16]
+
+
+class ResultCache:
+    """
+    Analysis results on disk, keyed by content digest + engine
+    fingerprint, evicted least-recently-used once the stored JSON
+    exceeds `max_bytes`. Recency survives restarts through file mtimes.
+    """
+
+    def __init__(self, directory: str = CACHE_DIR, max_bytes: int = CACHE_MAX_BYTES) -> None:
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits      = 0
+        self.misses    = 0
+        self.evictions = 0
+
+        self._lock    = threading.Lock()
+        self._entries: OrderedDict[str, int] = OrderedDict()      # key -> bytes, LRU first
+        self._bytes   = 0
+        self._load()
+
+    def _load(self) -> None:
+        if not os.path.isdir(self.directory):
+            return
+        found = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".json"):
+                st = os.stat(os.path.join(self.directory, name))
+                found.append((st.st_mtime, name[:-5], st.st_size))
+        for _, key, size in sorted(found):
+            self._entries[key] = size
+            self._bytes       += size
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    @staticmethod
+    def key(digest: str) -> str:
+        return f"{digest}-{engine_fingerprint()}"
+
+    def get(self, key: str) -> Optional[dict]:
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                value = json.load(f)
+            os.utime(self._path(key))
+        except (OSError, ValueError):
+            # Removed or half-written behind our back: treat as a miss
+            with self._lock:
+                self._drop(key)
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return value
+
+    def put(self, key: str, value: dict) -> None:
+        blob = json.dumps(value, default=str).encode("utf-8")
+        if len(blob) > self.max_bytes:
+            return
+
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(blob)
+        os.replace(tmp, self._path(key))
+
+        with self._lock:
+            self._drop(key)
+            self._entries[key] = len(blob)
+            self._bytes       += len(blob)
+            while self._bytes > self.max_bytes and len(self._entries) > 1:
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+                self.evictions += 1
+                try:
+                    os.remove(self._path(oldest))
+                except OSError:
+                    pass
+
+    def _drop(self, key: str) -> None:
+        size = self._entries.pop(key, None)
+        if size is not None:
+            self._bytes -= size
+
+    def clear(self) -> dict:
+        with self._lock:
+            keys = list(self._entries)
+            for key in keys:
+                self._drop(key)
+                try:
+                    os.remove(self._path(key))
+                except OSError:
+                    pass
+        return {"cleared": len(keys)}
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries":   len(self._entries),
+                "bytes":     self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits":      self.hits,
+                "misses":    self.misses,
+                "evictions": self.evictions,
+                "hit_rate":  round(self.hits / lookups, 4) if lookups else None,
+            }
+
+
+result_cache = ResultCache()
@@ -0,0 +1,201 @@
+import os
+import json
+import time
+import queue
+import asyncio
+from typing import List
+
+from fastapi import UploadFile
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+
+from graphs.profiling import StageProfile
+from .ingest import spool_uploads, remove_spooled, load_graph
+from .jobs import PIPELINE_STAGES
+from .main_engine import analyze_graph, cached_result, store_result, index_result, _strip_suffix
+from .workers import MAX_CONCURRENCY, run_limited, get_manager
+from .metrics import metrics
+
+
+SSE_MEDIA = "text/event-stream"
+
+# How long the stream waits on the event queue per poll, and the longest
+# silence before a keep-alive comment (proxies drop idle connections)
+POLL_SECONDS      = 0.25
+KEEPALIVE_SECONDS = 15.0
+
+
+def sse(event: str, data: dict) -> bytes:
+    """One server-sent event with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n".encode()
+
+
+def analyze_streamed(
+    filename: str,
+    path: str,
+    output_path: str,
+    events,
+    digest: str | None = None,
+    profile: StageProfile | None = None,
+) -> dict:
+    """
+    Worker-process entry point: parse and analyze one spooled file,
+    putting an event on the shared `events` queue as every stage
+    finishes, with the partial results run_full_pipeline has by then.
+    """
+    done:    list[str] = []
+    partial: dict      = {}
+
+    def on_partial(stage: str, data: dict) -> None:
+        partial[stage] = data
+
+    def on_stage(stage: str) -> None:
+        done.append(stage)
+        event = {
+            "file":        filename,
+            "stage":       stage,
+            "stages_done": list(done),
+            "percent":     round(100.0 * len(done) / len(PIPELINE_STAGES), 1),
+        }
+        if stage in partial:
+            event["partial"] = partial.pop(stage)
+        events.put(event)
+
+    profile = profile if profile is not None else StageProfile()
+    graph   = load_graph(path, digest, profile)
+    on_stage("parsed")
+    on_partial("graph_built", {"accounts": graph.n_accounts, "transactions": len(graph.src)})
+    on_stage("graph_built")
+    result = analyze_graph(
+        filename, graph, output_path,
+        on_stage=on_stage, digest=digest, profile=profile, on_partial=on_partial,
+    )
+    on_stage("saved")
+
+    return result
+
+
+class DetectionStream:
+    """
+    Server-sent-event variant of POST /input/files: the uploads are
+    spooled up front, then every file is analyzed in the process pool
+    (at most DETECT_MAX_CONCURRENCY of them at once) while its stages
+    ("stage" events with partial results), its result ("result" or
+    "error") and finally a "done" event are streamed back. A "result"
+    carries the summary and where the report is, not the report itself:
+    clients page through it with /download or /query.
+    """
+
+    def __init__(self, output_path: str = "output/") -> None:
+        self.output_path = output_path
+
+    async def open(self, files: List[UploadFile]) -> StreamingResponse:
+        uploads, digests, profiles = await spool_uploads(files)
+
+        if not os.path.exists(self.output_path):
+            os.makedirs(self.output_path)
+
+        return StreamingResponse(
+            self._events(uploads, digests, profiles),
+            media_type=SSE_MEDIA,
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    async def _events(
+        self,
+        uploads:  dict[str, str],
+        digests:  dict[str, str],
+        profiles: dict[str, StageProfile],
+    ):
+        start   = time.perf_counter()
+        events  = get_manager().Queue()
+        limit   = asyncio.Semaphore(MAX_CONCURRENCY)
+        tasks:  dict[asyncio.Task, str] = {}
+        failed: list[str] = []
+        try:
+            yield sse("start", {"files": list(uploads), "stages": list(PIPELINE_STAGES)})
+
+            for filename, path in uploads.items():
+                t0  = time.perf_counter()
+                hit = await run_in_threadpool(
+                    cached_result, filename, digests[filename], self.output_path
+                )
+                if hit is not None:
+                    hit["elapsed_seconds"] = round(time.perf_counter() - t0, 4)
+                    yield await self._result(filename, digests[filename], hit, fresh=False)
+                    continue
+
+                # One pool task per file, so results come back as each
+                # finishes; all of them share the stream's concurrency limit
+                task = asyncio.create_task(run_limited(
+                    limit, analyze_streamed, filename, path, self.output_path,
+                    events, digests[filename], profiles[filename]
+                ))
+                tasks[task] = filename
+
+            quiet = time.monotonic()
+            while tasks:
+                try:
+                    event = await run_in_threadpool(events.get, True, POLL_SECONDS)
+                    yield sse("stage", event)
+                    quiet = time.monotonic()
+                    continue
+                except queue.Empty:
+                    pass
+
+                for task in [t for t in tasks if t.done()]:
+                    filename = tasks.pop(task)
+                    # Its stage events were all queued before it returned
+                    while True:
+                        try:
+                            yield sse("stage", events.get_nowait())
+                        except queue.Empty:
+                            break
+                    result = task.result()
+                    if "error" in result:
+                        failed.append(filename)
+                    yield await self._result(filename, digests[filename], result, fresh=True)
+                    quiet = time.monotonic()
+
+                if time.monotonic() - quiet >= KEEPALIVE_SECONDS:
+                    yield b": keep-alive\n\n"
+                    quiet = time.monotonic()
+
+            yield sse("done", {
+                "files":           len(uploads),
+                "failed_files":    failed,
+                "elapsed_seconds": round(time.perf_counter() - start, 3),
+            })
+
+        finally:
+            # A client that went away leaves its files running in the
+            # pool: their spooled copies go once they are done
+            for task, filename in tasks.items():
+                task.add_done_callback(
+                    lambda _, path=uploads[filename]: remove_spooled([path])
+                )
+            remove_spooled(
+                path for filename, path in uploads.items() if filename not in tasks.values()
+            )
+
+    async def _result(self, filename: str, digest: str, result: dict, fresh: bool) -> bytes:
+        """The "result" / "error" event of one file, once it is stored and indexed."""
+        metrics.observe_result(result, source="events")
+        if "error" in result:
+            return sse("error", {"file": filename, **result})
+
+        if fresh:
+            await run_in_threadpool(store_result, digest, result)
+        await run_in_threadpool(index_result, filename, digest, result)
+        return sse("result", {
+            "file":            filename,
+            "summary":         result["report"]["summary"],
+            "saved_to":        result["saved_to"],
+            "download_url":    f"/download/{_strip_suffix(os.path.basename(result['saved_to']))}",
+            "analysis_id":     result.get("analysis_id"),
+            "cached":          bool(result.get("cached")),
+            "elapsed_seconds": result.get("elapsed_seconds"),
+        })
+
+
+detection_stream = DetectionStream()
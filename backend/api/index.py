@@ -0,0 +1,373 @@
+import os
+import json
+import time
+import base64
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+from fastapi import HTTPException, status
+
+from .reports import REPORT_SUFFIX, LEGACY_SUFFIX, read_records, report_records
+
+
+INDEX_PATH  = os.getenv("DETECT_INDEX_PATH", "index/results.sqlite3")
+OUTPUT_DIR  = "output/"
+BATCH_ROWS  = 10_000
+MAX_LIMIT   = 1_000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS analyses (
+    analysis_id         INTEGER PRIMARY KEY,
+    report_path         TEXT NOT NULL UNIQUE,
+    report_mtime        REAL NOT NULL,
+    file_name           TEXT NOT NULL,
+    digest              TEXT,
+    accounts_analyzed   INTEGER,
+    suspicious_accounts INTEGER,
+    fraud_rings         INTEGER,
+    indexed_at          REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS accounts (
+    analysis_id INTEGER NOT NULL REFERENCES analyses ON DELETE CASCADE,
+    account_id  TEXT NOT NULL,
+    score       REAL NOT NULL,
+    risk_level  TEXT NOT NULL,
+    ring_id     TEXT,
+    patterns    TEXT NOT NULL,
+    reasons     TEXT NOT NULL,
+    PRIMARY KEY (analysis_id, account_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS accounts_by_score   ON accounts (analysis_id, score DESC, account_id);
+CREATE INDEX IF NOT EXISTS accounts_by_risk    ON accounts (analysis_id, risk_level, score DESC, account_id);
+CREATE INDEX IF NOT EXISTS accounts_by_account ON accounts (account_id);
+CREATE TABLE IF NOT EXISTS rings (
+    analysis_id  INTEGER NOT NULL REFERENCES analyses ON DELETE CASCADE,
+    ring_id      TEXT NOT NULL,
+    pattern_type TEXT NOT NULL,
+    risk_score   REAL NOT NULL,
+    member_count INTEGER NOT NULL,
+    PRIMARY KEY (analysis_id, ring_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS rings_by_risk ON rings (analysis_id, risk_score DESC, ring_id);
+CREATE TABLE IF NOT EXISTS ring_members (
+    analysis_id INTEGER NOT NULL REFERENCES analyses ON DELETE CASCADE,
+    ring_id     TEXT NOT NULL,
+    position    INTEGER NOT NULL,
+    account_id  TEXT NOT NULL,
+    PRIMARY KEY (analysis_id, ring_id, position)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS ring_members_by_account ON ring_members (account_id);
+"""
+
+
+def _encode_cursor(*key) -> str:
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> tuple[float, str]:
+    """(sort value, id) of the last item of the previous page."""
+    try:
+        value, key = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return float(value), str(key)
+    except (ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+
+def _page(rows: list, limit: int, key) -> dict:
+    """First `limit` rows, plus the cursor of the next page if there is one."""
+    more = len(rows) > limit
+    rows = rows[:limit]
+    return {"items": rows, "next_cursor": _encode_cursor(*key(rows[-1])) if more else None}
+
+
+def _account(row: sqlite3.Row) -> dict:
+    return {
+        "analysis_id":       row["analysis_id"],
+        "account_id":        row["account_id"],
+        "suspicion_score":   row["score"],
+        "risk_level":        row["risk_level"],
+        "ring_id":           row["ring_id"],
+        "detected_patterns": json.loads(row["patterns"]),
+        "reasons":           json.loads(row["reasons"]),
+    }
+
+
+class ResultIndex:
+    """
+    Saved analysis reports loaded into SQLite, so single accounts, rings
+    and top-scoring pages can be looked up without sending whole reports.
+    Reports are streamed in from their NDJSON files (indexed when saved,
+    and on first use for reports already on disk); every read opens its
+    own connection, writes are serialized by a lock.
+    """
+
+    def __init__(self, path: str = INDEX_PATH, output_dir: str = OUTPUT_DIR) -> None:
+        self.path       = path
+        self.output_dir = output_dir
+        self._lock      = threading.Lock()
+        self._synced    = False
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        db = sqlite3.connect(self.path, timeout=30)
+        try:
+            db.row_factory = sqlite3.Row
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA foreign_keys=ON")
+            yield db
+        finally:
+            db.close()
+
+    # ─────────────────────────────────────────────────────────────────
+    # Loading
+    # ─────────────────────────────────────────────────────────────────
+    @staticmethod
+    def _records(report_path: str) -> Iterator[dict]:
+        if report_path.endswith(LEGACY_SUFFIX):
+            with open(report_path, "r", encoding="utf-8") as f:
+                yield from report_records(json.load(f))
+        else:
+            yield from read_records(report_path)
+
+    def add(self, report_path: str, file_name: str, digest: Optional[str] = None) -> int:
+        """
+        Index one saved report (replacing what was indexed from an older
+        version of the same file). Returns its analysis_id.
+        """
+        mtime = os.path.getmtime(report_path)
+        with self._lock, self._connect() as db:
+            db.executescript(_SCHEMA)
+            row = db.execute(
+                "SELECT analysis_id, report_mtime FROM analyses WHERE report_path = ?", (report_path,)
+            ).fetchone()
+            if row is not None and row["report_mtime"] == mtime:
+                return row["analysis_id"]
+
+            with db:
+                if row is not None:
+                    db.execute("DELETE FROM analyses WHERE analysis_id = ?", (row["analysis_id"],))
+                analysis_id = db.execute(
+                    "INSERT INTO analyses (report_path, report_mtime, file_name, digest, indexed_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (report_path, mtime, file_name, digest, time.time()),
+                ).lastrowid
+                self._load(db, analysis_id, self._records(report_path))
+            return analysis_id
+
+    @staticmethod
+    def _load(db: sqlite3.Connection, analysis_id: int, records: Iterator[dict]) -> None:
+        accounts, rings, members = [], [], []
+
+        def flush() -> None:
+            db.executemany("INSERT OR REPLACE INTO accounts VALUES (?, ?, ?, ?, ?, ?, ?)", accounts)
+            db.executemany("INSERT OR REPLACE INTO rings VALUES (?, ?, ?, ?, ?)", rings)
+            db.executemany("INSERT OR REPLACE INTO ring_members VALUES (?, ?, ?, ?)", members)
+            accounts.clear(); rings.clear(); members.clear()
+
+        for rec in records:
+            kind = rec.get("record")
+            if kind == "header":
+                summary = rec.get("summary", {})
+                db.execute(
+                    "UPDATE analyses SET accounts_analyzed = ?, suspicious_accounts = ?, fraud_rings = ? "
+                    "WHERE analysis_id = ?",
+                    (
+                        summary.get("total_accounts_analyzed"),
+                        summary.get("suspicious_accounts_flagged"),
+                        summary.get("fraud_rings_detected"),
+                        analysis_id,
+                    ),
+                )
+            elif kind == "account":
+                accounts.append((
+                    analysis_id, str(rec["account_id"]), rec["suspicion_score"], rec["risk_level"],
+                    rec.get("ring_id"), json.dumps(rec.get("detected_patterns", [])),
+                    json.dumps(rec.get("reasons", [])),
+                ))
+            elif kind == "ring":
+                rings.append((
+                    analysis_id, rec["ring_id"], rec["pattern_type"], rec["risk_score"],
+                    len(rec["member_accounts"]),
+                ))
+                members.extend(
+                    (analysis_id, rec["ring_id"], i, str(a)) for i, a in enumerate(rec["member_accounts"])
+                )
+            if len(accounts) + len(members) >= BATCH_ROWS:
+                flush()
+        flush()
+
+    def sync(self) -> dict:
+        """Index report files in the output directory that are new or changed; forget removed ones."""
+        found = {}
+        if os.path.isdir(self.output_dir):
+            for name in os.listdir(self.output_dir):
+                if name.endswith(REPORT_SUFFIX) or name.endswith(LEGACY_SUFFIX):
+                    found[os.path.join(self.output_dir, name)] = name
+
+        with self._lock, self._connect() as db:
+            db.executescript(_SCHEMA)
+            known = {r["report_path"]: r["analysis_id"] for r in db.execute("SELECT report_path, analysis_id FROM analyses")}
+            gone  = [(known[p],) for p in known if p not in found and p.startswith(self.output_dir)]
+            with db:
+                db.executemany("DELETE FROM analyses WHERE analysis_id = ?", gone)
+
+        added = 0
+        for path, name in sorted(found.items()):
+            stem = name[: -len(REPORT_SUFFIX)] if name.endswith(REPORT_SUFFIX) else name[: -len(LEGACY_SUFFIX)]
+            try:
+                self.add(path, file_name=stem)
+                added += 1
+            except (OSError, ValueError, KeyError, sqlite3.Error) as e:
+                print(f"[!] Could not index '{path}': {e}")
+        self._synced = True
+        return {"reports": added, "removed": len(gone)}
+
+    def _ready(self) -> None:
+        if not self._synced:
+            self.sync()
+
+    # ─────────────────────────────────────────────────────────────────
+    # Queries
+    # ─────────────────────────────────────────────────────────────────
+    def analyses(self) -> dict:
+        self._ready()
+        with self._connect() as db:
+            rows = db.execute(
+                "SELECT analysis_id, file_name, digest, report_path, accounts_analyzed, "
+                "suspicious_accounts, fraud_rings, indexed_at FROM analyses ORDER BY analysis_id DESC"
+            ).fetchall()
+        return {"analyses": [dict(r) for r in rows]}
+
+    def _analysis(self, db: sqlite3.Connection, analysis_id: int) -> None:
+        if db.execute("SELECT 1 FROM analyses WHERE analysis_id = ?", (analysis_id,)).fetchone() is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Analysis '{analysis_id}' not found"
+            )
+
+    def top_accounts(
+        self,
+        analysis_id: int,
+        limit:       int = 50,
+        cursor:      Optional[str] = None,
+        risk_level:  Optional[str] = None,
+        min_score:   Optional[float] = None,
+    ) -> dict:
+        """Suspicious accounts of one analysis by descending score, a page at a time."""
+        self._ready()
+        limit = max(1, min(limit, MAX_LIMIT))
+        where, args = ["analysis_id = ?"], [analysis_id]
+        if risk_level is not None:
+            where.append("risk_level = ?")
+            args.append(risk_level.upper())
+        if min_score is not None:
+            where.append("score >= ?")
+            args.append(min_score)
+        if cursor is not None:
+            score, account_id = _decode_cursor(cursor)
+            where.append("(score < ? OR (score = ? AND account_id > ?))")
+            args += [score, score, account_id]
+
+        with self._connect() as db:
+            self._analysis(db, analysis_id)
+            rows = db.execute(
+                f"SELECT * FROM accounts WHERE {' AND '.join(where)} "
+                "ORDER BY score DESC, account_id LIMIT ?",
+                (*args, limit + 1),
+            ).fetchall()
+        page = _page([_account(r) for r in rows], limit, lambda a: (a["suspicion_score"], a["account_id"]))
+        return {"analysis_id": analysis_id, **page}
+
+    def rings(self, analysis_id: int, limit: int = 50, cursor: Optional[str] = None) -> dict:
+        """Fraud rings of one analysis by descending risk, a page at a time."""
+        self._ready()
+        limit = max(1, min(limit, MAX_LIMIT))
+        where, args = "analysis_id = ?", [analysis_id]
+        if cursor is not None:
+            risk, ring_id = _decode_cursor(cursor)
+            where += " AND (risk_score < ? OR (risk_score = ? AND ring_id > ?))"
+            args  += [risk, risk, ring_id]
+
+        with self._connect() as db:
+            self._analysis(db, analysis_id)
+            rows = db.execute(
+                f"SELECT ring_id, pattern_type, risk_score, member_count FROM rings WHERE {where} "
+                "ORDER BY risk_score DESC, ring_id LIMIT ?",
+                (*args, limit + 1),
+            ).fetchall()
+        page = _page([dict(r) for r in rows], limit, lambda r: (r["risk_score"], r["ring_id"]))
+        return {"analysis_id": analysis_id, **page}
+
+    def ring(self, analysis_id: int, ring_id: str) -> dict:
+        """One ring with its members (scores for those flagged as suspicious)."""
+        self._ready()
+        with self._connect() as db:
+            ring = db.execute(
+                "SELECT ring_id, pattern_type, risk_score, member_count FROM rings "
+                "WHERE analysis_id = ? AND ring_id = ?",
+                (analysis_id, ring_id),
+            ).fetchone()
+            if ring is None:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail=f"Ring '{ring_id}' not found in analysis '{analysis_id}'"
+                )
+            members = db.execute(
+                "SELECT m.account_id, a.score, a.risk_level FROM ring_members m "
+                "LEFT JOIN accounts a ON a.analysis_id = m.analysis_id AND a.account_id = m.account_id "
+                "WHERE m.analysis_id = ? AND m.ring_id = ? ORDER BY m.position",
+                (analysis_id, ring_id),
+            ).fetchall()
+        return {
+            "analysis_id": analysis_id,
+            **dict(ring),
+            "members": [
+                {"account_id": m["account_id"], "suspicion_score": m["score"], "risk_level": m["risk_level"]}
+                for m in members
+            ],
+        }
+
+    def analysis(self, analysis_id: int) -> dict:
+        """The analyses row of one analysis (digest included)."""
+        self._ready()
+        with self._connect() as db:
+            self._analysis(db, analysis_id)
+            row = db.execute("SELECT * FROM analyses WHERE analysis_id = ?", (analysis_id,)).fetchone()
+        return dict(row)
+
+    def flagged(self, analysis_id: int) -> list[dict]:
+        """account_id, score, risk_level and ring_id of every flagged account of an analysis."""
+        self._ready()
+        with self._connect() as db:
+            self._analysis(db, analysis_id)
+            rows = db.execute(
+                "SELECT account_id, score, risk_level, ring_id FROM accounts WHERE analysis_id = ?",
+                (analysis_id,),
+            ).fetchall()
+        return [dict(r) for r in rows]
+
+    def account(self, account_id: str) -> dict:
+        """Every analysis an account was flagged in or is a ring member of."""
+        self._ready()
+        with self._connect() as db:
+            flagged = db.execute(
+                "SELECT * FROM accounts WHERE account_id = ? ORDER BY analysis_id DESC", (account_id,)
+            ).fetchall()
+            rings = db.execute(
+                "SELECT analysis_id, ring_id FROM ring_members WHERE account_id = ? ORDER BY analysis_id DESC",
+                (account_id,),
+            ).fetchall()
+        return {
+            "account_id": account_id,
+            "flagged":    [_account(r) for r in flagged],
+            "rings":      [dict(r) for r in rings],
+        }
+
+
+result_index = ResultIndex()
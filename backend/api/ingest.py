@@ -0,0 +1,291 @@
+import os
+import csv
+import shutil
+import hashlib
+import weakref
+import tempfile
+from typing import List
+
+import pandas as pd
+from fastapi import HTTPException, UploadFile, status
+
+from graphs.build_graph import Graph
+from graphs.snapshot import is_snapshot
+from graphs.profiling import StageProfile
+from graphs.outofcore import build_snapshot, chunk_rows
+
+from .workers import MEMORY_LIMIT_MB
+
+
+SPOOL_CHUNK_BYTES = 1024 * 1024        # upload → disk copy size
+SNIFF_BYTES       = 64 * 1024          # head of the file used for sniffing
+CSV_CHUNK_ROWS    = 250_000            # rows parsed per read_csv chunk
+DELIMITERS        = ",;\t|"
+
+# Parsed graphs kept as memory-mapped snapshots, keyed by content digest
+# (an empty DETECT_SNAPSHOT_DIR turns this off)
+SNAPSHOT_DIR  = os.getenv("DETECT_SNAPSHOT_DIR", "snapshots/")
+SNAPSHOT_KEEP = int(os.getenv("DETECT_SNAPSHOT_KEEP", "20"))
+
+# Files of at least OUT_OF_CORE_MB (0 = never by size), or whose in-memory
+# build would not fit under DETECT_MEMORY_LIMIT_MB, are built out of core:
+# parsed in chunks and sorted / merged on disk into a snapshot
+OUT_OF_CORE_MB   = int(os.getenv("DETECT_OUT_OF_CORE_MB", "2048"))
+OUT_OF_CORE_BUDGET_MB = MEMORY_LIMIT_MB // 2 or 1024   # rest: interpreter, libraries, accounts
+IN_MEMORY_FACTOR = 12                  # peak RSS of an in-memory build per CSV byte
+SPILL_DIR        = os.getenv("DETECT_SPILL_DIR") or None    # None: system temp dir
+
+
+async def spool_upload(file: UploadFile, directory: str | None = None, hasher=None) -> str:
+    """
+    Copy an upload to a temporary file on disk in fixed-size chunks,
+    so the whole body is never held in memory. Returns the file path.
+    A hashlib object passed as `hasher` is fed every chunk on the way.
+    """
+    fd, path = tempfile.mkstemp(suffix=".csv", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = await file.read(SPOOL_CHUNK_BYTES)
+                if not chunk:
+                    break
+                out.write(chunk)
+                if hasher is not None:
+                    hasher.update(chunk)
+    except Exception:
+        os.remove(path)
+        raise
+    return path
+
+
+async def spool_uploads(files: List[UploadFile]) -> tuple[dict[str, str], dict[str, str], dict[str, StageProfile]]:
+    """
+    Spool the csv uploads of one request: filename -> spooled path,
+    filename -> sha256 digest and filename -> StageProfile (its "upload"
+    stage). No files, a file that is not a csv or a filename given twice
+    is an HTTP 400 before anything is spooled; on any later error the
+    files spooled so far are removed.
+    """
+    if not files:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="No files uploaded"
+        )
+
+    names = set()
+    for file in files:
+        if not file.filename.lower().endswith(".csv"):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"{file.filename} is not a csv file"
+            )
+        if file.filename in names:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"{file.filename} is uploaded more than once"
+            )
+        names.add(file.filename)
+
+    paths:    dict[str, str] = {}
+    digests:  dict[str, str] = {}
+    profiles: dict[str, StageProfile] = {}
+    try:
+        for file in files:
+            try:
+                hasher  = hashlib.sha256()
+                profile = StageProfile()
+                with profile.stage("upload") as counts:
+                    paths[file.filename] = await spool_upload(file, hasher=hasher)
+                    counts["bytes"] = os.path.getsize(paths[file.filename])
+                digests[file.filename]  = hasher.hexdigest()
+                profiles[file.filename] = profile
+            finally:
+                await file.close()
+    except Exception:
+        remove_spooled(paths.values())
+        raise
+
+    return paths, digests, profiles
+
+
+def remove_spooled(paths) -> None:
+    """Remove the spooled uploads at `paths` that are still on disk."""
+    for path in paths:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def sniff_format(path: str) -> tuple[str, str]:
+    """
+    Detect (encoding, delimiter) from the first SNIFF_BYTES of the file.
+    """
+    with open(path, "rb") as f:
+        head = f.read(SNIFF_BYTES)
+
+    if head.startswith(b"\xef\xbb\xbf"):
+        encoding = "utf-8-sig"
+    else:
+        # Cut back to the last full line so a split multibyte
+        # character at the boundary is not mistaken for latin-1
+        cut = head.rfind(b"\n")
+        try:
+            (head[:cut] if cut > 0 else head).decode("utf-8")
+            encoding = "utf-8"
+        except UnicodeDecodeError:
+            encoding = "latin-1"
+
+    text = head.decode(encoding, errors="replace")
+    try:
+        delimiter = csv.Sniffer().sniff(text, delimiters=DELIMITERS).delimiter
+    except csv.Error:
+        delimiter = ","
+
+    return encoding, delimiter
+
+
+def _chunk_reader(path: str, encoding: str, delimiter: str, rows: int = CSV_CHUNK_ROWS):
+    """(empty frame of the used columns, read_csv iterator of `rows`-row chunks)."""
+    header  = pd.read_csv(path, sep=delimiter, encoding=encoding, nrows=0)
+    mapping = Graph._match_columns(df=header)
+
+    # Only the mapped columns are ever materialized
+    usecols = list(dict.fromkeys(mapping.values()))
+
+    reader = pd.read_csv(
+        path,
+        sep=delimiter,
+        encoding=encoding,
+        usecols=usecols,
+        engine="c",
+        chunksize=rows,
+    )
+    return header[usecols], reader
+
+
+def _read_chunked(path: str, encoding: str, delimiter: str) -> pd.DataFrame:
+    empty, reader = _chunk_reader(path, encoding, delimiter)
+    chunks = list(reader)
+    if not chunks:
+        return empty
+    return pd.concat(chunks, ignore_index=True)
+
+
+def read_transactions_csv(path: str) -> pd.DataFrame:
+    """
+    Parse a spooled CSV with the C engine in CSV_CHUNK_ROWS chunks,
+    keeping only the columns Graph can map. Blocking — run it off the
+    event loop.
+    """
+    encoding, delimiter = sniff_format(path)
+    try:
+        return _read_chunked(path, encoding, delimiter)
+    except UnicodeDecodeError:
+        # Sniffed head was clean utf-8 but the rest of the file is not
+        return _read_chunked(path, "latin-1", delimiter)
+
+
+def _prune_snapshots() -> None:
+    """Drop all but the SNAPSHOT_KEEP most recently used snapshots."""
+    entries = []
+    for name in os.listdir(SNAPSHOT_DIR):
+        path = os.path.join(SNAPSHOT_DIR, name)
+        if not name.startswith(".") and os.path.isdir(path):
+            entries.append((os.stat(path).st_mtime, path))
+    entries.sort(reverse=True)
+    for _, path in entries[SNAPSHOT_KEEP:]:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def out_of_core(path: str) -> bool:
+    """Whether `path` is too large to be built in memory."""
+    size = os.path.getsize(path)
+    if OUT_OF_CORE_MB and size >= OUT_OF_CORE_MB * 2**20:
+        return True
+    return bool(MEMORY_LIMIT_MB) and size * IN_MEMORY_FACTOR > MEMORY_LIMIT_MB * 2**20
+
+
+def _build_out_of_core(path: str, target: str) -> dict:
+    """Snapshot of a spooled CSV at `target`, within OUT_OF_CORE_BUDGET_MB."""
+    encoding, delimiter = sniff_format(path)
+    rows = chunk_rows(OUT_OF_CORE_BUDGET_MB)
+    try:
+        _, reader = _chunk_reader(path, encoding, delimiter, rows)
+        return build_snapshot(reader, target, OUT_OF_CORE_BUDGET_MB, SPILL_DIR)
+    except UnicodeDecodeError:
+        # Sniffed head was clean utf-8 but the rest of the file is not
+        _, reader = _chunk_reader(path, "latin-1", delimiter, rows)
+        return build_snapshot(reader, target, OUT_OF_CORE_BUDGET_MB, SPILL_DIR)
+
+
+def _graph_counts(graph: Graph) -> dict:
+    return {
+        "rows":     len(graph.src),
+        "accounts": graph.n_accounts,
+        "edges":    len(graph.csr.indices),
+    }
+
+
+def load_graph(
+    path: str,
+    digest: str | None = None,
+    profile: StageProfile | None = None,
+) -> Graph:
+    """
+    Graph of a spooled CSV. With a digest, a snapshot of the same content
+    is mapped instead of re-parsing, and a freshly parsed graph is saved
+    as one; either way the returned graph is snapshot-backed, so shipping
+    it to a worker process costs only its path. Files out_of_core() says
+    are too large go straight from CSV chunks to a snapshot on disk. The
+    stages taken ("snapshot_load", "out_of_core_build", or "read_csv" /
+    "graph_build" / "snapshot_save") are recorded in `profile`.
+    Blocking — run it off the event loop.
+    """
+    profile  = profile if profile is not None else StageProfile()
+    snapshot = os.path.join(SNAPSHOT_DIR, digest) if SNAPSHOT_DIR and digest else None
+
+    if is_snapshot(snapshot):
+        try:
+            with profile.stage("snapshot_load") as counts:
+                graph = Graph.load(snapshot)
+                os.utime(snapshot)
+                counts.update(_graph_counts(graph))
+            return graph
+        except (OSError, ValueError):
+            # Stale format or removed behind our back: parse again
+            pass
+
+    if out_of_core(path):
+        # Without a snapshot cache the snapshot is private to this graph
+        # and goes away with it
+        target = snapshot or tempfile.mkdtemp(dir=SPILL_DIR, prefix="graph-")
+        with profile.stage("out_of_core_build", bytes=os.path.getsize(path)) as counts:
+            counts.update(_build_out_of_core(path, target))
+            graph = Graph.load(target)
+            for column, issues in graph.parse_issues.items():
+                counts[f"unparseable_{column}"] = issues["unparseable"]
+        if snapshot is None:
+            weakref.finalize(graph, shutil.rmtree, target, True)
+        else:
+            _prune_snapshots()
+        return graph
+
+    with profile.stage("read_csv", bytes=os.path.getsize(path)) as counts:
+        df = read_transactions_csv(path)
+        counts["rows"] = len(df)
+    with profile.stage("graph_build") as counts:
+        graph = Graph(raw_dataframe=df)
+        del df
+        counts.update(_graph_counts(graph))
+        for column, issues in graph.parse_issues.items():
+            counts[f"unparseable_{column}"] = issues["unparseable"]
+    if snapshot is None:
+        return graph
+
+    try:
+        with profile.stage("snapshot_save"):
+            graph.save(snapshot)
+            _prune_snapshots()
+            graph = Graph.load(snapshot)
+    except OSError:
+        pass
+    return graph
@@ -0,0 +1,244 @@
+import os
+import time
+import uuid
+import asyncio
+from typing import List
+
+from fastapi import (
+    HTTPException,
+    status,
+    UploadFile
+)
+from fastapi.concurrency import run_in_threadpool
+
+from graphs.profiling import StageProfile
+from .ingest import spool_uploads, remove_spooled, load_graph
+from .main_engine import analyze_graph, cached_result, store_result, index_result
+from .workers import run_batch, get_manager
+from .metrics import metrics
+
+
+# Stages reported for every file of a job, in order
+PIPELINE_STAGES = (
+    "parsed", "graph_built",
+    "cycles", "smurfing", "shells", "scores", "rings", "report",
+    "saved",
+)
+
+# Finished jobs kept in memory before the oldest are dropped
+JOB_HISTORY = int(os.getenv("DETECT_JOB_HISTORY", "100"))
+
+
+def analyze_upload(
+    filename: str,
+    path: str,
+    output_path: str,
+    progress,
+    key: tuple[str, str],
+    digest: str | None = None,
+    profile: StageProfile | None = None,
+) -> dict:
+    """
+    Worker-process entry point: parse and analyze one spooled file of a
+    job, publishing each finished stage to the shared `progress` map.
+    `profile` holds the upload stage recorded by the API process.
+    """
+    done: list[str] = []
+
+    def on_stage(stage: str) -> None:
+        done.append(stage)
+        progress[key] = {
+            "stage":       stage,
+            "stages_done": list(done),
+            "percent":     round(100.0 * len(done) / len(PIPELINE_STAGES), 1),
+        }
+
+    profile = profile if profile is not None else StageProfile()
+    graph   = load_graph(path, digest, profile)
+    on_stage("parsed")
+    on_stage("graph_built")
+    result = analyze_graph(
+        filename, graph, output_path, on_stage=on_stage, digest=digest, profile=profile
+    )
+    on_stage("saved")
+
+    return result
+
+
+class JobManager:
+    """
+    Background analysis jobs: uploads are spooled to disk, each file runs
+    through the pipeline in the shared process pool and callers poll
+    status / result.
+    """
+
+    def __init__(self, output_path: str = "output/") -> None:
+        self.output_path = output_path
+        self._jobs: dict[str, dict] = {}
+        self._tasks: dict[str, asyncio.Task] = {}
+        self._progress = None
+
+    def _progress_map(self):
+        # Manager process is only started once the first job arrives
+        if self._progress is None:
+            self._progress = get_manager().dict()
+        return self._progress
+
+    async def submit(self, files: List[UploadFile]) -> dict:
+        uploads, digests, profiles = await spool_uploads(files)
+
+        job_id = uuid.uuid4().hex
+        self._jobs[job_id] = {
+            "job_id":       job_id,
+            "status":       "queued",
+            "files":        list(uploads),
+            "failed_files": [],
+            "created_at":   time.time(),
+            "finished_at":  None,
+            "result":       None,
+            "error":        None,
+        }
+        self._tasks[job_id] = asyncio.create_task(
+            self._run(job_id, uploads, digests, profiles)
+        )
+        self._prune()
+
+        return self.status(job_id)
+
+    async def _run(
+        self,
+        job_id:   str,
+        uploads:  dict[str, str],
+        digests:  dict[str, str],
+        profiles: dict[str, StageProfile],
+    ) -> None:
+        job      = self._jobs[job_id]
+        progress = self._progress_map()
+        try:
+            # Content seen before with the same engine parameters: done already
+            cached = {}
+            for filename in uploads:
+                start = time.perf_counter()
+                hit   = await run_in_threadpool(
+                    cached_result, filename, digests[filename], self.output_path
+                )
+                if hit is not None:
+                    hit["elapsed_seconds"] = round(time.perf_counter() - start, 4)
+                    cached[filename] = hit
+                    progress[(job_id, filename)] = {
+                        "stage":       "saved",
+                        "stages_done": list(PIPELINE_STAGES),
+                        "percent":     100.0,
+                        "cached":      True,
+                    }
+
+            # One pool task per file, so a batch takes about as long as
+            # its largest file and one bad file does not fail the rest
+            fresh = await run_batch({
+                filename: (
+                    analyze_upload, filename, path, self.output_path,
+                    progress, (job_id, filename), digests[filename], profiles[filename]
+                )
+                for filename, path in uploads.items() if filename not in cached
+            }) if len(cached) < len(uploads) else {}
+            for filename, r in fresh.items():
+                if "error" not in r:
+                    await run_in_threadpool(store_result, digests[filename], r)
+
+            merged = {**cached, **fresh}
+            result = {f: merged[f] for f in uploads}
+            for filename, r in result.items():
+                metrics.observe_result(r, source="job")
+                await run_in_threadpool(index_result, filename, digests[filename], r)
+            job["result"]       = result
+            job["failed_files"] = [f for f, r in result.items() if "error" in r]
+            if len(job["failed_files"]) == len(result):
+                job["status"] = "failed"
+                job["error"]  = "; ".join(f"{f}: {result[f]['error']}" for f in result)
+            else:
+                job["status"] = "done"
+        except Exception as e:
+            job["status"] = "failed"
+            job["error"]  = str(e)
+        finally:
+            job["finished_at"] = time.time()
+            remove_spooled(uploads.values())
+            self._tasks.pop(job_id, None)
+
+    def _prune(self) -> None:
+        finished = [
+            j for j in self._jobs.values() if j["finished_at"] is not None
+        ]
+        finished.sort(key=lambda j: j["finished_at"])
+        for job in finished[:max(0, len(finished) - JOB_HISTORY)]:
+            self._jobs.pop(job["job_id"], None)
+            if self._progress is not None:
+                for filename in job["files"]:
+                    self._progress.pop((job["job_id"], filename), None)
+
+    def _get(self, job_id: str) -> dict:
+        job = self._jobs.get(job_id)
+        if job is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Job '{job_id}' not found"
+            )
+        return job
+
+    def _job_progress(self, job: dict) -> dict:
+        per_file = {}
+        if self._progress is not None:
+            for filename in job["files"]:
+                entry = self._progress.get((job["job_id"], filename))
+                if entry is not None:
+                    per_file[filename] = entry
+
+        total = len(job["files"])
+        return {
+            "files_total": total,
+            "files_done":  sum(1 for p in per_file.values() if p["stage"] == "saved"),
+            "percent":     round(sum(p["percent"] for p in per_file.values()) / max(total, 1), 1),
+            "files":       per_file,
+        }
+
+    def status(self, job_id: str) -> dict:
+        job      = self._get(job_id)
+        progress = self._job_progress(job)
+
+        state = job["status"]
+        if state == "queued" and progress["files"]:
+            state = "running"
+
+        return {
+            "job_id":       job_id,
+            "status":       state,
+            "files":        job["files"],
+            "failed_files": job["failed_files"],
+            "progress":     progress,
+            "error":        job["error"],
+            "created_at":  job["created_at"],
+            "finished_at": job["finished_at"],
+            "status_url":  f"/jobs/{job_id}",
+            "result_url":  f"/jobs/{job_id}/result",
+        }
+
+    def list_jobs(self) -> dict:
+        return {"jobs": [self.status(job_id) for job_id in list(self._jobs)]}
+
+    def result(self, job_id: str) -> dict:
+        job = self._get(job_id)
+
+        if job["status"] == "failed":
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Job '{job_id}' {job['status']}: {job['error']}"
+            )
+        if job["status"] != "done":
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"Job '{job_id}' is not finished yet"
+            )
+        return job["result"]
+
+
+job_manager = JobManager()
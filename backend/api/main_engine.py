@@ -1,107 +1,238 @@
 import os
-import json
+import time
 
 from fastapi import (
     HTTPException,
     status,
     UploadFile
 )
-from fastapi.responses import FileResponse
-from io import StringIO
-from typing import List
-import pandas as pd
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, StreamingResponse
+from typing import Callable, List, Optional
 
 from graphs.engine import MainEngine
 from graphs.build_graph import Graph
+from graphs.profiling import StageProfile
+from .ingest import spool_uploads, remove_spooled, load_graph
+from .workers import NESTED_WORKERS, run_batch
+from .cache import result_cache
+from .metrics import metrics
+from .index import result_index
+from .reports import (
+    REPORT_SUFFIX,
+    LEGACY_SUFFIX,
+    NDJSON_MEDIA,
+    write_report,
+    iter_decompressed,
+    iter_lines,
+    accepts_gzip,
+)
 
 
 class Detect:
 
-    async def handle_files(self, files: List[UploadFile]) -> dict[str, Graph]:
-
-        output_dic: dict[str, Graph] = {}
-
-        if not files:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="No files uploaded"
-            )
-
-        for file in files:
-
-            if not file.filename.lower().endswith(".csv"):
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=f"{file.filename} is not a csv file"
-                )
-
-            try:
-                contents = await file.read()
-
-                try:
-                    decoded = contents.decode("utf-8")
-                except UnicodeDecodeError:
-                    decoded = contents.decode("latin-1")
+    def __init__(self) -> None:
+        # Per upload: content digest, results already served from cache,
+        # and the stage profile started while spooling / parsing
+        self.digests:  dict[str, str] = {}
+        self.cached:   dict[str, dict] = {}
+        self.profiles: dict[str, StageProfile] = {}
+
+    async def handle_files(self, files: List[UploadFile]) -> dict[str, str]:
+        """
+        Spool the uploads to disk and return filename -> spooled path.
+        Files whose content was analyzed before (same digest, same engine
+        parameters) are not returned: their stored result goes to
+        `self.cached` instead. Parsing happens in the worker processes.
+        """
+
+        uploads, digests, profiles = await spool_uploads(files)
+        self.digests.update(digests)
+        self.profiles.update(profiles)
 
-                df = pd.read_csv(StringIO(decoded), sep=None, engine="python")
-                graph = Graph(raw_dataframe=df)
-                output_dic[file.filename] = graph
-
-            except Exception as e:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=f"Invalid CSV file {file.filename}: {str(e)}"
-                )
-
-            finally:
-                await file.close()
-
-        return output_dic
+        try:
+            for filename, digest in digests.items():
+                start = time.perf_counter()
+                hit   = await run_in_threadpool(cached_result, filename, digest)
+                if hit is not None:
+                    upload = profiles[filename].stages["upload"]["wall_seconds"]
+                    hit["elapsed_seconds"] = round(upload + time.perf_counter() - start, 4)
+                    self.cached[filename] = hit
+                    os.remove(uploads.pop(filename))
+        except Exception:
+            remove_spooled(uploads.values())
+            raise
+
+        return uploads
 
     async def run_detction_pipeline(
         self,
-        input_dict: dict[str, Graph],
-        output_path: str = "output/"
+        input_dict: dict[str, str],
+        output_path: str = "output/",
+        max_concurrency: Optional[int] = None
     ) -> dict:
+        """
+        Parse and analyze every spooled file in parallel worker processes
+        (at most `max_concurrency` at once), so a batch takes about as long
+        as its largest file. A file that fails — a bad CSV included — gets
+        an "error" entry instead of aborting the batch; each entry carries
+        its own "elapsed_seconds". Cache hits from handle_files are merged
+        back in upload order, and fresh results are stored.
+        """
 
         if not os.path.exists(output_path):
             os.makedirs(output_path)
 
-        all_results: dict = {}
-
-        for filename, graph in input_dict.items():
-
-            algo   = MainEngine(graph=graph)
-            report = algo.run_full_pipeline()
-
-            fraud_rings    = report["fraud_rings"]
-            account_scores = report["account_scores"]
-
-            # Build summary DataFrame from the ring + score data
-            summary_df = algo.summary_table(
-                fraud_rings=fraud_rings,
-                account_scores=account_scores
+        try:
+            results = await run_batch(
+                {
+                    filename: (
+                        analyze_file, filename, path, output_path,
+                        self.digests.get(filename), self.profiles.get(filename)
+                    )
+                    for filename, path in input_dict.items()
+                },
+                max_concurrency=max_concurrency,
             )
-
-            # Save JSON report (strip internal account_scores key)
-            json_report = {k: v for k, v in report.items() if k != "account_scores"}
-
-            safe_name = filename.split(".")[0]
-            file_name = f"{safe_name}_analysis.json"
-            full_path = os.path.join(output_path, file_name)
-
-            with open(full_path, "w", encoding="utf-8") as f:
-                json.dump(json_report, f, indent=4, default=str)
-
-            print(f"[✓] Saved analysis for '{filename}' → {full_path}")
-
-            all_results[filename] = {
-                "report":    json_report,
-                "summary":   summary_df.to_dict(orient="records"),
-                "saved_to":  full_path
-            }
-
-        return all_results
+        finally:
+            remove_spooled(input_dict.values())
+
+        for filename, result in results.items():
+            if "error" not in result and filename in self.digests:
+                await run_in_threadpool(store_result, self.digests[filename], result)
+
+        merged = {**self.cached, **results}
+        for filename, result in merged.items():
+            metrics.observe_result(result, source="upload")
+            await run_in_threadpool(index_result, filename, self.digests.get(filename), result)
+        return {f: merged[f] for f in self.digests if f in merged}
+
+
+def report_path(filename: str, output_path: str, digest: Optional[str] = None) -> str:
+    """
+    Where the report of an upload is saved (gzip'd NDJSON). The content
+    digest keeps different files that share a name from overwriting
+    each other.
+    """
+    stem = os.path.splitext(os.path.basename(filename))[0]
+    if digest:
+        stem = f"{stem}_{digest[:12]}"
+    return os.path.join(output_path, f"{stem}{REPORT_SUFFIX}")
+
+
+def save_report(json_report: dict, full_path: str) -> None:
+    write_report(json_report, full_path)
+
+
+def cached_result(
+    filename: str, digest: str, output_path: str = "output/"
+) -> Optional[dict]:
+    """
+    Stored result for this content, or None. The report file is
+    rewritten under this upload's name if it is missing.
+    """
+    hit = result_cache.get(result_cache.key(digest))
+    if hit is None:
+        return None
+
+    full_path = report_path(filename, output_path, digest)
+    if not os.path.exists(full_path):
+        save_report(hit["report"], full_path)
+    return {**hit, "saved_to": full_path, "cached": True}
+
+
+def store_result(digest: str, result: dict) -> None:
+    result_cache.put(
+        result_cache.key(digest),
+        {"report": result["report"], "summary": result["summary"]},
+    )
+
+
+def index_result(filename: str, digest: Optional[str], result: dict) -> None:
+    """Make a saved report queryable; a failure only costs the index entry."""
+    if "error" in result or not result.get("saved_to"):
+        return
+    try:
+        result["analysis_id"] = result_index.add(result["saved_to"], filename, digest)
+    except Exception as e:
+        print(f"[!] Could not index '{result['saved_to']}': {e}")
+
+
+def analyze_graph(
+    filename: str,
+    graph: Graph,
+    output_path: str = "output/",
+    on_stage: Optional[Callable[[str], None]] = None,
+    digest: Optional[str] = None,
+    profile: Optional[StageProfile] = None,
+    on_partial: Optional[Callable[[str, dict], None]] = None,
+) -> dict:
+    """
+    Run the detection pipeline on one parsed file and save its JSON report.
+    Module-level so it can be shipped to worker processes. Stages are
+    added to `profile` (the upload / parse stages, when given); the saved
+    file carries the profile up to "summary_table", the returned report
+    also has "json_write". Running in a pool worker, the detectors start
+    NESTED_WORKERS processes at most.
+    """
+    profile = profile if profile is not None else StageProfile()
+
+    with profile.stage("engine_init", accounts=graph.n_accounts, rows=len(graph.src)):
+        algo = MainEngine(graph=graph)
+    report = algo.run_full_pipeline(
+        on_stage=on_stage, profile=profile, on_partial=on_partial, workers=NESTED_WORKERS,
+    )
+
+    fraud_rings    = report["fraud_rings"]
+    account_scores = report["account_scores"]
+
+    # Build summary DataFrame from the ring + score data
+    with profile.stage("summary_table", rings=len(fraud_rings)):
+        summary_df = algo.summary_table(
+            fraud_rings=fraud_rings,
+            account_scores=account_scores
+        )
+        summary = summary_df.to_dict(orient="records")
+
+    # Save JSON report (strip internal account_scores key)
+    json_report = {k: v for k, v in report.items() if k != "account_scores"}
+    json_report["parse_issues"] = graph.parse_issues
+    json_report["profile"] = profile.to_dict()
+
+    full_path = report_path(filename, output_path, digest)
+    with profile.stage("json_write") as counts:
+        save_report(json_report, full_path)
+        counts["bytes"] = os.path.getsize(full_path)
+    json_report["profile"] = profile.to_dict()
+
+    print(f"[✓] Saved analysis for '{filename}' → {full_path}")
+
+    return {
+        "report":    json_report,
+        "summary":   summary,
+        "saved_to":  full_path
+    }
+
+
+def analyze_file(
+    filename: str,
+    path: str,
+    output_path: str = "output/",
+    digest: Optional[str] = None,
+    profile: Optional[StageProfile] = None,
+) -> dict:
+    """
+    Worker-process entry point of POST /input/files: parse one spooled
+    file (or map its snapshot) and analyze it, all inside the worker.
+    """
+    profile = profile if profile is not None else StageProfile()
+    try:
+        graph = load_graph(path, digest, profile)
+    except MemoryError:
+        raise
+    except Exception as e:
+        raise ValueError(f"Invalid CSV file {filename}: {e}") from e
+    return analyze_graph(filename, graph, output_path, digest=digest, profile=profile)
 
 
 class DownLoad_JSON:
@@ -115,12 +246,15 @@ class DownLoad_JSON:
                     "files": [],
                     "message": f"Directory '{self.output_dir_path}' not found."
                 }
-            files = [f for f in os.listdir(self.output_dir_path) if f.endswith(".json")]
+            files = [
+                f for f in os.listdir(self.output_dir_path)
+                if f.endswith(REPORT_SUFFIX) or f.endswith(LEGACY_SUFFIX)
+            ]
             return {
                 "files": [
                     {
                         "name": f,
-                        "download_url": f"/download/{f}"
+                        "download_url": f"/download/{_strip_suffix(f)}"
                     }
                     for f in files
                 ]
@@ -128,27 +262,66 @@ class DownLoad_JSON:
         except Exception as e:
             return {"files": [], "error": str(e)}
 
-    async def download_file(self, file_name: str):
-
-        file_name = f"{file_name}.json"
-
+    async def download_file(
+        self,
+        file_name: str,
+        accept_encoding: Optional[str] = None,
+        offset: int = 0,
+        limit: Optional[int] = None,
+    ):
+        """
+        Serve a report by name (without extension). NDJSON reports go out
+        as stored (Content-Encoding: gzip, byte ranges allowed) to clients
+        that accept gzip and decompressed on the fly otherwise; `offset` /
+        `limit` select a page of records instead. Reports of earlier
+        versions are plain JSON files.
+        """
         if ".." in file_name or "/" in file_name:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Invalid filename"
             )
+        if offset < 0 or (limit is not None and limit < 0):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="offset and limit must not be negative"
+            )
 
-        file_path = os.path.join(self.output_dir_path, file_name)
-
-        if not os.path.exists(file_path):
+        stem = _strip_suffix(file_name)
+        for suffix in (".ndjson.gz", ".json"):
+            file_path = os.path.join(self.output_dir_path, f"{stem}{suffix}")
+            if os.path.exists(file_path):
+                break
+        else:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"File '{file_name}' not found"
             )
 
-        return FileResponse(
-            path=file_path,
-            filename=file_name,
-            media_type="application/json"
+        if file_path.endswith(".json"):
+            return FileResponse(
+                path=file_path,
+                filename=f"{stem}.json",
+                media_type="application/json"
+            )
+
+        if offset or limit is not None:
+            return StreamingResponse(iter_lines(file_path, offset, limit), media_type=NDJSON_MEDIA)
+
+        disposition = {"Content-Disposition": f'attachment; filename="{stem}.ndjson"', "Vary": "Accept-Encoding"}
+        if accepts_gzip(accept_encoding):
+            return FileResponse(
+                path=file_path,
+                media_type=NDJSON_MEDIA,
+                headers={**disposition, "Content-Encoding": "gzip"},
+            )
+        return StreamingResponse(
+            iter_decompressed(file_path), media_type=NDJSON_MEDIA, headers=disposition
         )
-    
\ No newline at end of file
+
+
+def _strip_suffix(name: str) -> str:
+    for ext in (".ndjson.gz", ".json"):
+        if name.endswith(ext):
+            return name[: -len(ext)]
+    return name
@@ -0,0 +1,170 @@
+import time
+import threading
+from typing import Iterable
+
+from .cache import result_cache
+
+
+# Latency histogram buckets (seconds)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+# Stage counts that describe one run rather than add up across runs:
+# exported as gauges of the last run instead of detect_stage_items_total
+STAGE_GAUGES = {
+    "iterations":     ("detect_propagation_iterations", "Risk propagation iterations of the last analysis"),
+    "residual":       ("detect_propagation_residual", "Final relative change of the last risk propagation"),
+    "max_shard_rows": ("detect_shard_max_rows", "Rows in the largest shard of the last sharded analysis"),
+}
+
+
+def _labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    inner = ",".join(
+        '{}="{}"'.format(k, str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for k, v in labels.items()
+    )
+    return "{" + inner + "}"
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metrics:
+    """
+    In-process counters, gauges and histograms, rendered in the
+    Prometheus text exposition format by GET /metrics. Values live in
+    the API process: workers send their stage profiles back inside each
+    result and they are recorded here. Every server process keeps its
+    own registry.
+    """
+
+    def __init__(self) -> None:
+        self._lock  = threading.Lock()
+        self._meta: dict[str, tuple[str, str]] = {}                # name -> (type, help)
+        self._values: dict[str, dict[tuple, float]] = {}           # counters + gauges
+        self._hists:  dict[str, dict[tuple, list]] = {}            # name -> labels -> [buckets, sum, count]
+        self.started_at = time.time()
+
+    def _declare(self, name: str, kind: str, help_text: str) -> None:
+        if name not in self._meta:
+            self._meta[name] = (kind, help_text)
+
+    def inc(self, name: str, help_text: str, value: float = 1, **labels) -> None:
+        with self._lock:
+            self._declare(name, "counter", help_text)
+            series = self._values.setdefault(name, {})
+            key    = tuple(sorted(labels.items()))
+            series[key] = series.get(key, 0) + value
+
+    def set(self, name: str, help_text: str, value: float, _kind: str = "gauge", **labels) -> None:
+        """Set a gauge (or, with _kind="counter", a counter kept elsewhere)."""
+        with self._lock:
+            self._declare(name, _kind, help_text)
+            self._values.setdefault(name, {})[tuple(sorted(labels.items()))] = value
+
+    def observe(self, name: str, help_text: str, value: float, **labels) -> None:
+        with self._lock:
+            self._declare(name, "histogram", help_text)
+            series = self._hists.setdefault(name, {})
+            key    = tuple(sorted(labels.items()))
+            entry  = series.setdefault(key, [[0] * len(LATENCY_BUCKETS), 0.0, 0])
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if value <= bound:
+                    entry[0][i] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    # ─────────────────────────────────────────────────────────────────
+    # Recording
+    # ─────────────────────────────────────────────────────────────────
+    def observe_profile(self, profile: dict, source: str) -> None:
+        """Record every stage of one file's StageProfile.to_dict()."""
+        for stage, entry in profile.get("stages", {}).items():
+            self.observe(
+                "detect_stage_seconds", "Wall time per pipeline stage",
+                entry["wall_seconds"], stage=stage, source=source,
+            )
+            self.inc(
+                "detect_stage_cpu_seconds_total", "CPU time spent per pipeline stage",
+                entry["cpu_seconds"], stage=stage, source=source,
+            )
+            if entry.get("peak_rss_mb") is not None:
+                self.set(
+                    "detect_stage_peak_rss_bytes", "Peak RSS during the last run of a stage",
+                    int(entry["peak_rss_mb"] * 2**20), stage=stage,
+                )
+            for item, count in entry.get("counts", {}).items():
+                if item in STAGE_GAUGES:
+                    self.set(*STAGE_GAUGES[item], float(count))
+                    continue
+                self.inc(
+                    "detect_stage_items_total", "Rows, edges, candidates and findings per stage",
+                    count, stage=stage, item=item,
+                )
+
+    def observe_result(self, result: dict, source: str) -> None:
+        """Record one file's outcome (analyzed / cached / failed) and profile."""
+        if "error" in result:
+            outcome = "failed"
+        elif result.get("cached"):
+            outcome = "cached"
+        else:
+            outcome = "analyzed"
+            self.observe_profile(result.get("report", {}).get("profile", {}), source)
+
+        self.inc("detect_files_total", "Files processed by outcome", outcome=outcome, source=source)
+        if "elapsed_seconds" in result:
+            self.observe(
+                "detect_file_seconds", "End-to-end time per file",
+                result["elapsed_seconds"], outcome=outcome, source=source,
+            )
+
+    def observe_request(self, method: str, route: str, status_code: int, seconds: float) -> None:
+        self.observe(
+            "http_request_duration_seconds", "HTTP request latency",
+            seconds, method=method, route=route, status=status_code,
+        )
+
+    # ─────────────────────────────────────────────────────────────────
+    # Exposition
+    # ─────────────────────────────────────────────────────────────────
+    def _process_gauges(self) -> None:
+        cache = result_cache.stats()
+        self.set("detect_result_cache_entries", "Results held in the result cache", cache["entries"])
+        self.set("detect_result_cache_bytes", "Bytes held in the result cache", cache["bytes"])
+        self.set("detect_result_cache_hits_total", "Result cache hits", cache["hits"], "counter")
+        self.set("detect_result_cache_misses_total", "Result cache misses", cache["misses"], "counter")
+        self.set("detect_result_cache_evictions_total", "Result cache evictions", cache["evictions"], "counter")
+        self.set("process_uptime_seconds", "Seconds since the API process started",
+                 round(time.time() - self.started_at, 3))
+
+    def _render_lines(self) -> Iterable[str]:
+        for name in sorted(self._meta):
+            kind, help_text = self._meta[name]
+            yield f"# HELP {name} {help_text}"
+            yield f"# TYPE {name} {kind}"
+
+            if kind != "histogram":
+                for key, value in sorted(self._values.get(name, {}).items()):
+                    yield f"{name}{_labels(dict(key))} {_number(value)}"
+                continue
+
+            for key, (buckets, total, count) in sorted(self._hists.get(name, {}).items()):
+                labels = dict(key)
+                for bound, hits in zip(LATENCY_BUCKETS, buckets):
+                    yield f"{name}_bucket{_labels({**labels, 'le': _number(bound)})} {hits}"
+                yield f"{name}_bucket{_labels({**labels, 'le': '+Inf'})} {count}"
+                yield f"{name}_sum{_labels(labels)} {_number(total)}"
+                yield f"{name}_count{_labels(labels)} {count}"
+
+    def render(self) -> str:
+        self._process_gauges()
+        with self._lock:
+            return "\n".join(self._render_lines()) + "\n"
+
+
+metrics = Metrics()
@@ -0,0 +1,149 @@
+"""
+Report files: gzip-compressed NDJSON, one JSON record per line,
+
+    {"record": "header",  "summary": {...}, "profile": {...}}
+    {"record": "account", "account_id": ..., "suspicion_score": ..., ...}   (per suspicious account)
+    {"record": "ring",    "ring_id": ..., "member_accounts": [...], ...}   (per fraud ring)
+
+Records are encoded, compressed and written (or read back, decompressed
+and sent) a chunk at a time, so serialization memory does not grow with
+the size of the report.
+"""
+
+import os
+import gzip
+import json
+import tempfile
+from typing import Iterable, Iterator, Optional
+
+
+REPORT_SUFFIX   = "_analysis.ndjson.gz"
+LEGACY_SUFFIX   = "_analysis.json"           # indented JSON of earlier versions
+NDJSON_MEDIA    = "application/x-ndjson"
+
+GZIP_LEVEL      = int(os.getenv("DETECT_REPORT_GZIP_LEVEL", "6"))
+CHUNK_BYTES     = 64 * 1024
+
+# Keys of a report written as one record per item; everything else
+# goes into the header record
+_LISTS = (("suspicious_accounts", "account"), ("fraud_rings", "ring"))
+
+_encoder = json.JSONEncoder(default=str, separators=(",", ":"))
+
+
+def report_records(report: dict) -> Iterator[dict]:
+    """The NDJSON records of a report, header first."""
+    lists = dict(_LISTS)
+    yield {"record": "header", **{k: v for k, v in report.items() if k not in lists}}
+    for key, kind in _LISTS:
+        for item in report.get(key, ()):
+            yield {"record": kind, **item}
+
+
+def _chunked(records: Iterable[dict]) -> Iterator[bytes]:
+    """Encoded NDJSON lines, joined into chunks of about CHUNK_BYTES."""
+    buf, size = [], 0
+    for record in records:
+        line  = _encoder.encode(record) + "\n"
+        buf.append(line)
+        size += len(line)
+        if size >= CHUNK_BYTES:
+            yield "".join(buf).encode("utf-8")
+            buf, size = [], 0
+    if buf:
+        yield "".join(buf).encode("utf-8")
+
+
+def write_report(report: dict, path: str) -> int:
+    """
+    Write `report` as gzip'd NDJSON to `path` (atomically, through a
+    temporary file next to it). Returns the compressed size in bytes.
+    """
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=".report-", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as raw, gzip.GzipFile(
+            filename="", mode="wb", fileobj=raw, compresslevel=GZIP_LEVEL, mtime=0
+        ) as gz:
+            for chunk in _chunked(report_records(report)):
+                gz.write(chunk)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    return os.path.getsize(path)
+
+
+def read_records(path: str) -> Iterator[dict]:
+    """Records of a report file, one at a time."""
+    with gzip.open(path, "rb") as f:
+        for line in f:
+            yield json.loads(line)
+
+
+def iter_decompressed(path: str) -> Iterator[bytes]:
+    """The NDJSON text of a report file in CHUNK_BYTES pieces."""
+    with gzip.open(path, "rb") as f:
+        while chunk := f.read(CHUNK_BYTES):
+            yield chunk
+
+
+def iter_lines(path: str, offset: int = 0, limit: Optional[int] = None) -> Iterator[bytes]:
+    """Records [offset, offset + limit) of a report file as NDJSON chunks."""
+    def lines() -> Iterator[bytes]:
+        with gzip.open(path, "rb") as f:
+            for i, line in enumerate(f):
+                if i < offset:
+                    continue
+                if limit is not None and i >= offset + limit:
+                    return
+                yield line
+
+    buf, size = [], 0
+    for line in lines():
+        buf.append(line)
+        size += len(line)
+        if size >= CHUNK_BYTES:
+            yield b"".join(buf)
+            buf, size = [], 0
+    if buf:
+        yield b"".join(buf)
+
+
+def result_lines(results: dict) -> Iterator[bytes]:
+    """
+    A batch result ({filename: result}) as one NDJSON stream: per file a
+    {"record": "file", ...} line with everything but the report lists,
+    followed by that file's report records. They are read back from the
+    saved report when there is one, so nothing is encoded twice.
+    """
+    for filename, result in results.items():
+        report = result.get("report")
+        head   = {k: v for k, v in result.items() if k != "report"}
+        yield from _chunked([{"record": "file", "file": filename, **head}])
+        if report is None:
+            continue
+
+        saved = result.get("saved_to")
+        if saved and saved.endswith(REPORT_SUFFIX) and os.path.exists(saved):
+            yield from iter_decompressed(saved)
+        else:
+            yield from _chunked(report_records(report))
+
+
+def accepts_gzip(accept_encoding: Optional[str]) -> bool:
+    """Whether an Accept-Encoding header allows gzip (and not with q=0)."""
+    for part in (accept_encoding or "").split(","):
+        name, _, params = part.strip().partition(";")
+        if name.strip().lower() not in ("gzip", "*"):
+            continue
+        q = params.strip()
+        if not q.startswith("q="):
+            return True
+        try:
+            return float(q[2:]) > 0
+        except ValueError:
+            return True
+    return False
@@ -0,0 +1,104 @@
+import os
+import time
+import asyncio
+from typing import List
+
+import pandas as pd
+from fastapi import (
+    HTTPException,
+    status,
+    UploadFile
+)
+from fastapi.concurrency import run_in_threadpool
+
+from graphs.build_graph import Graph
+from graphs.incremental import IncrementalEngine
+from .ingest import spool_uploads, remove_spooled, read_transactions_csv
+
+
+# Share of the compacted history a stream may take in before a full rebuild
+COMPACTION_RATIO = float(os.getenv("DETECT_COMPACTION_RATIO", "0.5"))
+
+
+class StreamManager:
+    """
+    Named live streams, each an IncrementalEngine kept in this process:
+    uploads are appended as new batches and the report always reflects
+    everything received so far. Appends to one stream are serialized.
+    """
+
+    def __init__(self) -> None:
+        self._streams: dict[str, dict] = {}
+
+    def _get(self, stream_id: str) -> dict:
+        stream = self._streams.get(stream_id)
+        if stream is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Unknown stream: {stream_id}"
+            )
+        return stream
+
+    async def append(self, stream_id: str, files: List[UploadFile]) -> dict:
+        paths, _, _ = await spool_uploads(files)
+        frames = []
+        try:
+            for filename, path in paths.items():
+                try:
+                    df = await run_in_threadpool(read_transactions_csv, path)
+                    frames.append(await run_in_threadpool(Graph._normalize_columns, df))
+
+                except Exception as e:
+                    raise HTTPException(
+                        status_code=status.HTTP_400_BAD_REQUEST,
+                        detail=f"Invalid CSV file {filename}: {str(e)}"
+                    )
+        finally:
+            remove_spooled(paths.values())
+
+        batch  = pd.concat(frames, ignore_index=True)
+        stream = self._streams.setdefault(stream_id, {
+            "engine":       IncrementalEngine(compaction_ratio=COMPACTION_RATIO),
+            "lock":         asyncio.Lock(),
+            "batches":      0,
+            "transactions": 0,
+            "created_at":   time.time(),
+            "updated_at":   None,
+        })
+
+        async with stream["lock"]:
+            start = time.perf_counter()
+            info  = await run_in_threadpool(stream["engine"].append, batch, True)
+            stream["batches"]      += 1
+            stream["transactions"] += info["transactions"]
+            stream["updated_at"]    = time.time()
+
+        info["elapsed_seconds"] = round(time.perf_counter() - start, 3)
+        return {"stream_id": stream_id, **info}
+
+    def _describe(self, stream_id: str, stream: dict) -> dict:
+        return {
+            "stream_id":    stream_id,
+            "batches":      stream["batches"],
+            "transactions": stream["transactions"],
+            "accounts":     stream["engine"]._n,
+            "created_at":   stream["created_at"],
+            "updated_at":   stream["updated_at"],
+        }
+
+    def list_streams(self) -> list[dict]:
+        return [self._describe(sid, s) for sid, s in self._streams.items()]
+
+    async def report(self, stream_id: str) -> dict:
+        stream = self._get(stream_id)
+        async with stream["lock"]:
+            report = await run_in_threadpool(stream["engine"].report)
+        return {**self._describe(stream_id, stream), "report": report}
+
+    def drop(self, stream_id: str) -> dict:
+        self._get(stream_id)
+        del self._streams[stream_id]
+        return {"stream_id": stream_id, "dropped": True}
+
+
+stream_manager = StreamManager()
@@ -0,0 +1,199 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+from fastapi import HTTPException, status
+
+from graphs.build_graph import Graph
+from graphs.engine import _risk_levels
+from graphs.snapshot import is_snapshot
+from graphs.subgraph import REST, edge_stats, extract_subgraph
+from .index import result_index
+from . import ingest
+
+
+class SubgraphService:
+    """
+    k-hop neighbourhoods of a ring or an account for the graph view,
+    extracted from the analysis' graph snapshot and capped in nodes and
+    edges (see graphs/subgraph.py). The mapped graphs of the last few
+    analyses and the last few hundred extracted views are kept in memory.
+    """
+
+    GRAPHS      = 4                    # analyses whose graph, edge totals and scores stay loaded
+    RESULTS     = 256                  # extracted subgraphs kept
+    SCAN_BUDGET = 2_000_000            # adjacency entries one extraction may walk
+
+    def __init__(self) -> None:
+        self._lock     = threading.Lock()
+        self._graphs:  OrderedDict[int, dict]   = OrderedDict()
+        self._results: OrderedDict[tuple, dict] = OrderedDict()
+
+    def _analysis(self, analysis_id: int) -> dict:
+        """Graph, edge totals, label index and dense scores of an analysis."""
+        row    = result_index.analysis(analysis_id)
+        cached = self._graphs.get(analysis_id)
+        if cached is not None and cached["digest"] == row["digest"]:
+            self._graphs.move_to_end(analysis_id)
+            return cached
+
+        path = os.path.join(ingest.SNAPSHOT_DIR, row["digest"]) if ingest.SNAPSHOT_DIR and row["digest"] else None
+        if not is_snapshot(path):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"No graph snapshot for analysis '{analysis_id}' (pruned, or snapshots are disabled)"
+            )
+
+        graph   = Graph.load(path)
+        labels  = pd.Index(np.asarray(graph.accounts).astype(str))
+        flagged = result_index.flagged(analysis_id)
+        codes   = labels.get_indexer([a["account_id"] for a in flagged])
+        score   = np.zeros(graph.n_accounts, dtype=np.float64)
+        found   = codes >= 0
+        score[codes[found]] = np.array([a["score"] for a in flagged], dtype=np.float64)[found]
+
+        entry = {
+            "digest":  row["digest"],
+            "graph":   graph,
+            "stats":   edge_stats(graph),
+            "labels":  labels,
+            "score":   score,
+            "flagged": {a["account_id"]: (a["risk_level"], a["ring_id"]) for a in flagged},
+        }
+        self._graphs[analysis_id] = entry
+        while len(self._graphs) > self.GRAPHS:
+            self._graphs.popitem(last=False)
+        return entry
+
+    def _seeds(self, analysis_id: int, entry: dict, ring_id: Optional[str], account_id: Optional[str]) -> np.ndarray:
+        if ring_id is not None:
+            wanted = [m["account_id"] for m in result_index.ring(analysis_id, ring_id)["members"]]
+        else:
+            wanted = [account_id]
+        codes = entry["labels"].get_indexer(wanted)
+        if not (codes >= 0).any():
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Account '{account_id}' not found in analysis '{analysis_id}'"
+                       if ring_id is None else f"Ring '{ring_id}' has no accounts in the graph"
+            )
+        return codes[codes >= 0].astype(np.int64)
+
+    def subgraph(
+        self,
+        analysis_id: int,
+        ring_id:     Optional[str] = None,
+        account_id:  Optional[str] = None,
+        hops:        int = 1,
+        max_nodes:   int = 300,
+        max_edges:   int = 1_000,
+    ) -> dict:
+        if (ring_id is None) == (account_id is None):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Give exactly one of ring_id or account_id"
+            )
+
+        with self._lock:
+            start = time.perf_counter()
+            entry = self._analysis(analysis_id)
+            key   = (analysis_id, entry["digest"], ring_id, account_id, hops, max_nodes, max_edges)
+            if key in self._results:
+                self._results.move_to_end(key)
+                return {**self._results[key], "cached": True}
+
+            seeds  = self._seeds(analysis_id, entry, ring_id, account_id)
+            view   = extract_subgraph(
+                entry["graph"], seeds, hops, max_nodes, max_edges,
+                risk=lambda codes: entry["score"][codes], stats=entry["stats"],
+                max_scan=self.SCAN_BUDGET,
+            )
+            result = self._payload(analysis_id, entry, view, ring_id, account_id, hops, max_nodes, max_edges)
+            result["elapsed_seconds"] = round(time.perf_counter() - start, 4)
+
+            self._results[key] = result
+            while len(self._results) > self.RESULTS:
+                self._results.popitem(last=False)
+        return {**result, "cached": False}
+
+    @staticmethod
+    def _payload(analysis_id, entry, view, ring_id, account_id, hops, max_nodes, max_edges) -> dict:
+        labels  = entry["labels"]
+        flagged = entry["flagged"]
+
+        nodes = []
+        for code, hop, seed in zip(view["codes"].tolist(), view["hop"].tolist(), view["seed"].tolist()):
+            label = labels[code]
+            level, ring = flagged.get(label, (None, None))
+            nodes.append({
+                "id":              label,
+                "kind":            "account",
+                "hop":             hop,
+                "seed":            seed,
+                "suspicion_score": float(entry["score"][code]) if level is not None else None,
+                "risk_level":      level,
+                "ring_id":         ring,
+            })
+
+        groups = view["groups"]
+        for i, anchor in enumerate(groups["anchor"].tolist()):
+            max_score = float(groups["max_risk"][i])
+            nodes.append({
+                "id":                    "agg:rest" if anchor == REST else f"agg:{labels[anchor]}",
+                "kind":                  "aggregate",
+                "anchor":                None if anchor == REST else labels[anchor],
+                "accounts":              int(groups["accounts"][i]),
+                "hop":                   int(groups["min_hop"][i]),
+                "max_score":             max_score,
+                "risk_level":            str(_risk_levels(np.array([max_score]))[0]) if max_score > 0 else None,
+                "internal_transactions": int(groups["internal"][i]),
+            })
+
+        edge  = view["edges"]
+        ids   = [n["id"] for n in nodes]
+        first = pd.DatetimeIndex(edge["first"].view("M8[ns]"))
+        last  = pd.DatetimeIndex(edge["last"].view("M8[ns]"))
+        edges = [
+            {
+                "source":       ids[s],
+                "target":       ids[t],
+                "transactions": tx,
+                "amount":       round(amount, 2),
+                "first_seen":   None if pd.isna(f) else f.isoformat(),
+                "last_seen":    None if pd.isna(l) else l.isoformat(),
+            }
+            for s, t, tx, amount, f, l in zip(
+                edge["source"].tolist(), edge["target"].tolist(),
+                edge["transactions"].tolist(), edge["amount"].tolist(), first, last,
+            )
+        ]
+
+        collapsed = int(groups["accounts"].sum()) if len(groups["anchor"]) else 0
+        return {
+            "analysis_id": analysis_id,
+            "center":      {"ring_id": ring_id} if ring_id is not None else {"account_id": account_id},
+            "hops":        hops,
+            "limits":      {"max_nodes": max_nodes, "max_edges": max_edges},
+            "counts": {
+                "nodes":              len(nodes),
+                "edges":              len(edges),
+                "accounts_reached":   view["reached"],
+                "accounts_collapsed": collapsed,
+                "edges_found":        view["edges_found"],
+                "edges_dropped":      view["edges_found"] - len(edges),
+            },
+            "truncated": {
+                "expansion": view["truncated"],
+                "nodes":     collapsed > 0,
+                "edges":     view["edges_found"] > len(edges),
+            },
+            "nodes": nodes,
+            "edges": edges,
+        }
+
+
+subgraph_service = SubgraphService()
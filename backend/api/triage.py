@@ -0,0 +1,66 @@
+from typing import List
+
+from fastapi import UploadFile
+
+from graphs.build_graph import Graph
+from graphs.profiling import StageProfile
+from graphs.triage import StreamingTriage, exact_smurfing
+from .ingest import spool_uploads, remove_spooled, sniff_format, _chunk_reader
+from .workers import run_batch
+
+
+TRIAGE_CHUNK_ROWS = 100_000            # rows normalized and sketched at a time
+
+
+def _normalized_chunks(path: str, encoding: str, delimiter: str):
+    _, reader = _chunk_reader(path, encoding, delimiter, TRIAGE_CHUNK_ROWS)
+    for chunk in reader:
+        yield Graph._normalize_columns(df=chunk)
+
+
+def _triage(path: str, encoding: str, delimiter: str, exact: bool) -> dict:
+    profile = StageProfile()
+    triage  = StreamingTriage()
+
+    with profile.stage("sketch_pass") as counts:
+        for frame in _normalized_chunks(path, encoding, delimiter):
+            triage.update(frame)
+        shortlist = triage.shortlist()
+        counts.update(rows=triage.transactions, candidates=len(shortlist))
+
+    result = {"summary": triage.summary(), "shortlist": shortlist}
+    if exact:
+        with profile.stage("exact_pass") as counts:
+            found, rows = exact_smurfing(
+                _normalized_chunks(path, encoding, delimiter),
+                shortlist, triage.threshold, triage.windows_hours,
+            )
+            counts.update(rows=rows, patterns=len(found))
+        result["patterns"] = found
+    result["profile"] = profile.to_dict()
+    return result
+
+
+def triage_file(path: str, exact: bool = True) -> dict:
+    """
+    Sketch a spooled CSV in one pass and shortlist fan-in / fan-out
+    candidates; with `exact`, confirm them with detect_smurfing over the
+    shortlist's rows in a second pass. Blocking — run it in the pool.
+    """
+    encoding, delimiter = sniff_format(path)
+    try:
+        return _triage(path, encoding, delimiter, exact)
+    except UnicodeDecodeError:
+        # Sniffed head was clean utf-8 but the rest of the file is not
+        return _triage(path, "latin-1", delimiter, exact)
+
+
+async def triage_files(files: List[UploadFile], exact: bool = True) -> dict:
+    """Triage every upload in the worker pool; a failing file gets an "error" entry."""
+    paths, _, _ = await spool_uploads(files)
+    try:
+        return await run_batch(
+            {filename: (triage_file, path, exact) for filename, path in paths.items()}
+        )
+    finally:
+        remove_spooled(paths.values())
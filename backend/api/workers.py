@@ -0,0 +1,124 @@
+import os
+import time
+import asyncio
+from multiprocessing import Manager
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Optional
+
+try:
+    import resource
+except ImportError:                    # Windows
+    resource = None
+
+
+# Number of analysis worker processes (defaults to one per core)
+MAX_WORKERS = int(os.getenv("DETECT_MAX_WORKERS", "0")) or (os.cpu_count() or 1)
+
+# Processes one analysis may start itself (sharded detection, parallel
+# cycle search): the cores left over per pool worker, 1 by default, so
+# the pool and its children never outnumber the cores and every process
+# stays under MEMORY_LIMIT_MB
+NESTED_WORKERS = max((os.cpu_count() or 1) // MAX_WORKERS, 1)
+
+# Files of one batch analyzed at the same time (bounds parent memory:
+# a file's parsed graph is only pickled to the pool once it gets a slot)
+MAX_CONCURRENCY = int(os.getenv("DETECT_MAX_CONCURRENCY", "0")) or MAX_WORKERS
+
+# Memory ceiling of one analysis process in MB (0 = none). Out-of-core
+# builds size their chunks to it, and pool workers (and the processes
+# they fork) get it as RLIMIT_DATA: a file that would go over fails with
+# a MemoryError instead of taking the node down. Every file upload
+# (/input/files, jobs, event streams, triage) is parsed and analyzed in
+# the pool, so it covers them all; live /streams state stays in the API
+# process, which is not limited. Read-only snapshot maps are shared page
+# cache and do not count against it.
+MEMORY_LIMIT_MB = int(os.getenv("DETECT_MEMORY_LIMIT_MB", "0"))
+
+_pool: ProcessPoolExecutor | None = None
+_manager = None
+
+
+def _limit_memory() -> None:
+    """Pool worker initializer: apply MEMORY_LIMIT_MB to this process."""
+    if MEMORY_LIMIT_MB and resource is not None:
+        limit = MEMORY_LIMIT_MB * 2**20
+        resource.setrlimit(resource.RLIMIT_DATA, (limit, limit))
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """
+    Shared process pool for CPU-bound analysis work, created on first use
+    so importing the API does not fork workers.
+    """
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=MAX_WORKERS, initializer=_limit_memory)
+    return _pool
+
+
+def get_manager():
+    """
+    Shared multiprocessing Manager for state pool tasks report back
+    through (job progress maps, event queues), started on first use.
+    """
+    global _manager
+    if _manager is None:
+        _manager = Manager()
+    return _manager
+
+
+def shutdown_process_pool(broken: Optional[ProcessPoolExecutor] = None) -> None:
+    """
+    Shut the pool down. With `broken`, only if that is still the current
+    pool — concurrent callers recovering from one crash reset it once.
+    """
+    global _pool
+    if _pool is not None and (broken is None or _pool is broken):
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+async def run_in_pool(func: Callable, *args):
+    """
+    Await func(*args) in the process pool. A worker dying (e.g. OOM)
+    breaks the whole pool, so it is rebuilt and the call retried once.
+    """
+    loop = asyncio.get_running_loop()
+    pool = get_process_pool()
+    try:
+        return await loop.run_in_executor(pool, func, *args)
+    except BrokenProcessPool:
+        shutdown_process_pool(broken=pool)
+        return await loop.run_in_executor(get_process_pool(), func, *args)
+
+
+async def run_limited(limit: asyncio.Semaphore, func: Callable, *args) -> dict:
+    """
+    Await func(*args) in the pool once `limit` has a free slot. A func
+    that raises yields {"error": ...}; the result gets "elapsed_seconds"
+    (time in the pool, not waiting for the slot).
+    """
+    async with limit:
+        t0 = time.perf_counter()
+        try:
+            result = await run_in_pool(func, *args)
+        except Exception as e:
+            result = {"error": f"{type(e).__name__}: {e}"}
+        result["elapsed_seconds"] = round(time.perf_counter() - t0, 3)
+        return result
+
+
+async def run_batch(
+    tasks: dict[str, tuple],
+    max_concurrency: Optional[int] = None,
+) -> dict[str, dict]:
+    """
+    Run independent `key -> (func, *args)` tasks concurrently in the pool,
+    at most `max_concurrency` at a time. Each func returns a dict; a task
+    that raises yields {"error": ...} without affecting the others, and
+    every entry gets its own "elapsed_seconds".
+    """
+    limit   = asyncio.Semaphore(max_concurrency or MAX_CONCURRENCY)
+    results = await asyncio.gather(*(run_limited(limit, *task) for task in tasks.values()))
+    return dict(zip(tasks, results))
@@ -0,0 +1,125 @@
+"""
+Append benchmark of the incremental engine.
+
+A seeded dataset is generated (or reused from --data) and split into a
+history and a tail. An IncrementalEngine is built over the history (what
+a compaction costs), then batches of every size are appended from the
+tail, --repeat times each, and the median time per size is kept. An
+append has to cost in proportion to its batch, not to the history:
+
+    python -m benchmarks.append --rows 2e5 --batches 50 500 2000
+
+Exits with status 1 when an append takes more than --max-share of the
+rebuild, or when append time grows faster than --max-exponent over the
+batch size (the slope of log(seconds) over log(batch), ~1 is linear).
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+
+import numpy as np
+
+from graphs.build_graph import Graph
+from graphs.incremental import IncrementalEngine
+from api.ingest import read_transactions_csv
+from .generate import ensure_dataset
+from .run import HERE, environment
+
+
+def benchmark_appends(csv_path: str, batches: list[int], repeat: int) -> dict:
+    frame  = Graph(raw_dataframe=read_transactions_csv(csv_path)).dataframe
+    tail   = sum(batches) * repeat
+    split  = len(frame) - tail
+    if split <= tail:
+        raise ValueError(f"{len(frame):,} rows leave too little history for {tail:,} appended rows")
+
+    start  = time.perf_counter()
+    engine = IncrementalEngine(Graph.from_normalized(frame.iloc[:split].reset_index(drop=True)))
+    rebuild = time.perf_counter() - start
+
+    runs, at = [], split
+    for size in sorted(batches):
+        seconds, updates = [], []
+        for _ in range(repeat):
+            batch = frame.iloc[at:at + size].reset_index(drop=True)
+            at   += size
+            start = time.perf_counter()
+            info  = engine.append(batch, normalized=True)
+            seconds.append(time.perf_counter() - start)
+            updates.append(info)
+        if any(u["compacted"] for u in updates):
+            raise RuntimeError(f"batch of {size:,} rows triggered a compaction; use a larger --rows")
+        runs.append({
+            "batch":            size,
+            "seconds":          round(float(np.median(seconds)), 4),
+            "region_accounts":  int(np.median([u["region_accounts"] for u in updates])),
+            "region_truncated": any(u["region_truncated"] for u in updates),
+        })
+
+    return {
+        "history_rows":    split,
+        "accounts":        engine._n,
+        "rebuild_seconds": round(rebuild, 4),
+        "appends":         runs,
+    }
+
+
+def append_exponent(runs: list[dict]) -> float | None:
+    """Slope of log(seconds) over log(batch size); needs two sizes."""
+    if len(runs) < 2:
+        return None
+    batch = np.log([r["batch"] for r in runs])
+    secs  = np.log(np.maximum([r["seconds"] for r in runs], 1e-4))
+    return round(float(np.polyfit(batch, secs, 1)[0]), 3)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark incremental appends against batch size")
+    parser.add_argument("--rows",    type=float, default=2e5, help="dataset size, history + appended rows")
+    parser.add_argument("--batches", type=int, nargs="+", default=[50, 500, 2000])
+    parser.add_argument("--repeat",  type=int, default=3, help="appends per batch size, median kept")
+    parser.add_argument("--seed",    type=int, default=0)
+    parser.add_argument("--data",    default=os.path.join(HERE, "data"))
+    parser.add_argument("--max-share",    type=float, default=0.35, help="largest append / rebuild time")
+    parser.add_argument("--max-exponent", type=float, default=1.2, help="largest growth over batch size")
+    parser.add_argument("--out",     default=None, help="also write the results as JSON")
+    args = parser.parse_args()
+
+    csv_path, _ = ensure_dataset(args.data, int(args.rows), args.seed)
+    result = benchmark_appends(csv_path, args.batches, max(args.repeat, 1))
+    result["exponent"] = append_exponent(result["appends"])
+
+    rebuild = result["rebuild_seconds"]
+    print(f"[✓] {result['history_rows']:,} history rows  rebuild={rebuild:.3f}s")
+    failures = []
+    for run in result["appends"]:
+        share = run["seconds"] / rebuild if rebuild > 0 else 0.0
+        print(
+            f"    batch={run['batch']:>7,}  {run['seconds']:.3f}s  {share:6.1%} of rebuild  "
+            f"region={run['region_accounts']:,}{' (truncated)' if run['region_truncated'] else ''}"
+        )
+        if share > args.max_share:
+            failures.append(f"batch of {run['batch']:,} took {share:.0%} of a rebuild (> {args.max_share:.0%})")
+    if result["exponent"] is not None:
+        print(f"    append time ~ batch^{result['exponent']}")
+        if result["exponent"] > args.max_exponent:
+            failures.append(f"append time grows as batch^{result['exponent']} (> {args.max_exponent})")
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({"seed": args.seed, "environment": environment(), **result}, f, indent=2)
+        print(f"[✓] results → {args.out}")
+
+    if failures:
+        print("\n[!] append does not scale with the batch:")
+        for line in failures:
+            print(f"    {line}")
+        sys.exit(1)
+    print("\n[✓] append cost follows the batch")
+
+
+if __name__ == "__main__":
+    main()
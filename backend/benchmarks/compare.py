@@ -0,0 +1,92 @@
+"""
+Compare two benchmark results files (e.g. from two commits).
+
+    python -m benchmarks.compare results/<base>.json results/<head>.json
+
+Prints the per-stage time and peak RSS ratio for every size found in
+both files. Exits with status 1 when a stage got slower than the
+tolerance allows (stages faster than MIN_SECONDS in the base are too
+noisy to judge) or when fewer planted patterns were detected.
+"""
+
+import sys
+import json
+import argparse
+
+
+MIN_SECONDS = 0.05
+
+
+def _load(path: str) -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _by_size(results: dict) -> dict[int, dict]:
+    return {run.get("target_rows", run["rows"]): run for run in results["runs"]}
+
+
+def compare(base: dict, head: dict, tolerance: float = 0.15) -> tuple[list[dict], list[str]]:
+    """(rows of the comparison table, regression messages)."""
+    table, regressions = [], []
+    base_runs, head_runs = _by_size(base), _by_size(head)
+
+    for size in sorted(set(base_runs) & set(head_runs)):
+        b, h = base_runs[size], head_runs[size]
+
+        stages = [s for s in b["stages"] if s in h["stages"]]
+        for stage in stages + ["total"]:
+            bs = b["total_seconds"] if stage == "total" else b["stages"][stage]["seconds"]
+            hs = h["total_seconds"] if stage == "total" else h["stages"][stage]["seconds"]
+            bm = b["peak_rss_mb"] if stage == "total" else b["stages"][stage]["peak_rss_mb"]
+            hm = h["peak_rss_mb"] if stage == "total" else h["stages"][stage]["peak_rss_mb"]
+            ratio = hs / bs if bs > 0 else None
+            table.append({
+                "rows":      size,
+                "stage":     stage,
+                "base_s":    bs,
+                "head_s":    hs,
+                "ratio":     ratio,
+                "base_mb":   bm,
+                "head_mb":   hm,
+            })
+            if ratio is not None and bs >= MIN_SECONDS and ratio > 1 + tolerance:
+                regressions.append(f"{size:,} rows / {stage}: {bs:.3f}s → {hs:.3f}s (x{ratio:.2f})")
+
+        for kind, recall in b.get("planted_recall", {}).items():
+            now = h.get("planted_recall", {}).get(kind)
+            if recall is not None and now is not None and now < recall:
+                regressions.append(f"{size:,} rows / planted {kind}: recall {recall} → {now}")
+
+    return table, regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare two benchmark results files")
+    parser.add_argument("base")
+    parser.add_argument("head")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed slow-down, 0.15 = 15%%")
+    args = parser.parse_args()
+
+    base, head = _load(args.base), _load(args.head)
+    table, regressions = compare(base, head, args.tolerance)
+
+    print(f"base {base['environment'].get('commit')}  head {head['environment'].get('commit')}")
+    print(f"{'rows':>10}  {'stage':<12} {'base s':>9} {'head s':>9} {'ratio':>7} {'base MB':>9} {'head MB':>9}")
+    for r in table:
+        ratio = f"{r['ratio']:.2f}" if r["ratio"] is not None else "-"
+        print(
+            f"{r['rows']:>10,}  {r['stage']:<12} {r['base_s']:>9.3f} {r['head_s']:>9.3f} "
+            f"{ratio:>7} {r['base_mb']:>9.0f} {r['head_mb']:>9.0f}"
+        )
+
+    if regressions:
+        print("\n[!] regressions:")
+        for line in regressions:
+            print(f"    {line}")
+        sys.exit(1)
+    print("\n[✓] no regressions")
+
+
+if __name__ == "__main__":
+    main()
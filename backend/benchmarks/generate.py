@@ -0,0 +1,229 @@
+"""
+Seeded synthetic transaction data for benchmarks.
+
+Background traffic follows heavy-tailed (Pareto) sender and receiver
+activity, so a few hub accounts carry most of the edges, as in real
+ledgers. On top of it known patterns are planted on their own accounts:
+cycles, fan-in / fan-out bursts and layered shell chains. Their members
+are written to a ground-truth JSON next to the CSV, so a benchmark run
+can also check that every planted pattern is still detected.
+
+    python -m benchmarks.generate --rows 1000000 --seed 7 --out data/
+"""
+
+import os
+import json
+import argparse
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+
+START         = np.datetime64("2024-01-01T00:00:00", "s")
+SPAN_DAYS     = 90
+HOUR_S        = 3600
+CSV_CHUNK     = 1_000_000          # rows formatted + written per chunk
+DATE_FORMAT   = "%d/%m/%Y %H:%M:%S"
+COLUMNS       = ["transaction_id", "sender_id", "receiver_id", "amount", "timestamp"]
+
+
+def _pareto_weights(rng: np.random.Generator, n: int, alpha: float) -> np.ndarray:
+    w = rng.pareto(alpha, n) + 1.0
+    return w / w.sum()
+
+
+def _planted_counts(rows: int) -> dict:
+    # ~0.5% of all rows belong to planted patterns, never fewer than 5 each
+    k = max(5, rows // 4000)
+    return {"cycles": k, "fan_in": k, "fan_out": k, "shell_chains": k}
+
+
+class _Planter:
+    """
+    Appends planted transactions on fresh accounts (local codes from 0)
+    and records their members.
+    """
+
+    def __init__(self, rng: np.random.Generator) -> None:
+        self.rng  = rng
+        self.next = 0
+        self.src: list[int]   = []
+        self.dst: list[int]   = []
+        self.amt: list[float] = []
+        self.ts:  list[int]   = []
+        self.truth = {"cycles": [], "fan_in": [], "fan_out": [], "shell_chains": []}
+
+    def _accounts(self, k: int) -> list[int]:
+        codes = list(range(self.next, self.next + k))
+        self.next += k
+        return codes
+
+    def _start(self) -> int:
+        return int(self.rng.integers(0, (SPAN_DAYS - 4) * 24 * HOUR_S))
+
+    def _add(self, u: int, v: int, amount: float, t: int) -> None:
+        self.src.append(u)
+        self.dst.append(v)
+        self.amt.append(round(amount, 2))
+        self.ts.append(t)
+
+    def cycle(self, max_length: int) -> None:
+        length = int(self.rng.integers(3, max_length + 1))
+        ring   = self._accounts(length)
+        t      = self._start()
+        amount = float(self.rng.uniform(5_000, 50_000))
+        for i in range(length):
+            t += int(self.rng.integers(1, 12)) * HOUR_S
+            self._add(ring[i], ring[(i + 1) % length], amount, t)
+        self.truth["cycles"].append(ring)
+
+    def burst(self, pattern: str, threshold: int) -> None:
+        k     = int(self.rng.integers(threshold + 2, 2 * threshold + 1))
+        hub, *others = self._accounts(k + 1)
+        t     = self._start()
+        times = np.sort(self.rng.integers(0, 12 * HOUR_S, k)) + t
+        for other, ti in zip(others, times.tolist()):
+            amount = float(self.rng.uniform(500, 9_500))
+            if pattern == "fan_in":
+                self._add(other, hub, amount, ti)
+            else:
+                self._add(hub, other, amount, ti)
+        self.truth[pattern].append(hub)
+
+    def shell_chain(self, max_hops: int) -> None:
+        hops   = int(self.rng.integers(3, max_hops + 1))
+        chain  = self._accounts(hops + 1)
+        t      = self._start()
+        amount = float(self.rng.uniform(10_000, 100_000))
+        for i in range(hops):
+            # Each shell forwards slightly less, within hours of receiving
+            t      += int(self.rng.integers(1, 24)) * HOUR_S
+            self._add(chain[i], chain[i + 1], amount, t)
+            amount *= float(self.rng.uniform(0.95, 0.99))
+        self.truth["shell_chains"].append(chain)
+
+
+def generate_transactions(
+    rows:             int,
+    seed:             int   = 0,
+    accounts:         Optional[int] = None,
+    alpha:            float = 1.3,
+    max_cycle_length: int   = 5,
+    burst_threshold:  int   = 8,
+    max_shell_hops:   int   = 6,
+) -> tuple[dict[str, np.ndarray], dict]:
+    """
+    (columns, truth) for about `rows` transactions. Columns are raw arrays
+    (account codes, amounts, epoch seconds), shuffled in time; truth
+    holds the planted patterns by account label. Same arguments, same data.
+    """
+    rng    = np.random.default_rng(seed)
+    plant  = _Planter(rng)
+    counts = _planted_counts(rows)
+    for _ in range(counts["cycles"]):
+        plant.cycle(max_cycle_length)
+    for _ in range(counts["fan_in"]):
+        plant.burst("fan_in", burst_threshold)
+    for _ in range(counts["fan_out"]):
+        plant.burst("fan_out", burst_threshold)
+    for _ in range(counts["shell_chains"]):
+        plant.shell_chain(max_shell_hops)
+
+    n_planted = len(plant.src)
+    m         = max(rows - n_planted, 0)
+    n         = accounts or max(1_000, rows // 8)
+
+    # Sender and receiver activity are drawn independently, both heavy-tailed
+    out_w = _pareto_weights(rng, n, alpha)
+    in_w  = _pareto_weights(rng, n, alpha)
+    src   = rng.choice(n, size=m, p=out_w).astype(np.int64)
+    dst   = rng.choice(n, size=m, p=in_w).astype(np.int64)
+    amt   = np.round(rng.lognormal(8.0, 1.2, m), 2)
+    ts    = rng.integers(0, SPAN_DAYS * 24 * HOUR_S, m)
+
+    # Planted accounts are numbered after the background ones
+    offset = n
+    src = np.concatenate([src, np.asarray(plant.src, dtype=np.int64) + offset])
+    dst = np.concatenate([dst, np.asarray(plant.dst, dtype=np.int64) + offset])
+    amt = np.concatenate([amt, np.asarray(plant.amt, dtype=np.float64)])
+    ts  = np.concatenate([ts,  np.asarray(plant.ts, dtype=np.int64)])
+
+    order = rng.permutation(len(src))
+    columns = {
+        "src":    src[order],
+        "dst":    dst[order],
+        "amount": amt[order],
+        "ts":     ts[order],
+    }
+
+    def label(code: int) -> str:
+        return account_label(code + offset)
+
+    truth = {
+        "rows":         len(src),
+        "seed":         seed,
+        "accounts":     n + plant.next,
+        "cycles":       [[label(c) for c in ring] for ring in plant.truth["cycles"]],
+        "fan_in":       [label(c) for c in plant.truth["fan_in"]],
+        "fan_out":      [label(c) for c in plant.truth["fan_out"]],
+        "shell_chains": [[label(c) for c in chain] for chain in plant.truth["shell_chains"]],
+    }
+    return columns, truth
+
+
+def account_label(code) -> str:
+    return f"ACC{code:08d}"
+
+
+def write_csv(columns: dict[str, np.ndarray], path: str) -> None:
+    """Write generated columns as an upload-style CSV, CSV_CHUNK rows at a time."""
+    total = len(columns["src"])
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        f.write(",".join(COLUMNS) + "\n")
+        for lo in range(0, total, CSV_CHUNK):
+            hi = min(lo + CSV_CHUNK, total)
+            pd.DataFrame({
+                "transaction_id": np.char.add("TX", np.arange(lo, hi).astype("U")),
+                "sender_id":      np.char.add("ACC", np.char.zfill(columns["src"][lo:hi].astype("U"), 8)),
+                "receiver_id":    np.char.add("ACC", np.char.zfill(columns["dst"][lo:hi].astype("U"), 8)),
+                "amount":         columns["amount"][lo:hi],
+                "timestamp":      (START + columns["ts"][lo:hi]).astype("M8[s]"),
+            }).to_csv(f, header=False, index=False, float_format="%.2f", date_format=DATE_FORMAT)
+
+
+def dataset_paths(directory: str, rows: int, seed: int) -> tuple[str, str]:
+    stem = os.path.join(directory, f"transactions_{rows}_seed{seed}")
+    return f"{stem}.csv", f"{stem}.truth.json"
+
+
+def ensure_dataset(directory: str, rows: int, seed: int = 0) -> tuple[str, dict]:
+    """(csv path, truth) of a dataset, generated only if not on disk yet."""
+    csv_path, truth_path = dataset_paths(directory, rows, seed)
+    if os.path.exists(csv_path) and os.path.exists(truth_path):
+        with open(truth_path, "r", encoding="utf-8") as f:
+            return csv_path, json.load(f)
+
+    os.makedirs(directory, exist_ok=True)
+    columns, truth = generate_transactions(rows, seed)
+    write_csv(columns, f"{csv_path}.tmp")
+    os.replace(f"{csv_path}.tmp", csv_path)
+    with open(truth_path, "w", encoding="utf-8") as f:
+        json.dump(truth, f)
+    return csv_path, truth
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Generate synthetic transaction CSVs")
+    parser.add_argument("--rows", type=float, nargs="+", default=[1e4])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out",  default=os.path.join(os.path.dirname(__file__), "data"))
+    args = parser.parse_args()
+
+    for rows in args.rows:
+        path, truth = ensure_dataset(args.out, int(rows), args.seed)
+        print(f"[✓] {truth['rows']:,} rows, {truth['accounts']:,} accounts → {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+"""
+Scaling benchmark of the detection pipeline.
+
+For every size a seeded dataset is generated (or reused from --data),
+then parsed and analyzed in a fresh process, timing each stage: CSV
+parsing, Graph construction, MainEngine.__init__ and every stage of
+run_full_pipeline. Peak RSS is taken per stage (the kernel's high-water
+mark is reset before each one where /proc allows it, otherwise it is
+the process peak so far). Planted patterns are checked against what the
+detectors found, so a speed-up that loses detections shows up too.
+
+    python -m benchmarks.run --rows 1e4 1e5 1e6 --seed 0
+    python -m benchmarks.compare results/<old>.json results/<new>.json
+"""
+
+import os
+import json
+import time
+import argparse
+import platform
+import subprocess
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import scipy
+
+from graphs.build_graph import Graph
+from graphs.engine import MainEngine
+from graphs.profiling import StageProfile, reset_peak_rss
+from api.ingest import read_transactions_csv
+from .generate import ensure_dataset
+
+
+# Bump when the layout of a results file changes
+RESULTS_FORMAT = 1
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+STAGES = (
+    "read_csv", "graph_build", "engine_init",
+    "cycles", "smurfing", "shells", "scores", "rings", "report",
+)
+
+
+def _capture(engine: MainEngine, found: dict) -> None:
+    """Keep the detector outputs of run_full_pipeline in `found`."""
+    for name in ("detect_cycles", "detect_smurfing", "detect_layered_shells"):
+        method = getattr(engine, name)
+
+        def wrapped(*args, _method=method, _name=name, **kwargs):
+            found[_name] = _method(*args, **kwargs)
+            return found[_name]
+
+        setattr(engine, name, wrapped)
+
+
+def _fraction(hits: list[bool]):
+    return round(sum(hits) / len(hits), 4) if hits else None
+
+
+def planted_recall(truth: dict, found: dict) -> dict:
+    """Share of each kind of planted pattern the detectors reported."""
+    cycles = {frozenset(c["accounts"]) for c in found.get("detect_cycles", [])}
+    bursts = {(s["account"], s["pattern"]) for s in found.get("detect_smurfing", [])}
+    chains = {tuple(c["accounts"]) for c in found.get("detect_layered_shells", [])}
+    return {
+        "cycles":       _fraction([frozenset(c) in cycles for c in truth["cycles"]]),
+        "fan_in":       _fraction([(a, "fan_in") in bursts for a in truth["fan_in"]]),
+        "fan_out":      _fraction([(a, "fan_out") in bursts for a in truth["fan_out"]]),
+        "shell_chains": _fraction([tuple(c) in chains for c in truth["shell_chains"]]),
+    }
+
+
+def benchmark_file(csv_path: str, truth: dict) -> dict:
+    """One timed pass over a dataset; meant to run in a fresh process."""
+    profile = StageProfile()
+    total   = time.perf_counter()
+
+    with profile.stage("read_csv"):
+        df = read_transactions_csv(csv_path)
+    with profile.stage("graph_build"):
+        graph = Graph(raw_dataframe=df)
+        del df
+    with profile.stage("engine_init"):
+        engine = MainEngine(graph=graph)
+
+    found: dict = {}
+    _capture(engine, found)
+    report = engine.run_full_pipeline(profile=profile)
+
+    stages = {
+        name: {
+            "seconds":     entry["wall_seconds"],
+            "cpu_seconds": entry["cpu_seconds"],
+            "peak_rss_mb": entry["peak_rss_mb"],
+            "counts":      entry["counts"],
+        }
+        for name, entry in profile.stages.items()
+    }
+    return {
+        "rows":          len(graph.src),
+        "accounts":      graph.n_accounts,
+        "edges":         len(graph.csr.indices),
+        "total_seconds": round(time.perf_counter() - total, 4),
+        "peak_rss_mb":   profile.to_dict()["peak_rss_mb"],
+        "per_stage_rss": reset_peak_rss(),
+        "stages":        stages,
+        "found": {
+            "cycles":              len(found.get("detect_cycles", [])),
+            "smurfing":            len(found.get("detect_smurfing", [])),
+            "shell_chains":        len(found.get("detect_layered_shells", [])),
+            "fraud_rings":         report["summary"]["fraud_rings_detected"],
+            "suspicious_accounts": report["summary"]["suspicious_accounts_flagged"],
+        },
+        "planted_recall": planted_recall(truth, found),
+    }
+
+
+def _isolated(csv_path: str, truth: dict) -> dict:
+    # A fresh interpreter per pass, so no stage inherits memory or warm
+    # caches from the previous size
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as pool:
+        return pool.submit(benchmark_file, csv_path, truth).result()
+
+
+def _best_of(passes: list[dict]) -> dict:
+    """First pass, with every stage time replaced by its minimum over all passes."""
+    best = passes[0]
+    for stage in best["stages"]:
+        best["stages"][stage]["seconds"] = min(p["stages"][stage]["seconds"] for p in passes)
+    best["total_seconds"] = min(p["total_seconds"] for p in passes)
+    best["repeats"]       = len(passes)
+    return best
+
+
+def scaling_exponents(runs: list[dict]) -> dict:
+    """
+    Per stage, the slope of log(seconds) over log(rows): ~1 is linear,
+    ~2 quadratic. Needs at least two sizes.
+    """
+    if len(runs) < 2:
+        return {}
+    rows = np.log([r["rows"] for r in runs])
+    out  = {}
+    for stage in STAGES + ("total",):
+        secs = [
+            r["total_seconds"] if stage == "total" else r["stages"].get(stage, {}).get("seconds")
+            for r in runs
+        ]
+        if any(s is None for s in secs):
+            continue
+        slope = np.polyfit(rows, np.log(np.maximum(secs, 1e-4)), 1)[0]
+        out[stage] = round(float(slope), 3)
+    return out
+
+
+def environment() -> dict:
+    def git(*args):
+        try:
+            return subprocess.run(
+                ["git", *args], cwd=HERE, capture_output=True, text=True, timeout=30
+            ).stdout.strip() or None
+        except (OSError, subprocess.SubprocessError):
+            return None
+
+    status = git("status", "--porcelain")
+    return {
+        "commit":     git("rev-parse", "HEAD"),
+        "dirty":      bool(status),
+        "python":     platform.python_version(),
+        "numpy":      np.__version__,
+        "pandas":     pd.__version__,
+        "scipy":      scipy.__version__,
+        "platform":   platform.platform(),
+        "cpus":       os.cpu_count(),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+
+
+def _print_run(run: dict) -> None:
+    stages = "  ".join(f"{s}={v['seconds']:.3f}s" for s, v in run["stages"].items())
+    print(
+        f"[✓] {run['rows']:>10,} rows  total={run['total_seconds']:.2f}s  "
+        f"peak={run['peak_rss_mb']:.0f}MB  recall={run['planted_recall']}\n      {stages}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the detection pipeline")
+    parser.add_argument("--rows",   type=float, nargs="+", default=[1e4, 1e5, 1e6])
+    parser.add_argument("--seed",   type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=1, help="passes per size, best time kept")
+    parser.add_argument("--data",   default=os.path.join(HERE, "data"))
+    parser.add_argument("--out",    default=None, help="results file (default: results/<commit>.json)")
+    args = parser.parse_args()
+
+    env  = environment()
+    runs = []
+    for rows in sorted(int(r) for r in args.rows):
+        csv_path, truth = ensure_dataset(args.data, rows, args.seed)
+        run = _best_of([_isolated(csv_path, truth) for _ in range(max(args.repeat, 1))])
+        run["target_rows"] = rows
+        _print_run(run)
+        runs.append(run)
+
+    results = {
+        "format":      RESULTS_FORMAT,
+        "seed":        args.seed,
+        "environment": env,
+        "runs":        runs,
+        "scaling":     scaling_exponents(runs),
+    }
+
+    out = args.out or os.path.join(HERE, "results", f"{(env['commit'] or 'local')[:12]}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"[✓] scaling exponents {results['scaling']}")
+    print(f"[✓] results → {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+# The backend packages (graphs, api, benchmarks) import from this directory
@@ -1,9 +1,11 @@
 import re
+import numpy as np
 import pandas as pd 
 import networkx as nx 
-from pathlib import Path
+from scipy.sparse import csr_matrix, csc_matrix
 from .validation import InvalidColumnsError
-from typing import DefaultDict
+from .snapshot import encode_labels, decode_labels, write_snapshot, read_snapshot
+from .parsing import NAT_NS, parse_amounts, parse_timestamps
 
 
 class Graph:
@@ -20,20 +22,75 @@ class Graph:
 
     """
     raw dataframe will be be recived from api call
+
+    The graph is held column-wise: account IDs are factorized to int32
+    codes (`accounts[code]` gives the original ID), every transaction is
+    one (`src[i]`, `dst[i]`) edge aligned to row i of `dataframe`, and
+    the distinct directed edges are stored as CSR / CSC adjacency whose
+    data is the number of transactions on that edge. `amount` (float64)
+    and `ts_ns` (int64 ns, NaT_NS for missing) are the parsed numeric
+    columns; values that were present but could not be parsed are
+    counted in `parse_issues`. networkx graphs are only materialized
+    when `graph` / `structure_graph` are accessed.
+
+    save() / load() keep all of this as a memory-mapped snapshot; a
+    loaded graph builds `dataframe` only when something asks for it.
     """
 
     def __init__(self, raw_dataframe: pd.DataFrame) -> None:
-        self.dataframe = self._normalize_columns(df=raw_dataframe)
-        self.structure_graph = nx.DiGraph()
-        self.graph = nx.MultiDiGraph()
+        self.parse_issues: dict = {}
+        self._dataframe = self._normalize_columns(df=raw_dataframe, issues=self.parse_issues)
+        self._graph: nx.MultiDiGraph | None = None
+        self._structure_graph: nx.DiGraph | None = None
+        self._snapshot_path: str | None = None
         self._build_graph()
-        self._build_structure_graph()
+
+    @classmethod
+    def from_normalized(cls, dataframe: pd.DataFrame, accounts: np.ndarray | None = None) -> "Graph":
+        """
+        Build from a frame that already went through _normalize_columns
+        (e.g. a slice of another Graph's dataframe) without re-parsing it.
+        With `accounts` (every account of the frame, without repeats)
+        codes follow that order instead of first-seen order.
+        """
+        graph = cls.__new__(cls)
+        graph.parse_issues = {}
+        graph._dataframe = dataframe[cls.REQUIRED_COLUMNS].reset_index(drop=True)
+        graph._graph = None
+        graph._structure_graph = None
+        graph._snapshot_path = None
+        graph._build_graph(accounts)
+        return graph
+
+    @property
+    def dataframe(self) -> pd.DataFrame:
+        if self._dataframe is None:
+            # Loaded from a snapshot: rebuild the normalized columns
+            self._dataframe = self.frame()
+        return self._dataframe
+
+    def frame(self, rows: np.ndarray | None = None) -> pd.DataFrame:
+        """
+        Normalized columns of `rows` (all rows by default) built from the
+        arrays, so a snapshot-backed graph materializes only those rows.
+        """
+        if self._dataframe is not None:
+            return self._dataframe if rows is None else self._dataframe.iloc[rows]
+        pick = (lambda a: np.asarray(a)) if rows is None else (lambda a: np.asarray(a)[rows])
+        return pd.DataFrame({
+            "transaction_id": self.transaction_ids(rows),
+            "sender_id":      self.accounts[pick(self.src)],
+            "receiver_id":    self.accounts[pick(self.dst)],
+            "amount":         pick(self.amount),
+            "timestamp":      pick(self.ts_ns).view("M8[ns]"),
+        })
 
 
-    def _match_columns(self, df: pd.DataFrame):
+    @classmethod
+    def _match_columns(cls, df: pd.DataFrame):
         mapped_columns = {}
 
-        for standard_col, pattern in self.COLUMN_PATTERNS.items():
+        for standard_col, pattern in cls.COLUMN_PATTERNS.items():
             for real_col in df.columns:
                 if pattern.search(real_col):
                     mapped_columns[standard_col] = real_col
@@ -44,12 +101,19 @@ class Graph:
         return mapped_columns
     
 
-    def _normalize_columns(self, df: pd.DataFrame) -> pd.DataFrame:
-        mapping = self._match_columns(df=df)
+    @classmethod
+    def _normalize_columns(cls, df: pd.DataFrame, issues: dict | None = None) -> pd.DataFrame:
+        """
+        Required columns under their standard names, with `amount` as
+        float64 and `timestamp` as datetime64[ns]. Per column, the
+        inferred format and the missing / unparseable counts (with a few
+        example rows) are put in `issues` when one is passed.
+        """
+        mapping = cls._match_columns(df=df)
 
         df = df.rename(columns={v: k for k, v in mapping.items()})
 
-        df = df[self.REQUIRED_COLUMNS].copy()
+        df = df[cls.REQUIRED_COLUMNS].copy()
 
         df.columns = (
             df.columns
@@ -58,31 +122,217 @@ class Graph:
             .str.replace("\ufeff", "", regex=False)
         )
 
-        df["amount"] = (
-            df["amount"]
-            .astype(str)
-            .str.replace(r"[₹,]", "", regex=True)
-            .str.replace(r"(cr|dr)", "", regex=True, case=False)
-            .str.strip()
-        )
-        df["timestamp"] = pd.to_datetime(df["timestamp"], errors="coerce", dayfirst=True)
+        amount, amount_issues = parse_amounts(df["amount"])
+        ts_ns,  ts_issues     = parse_timestamps(df["timestamp"])
+        df["amount"]    = amount
+        df["timestamp"] = ts_ns.view("M8[ns]")
+        if issues is not None:
+            issues.update(amount=amount_issues, timestamp=ts_issues)
+
+        # A transaction without both endpoints cannot become an edge
+        df = df.dropna(subset=["sender_id", "receiver_id"])
 
         df = df.reset_index(drop=True)
 
         return df
     
-    def _build_graph(self):
-        for _, row in self.dataframe.iterrows():
-            self.graph.add_edge(
-                row['sender_id'],
-                row['receiver_id'],
-                transaction_id=row['transaction_id'],
-                amount=row['amount'],
-                timestamp=row['timestamp']
-            )
+    def _build_graph(self, accounts: np.ndarray | None = None):
+        m = len(self.dataframe)
+
+        # Interleave sender/receiver so codes follow first-seen order
+        ends = np.empty(2 * m, dtype=object)
+        ends[0::2] = self.dataframe["sender_id"].to_numpy(dtype=object)
+        ends[1::2] = self.dataframe["receiver_id"].to_numpy(dtype=object)
+        if accounts is None:
+            codes, uniques = pd.factorize(ends)
+        else:
+            uniques = np.asarray(accounts, dtype=object)
+            codes   = pd.Index(uniques).get_indexer(ends)
+
+        self.accounts: np.ndarray = np.asarray(uniques, dtype=object)
+        n = len(self.accounts)
+
+        self.src: np.ndarray = codes[0::2].astype(np.int32)
+        self.dst: np.ndarray = codes[1::2].astype(np.int32)
+
+        # Distinct (src, dst) pairs in row-major order == CSR order, so
+        # `edge_ids[i]` is also the position of transaction i in `csr.indices`
+        keys = self.src.astype(np.int64) * n + self.dst
+        edge_keys, edge_ids, multiplicity = np.unique(
+            keys, return_inverse=True, return_counts=True
+        )
+        self.edge_ids: np.ndarray = edge_ids.astype(np.int32)
+
+        rows = (edge_keys // max(n, 1)).astype(np.int32)
+        cols = (edge_keys %  max(n, 1)).astype(np.int32)
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=n), out=indptr[1:])
+
+        self.csr: csr_matrix = csr_matrix(
+            (multiplicity.astype(np.float32), cols, indptr), shape=(n, n)
+        )
+        self.csr.has_sorted_indices = True
+        self.csc: csc_matrix = self.csr.tocsc()
+
+        self.amount: np.ndarray = self.dataframe["amount"].to_numpy(dtype=np.float64)
+        self.ts_ns: np.ndarray = (
+            self.dataframe["timestamp"].dt.as_unit("ns").to_numpy().view(np.int64)
+        )
+        self._tx_ids: tuple | None = None
 
-    def _build_structure_graph(self):
-        self.structure_graph.add_edges_from(
-            (u, v) for u, v in self.graph.edges()
+    def transaction_ids(self, rows: np.ndarray | None = None) -> np.ndarray:
+        """Transaction IDs (object array) of all rows, or only of `rows`."""
+        if self._tx_ids is None:
+            ids = self.dataframe["transaction_id"].to_numpy(dtype=object)
+            return ids if rows is None else ids[rows]
+        array, kind = self._tx_ids
+        return decode_labels(array if rows is None else array[rows], kind)
+
+    def time_order(self) -> np.ndarray | None:
+        """
+        Stable row order by timestamp with NaT last, or None when the
+        rows already are in that order (e.g. a loaded snapshot).
+        """
+        ts    = np.asarray(self.ts_ns)
+        valid = ts != NAT_NS
+        k     = int(valid.sum())
+        if valid[:k].all() and not (np.diff(ts[:k]) < 0).any():
+            return None
+        return np.argsort(np.where(valid, ts, np.iinfo(np.int64).max), kind="stable")
+
+    # ─────────────────────────────────────────────────────────────────
+    # Snapshots
+    # ─────────────────────────────────────────────────────────────────
+    def save(self, path: str) -> None:
+        """
+        Write the graph as a snapshot directory. Rows are stored in time
+        order, so an engine built on the loaded graph needs no re-sort.
+        """
+        order = self.time_order()
+        pick  = (lambda a: np.asarray(a)) if order is None else (lambda a: np.asarray(a)[order])
+
+        accounts, accounts_kind = encode_labels(self.accounts)
+        if self._tx_ids is not None:
+            tx_ids, tx_kind = self._tx_ids
+            tx_ids = pick(tx_ids)
+        else:
+            tx_ids, tx_kind = encode_labels(pick(self.transaction_ids()))
+
+        write_snapshot(path, {
+            "accounts":    accounts,
+            "tx_ids":      tx_ids,
+            "src":         pick(self.src),
+            "dst":         pick(self.dst),
+            "edge_ids":    pick(self.edge_ids),
+            "amount":      pick(self.amount),
+            "ts_ns":       pick(self.ts_ns),
+            "csr_indptr":  self.csr.indptr,
+            "csr_indices": self.csr.indices,
+            "csr_data":    self.csr.data,
+            "csc_indptr":  self.csc.indptr,
+            "csc_indices": self.csc.indices,
+            "csc_data":    self.csc.data,
+        }, {
+            "accounts_kind":     accounts_kind,
+            "tx_ids_kind":       tx_kind,
+            "n_accounts":        self.n_accounts,
+            "n_transactions":    len(self.src),
+            "n_edges":           len(self.csr.indices),
+            "parse_issues":      self.parse_issues,
+        })
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "Graph":
+        """
+        Open a snapshot written by save(). With mmap=True every column is
+        a read-only memory map: nothing is parsed or copied except the
+        account labels, and processes loading the same path share pages.
+        """
+        arrays, meta = read_snapshot(path, mmap=mmap)
+        n = meta["n_accounts"]
+
+        graph = cls.__new__(cls)
+        graph.parse_issues = meta.get("parse_issues", {})
+        graph._dataframe = None
+        graph._graph = None
+        graph._structure_graph = None
+        graph._snapshot_path = path
+
+        graph.accounts = decode_labels(arrays["accounts"], meta["accounts_kind"])
+        graph.src      = arrays["src"]
+        graph.dst      = arrays["dst"]
+        graph.edge_ids = arrays["edge_ids"]
+        graph.amount   = arrays["amount"]
+        graph.ts_ns    = arrays["ts_ns"]
+        graph._tx_ids  = (arrays["tx_ids"], meta["tx_ids_kind"])
+
+        graph.csr = csr_matrix(
+            (arrays["csr_data"], arrays["csr_indices"], arrays["csr_indptr"]),
+            shape=(n, n), copy=False
+        )
+        graph.csr.has_sorted_indices = True
+        graph.csc = csc_matrix(
+            (arrays["csc_data"], arrays["csc_indices"], arrays["csc_indptr"]),
+            shape=(n, n), copy=False
+        )
+        return graph
+
+    def __reduce__(self):
+        # A mapped graph travels to worker processes as its path, so
+        # every worker maps the same pages instead of receiving a copy
+        if self._snapshot_path is not None:
+            return (Graph.load, (self._snapshot_path,))
+        return super().__reduce__()
+
+    @property
+    def n_accounts(self) -> int:
+        return len(self.accounts)
+
+    @property
+    def graph(self) -> nx.MultiDiGraph:
+        if self._graph is None:
+            self._graph = self.to_networkx(multi=True)
+        return self._graph
+
+    @property
+    def structure_graph(self) -> nx.DiGraph:
+        if self._structure_graph is None:
+            self._structure_graph = self.to_networkx(multi=False)
+        return self._structure_graph
+
+    def to_networkx(self, multi: bool = True) -> nx.DiGraph:
+        """
+        Materialize the transactions as a networkx graph (for visualization).
+        multi=True keeps one edge per transaction with its attributes,
+        multi=False keeps one edge per distinct (sender, receiver) pair.
+        """
+        labels = self.accounts.tolist()
+
+        if not multi:
+            G = nx.DiGraph()
+            G.add_nodes_from(labels)
+            coo = self.csr.tocoo()
+            G.add_edges_from(zip(
+                (labels[u] for u in coo.row.tolist()),
+                (labels[v] for v in coo.col.tolist()),
+            ))
+            return G
+
+        G = nx.MultiDiGraph()
+        G.add_nodes_from(labels)
+        df = self.dataframe
+        G.add_edges_from(
+            (labels[u], labels[v], {
+                "transaction_id": t,
+                "amount":         a,
+                "timestamp":      ts,
+            })
+            for u, v, t, a, ts in zip(
+                self.src.tolist(),
+                self.dst.tolist(),
+                df["transaction_id"].tolist(),
+                df["amount"].tolist(),
+                df["timestamp"].tolist(),
+            )
         )
-    
\ No newline at end of file
+        return G
@@ -0,0 +1,248 @@
+from bisect import bisect_right
+from typing import Optional
+
+import numpy as np
+
+
+# DFS steps allowed per start node before its search is abandoned
+MAX_STEPS_PER_NODE = 200_000
+
+
+def _time_feasible(edges: list, ts_ptr: list, ts_vals: list) -> bool:
+    """
+    True if some rotation of the cycle can be walked with strictly
+    increasing timestamps. `edges` are local edge positions in cycle
+    order; edge e's sorted timestamps are ts_vals[ts_ptr[e]:ts_ptr[e+1]].
+    Taking the earliest usable transaction on every hop is optimal.
+    """
+    L = len(edges)
+    for r in range(L):
+        t = None
+        for j in range(L):
+            e  = edges[(r + j) % L]
+            lo = ts_ptr[e] if t is None else bisect_right(ts_vals, t, ts_ptr[e], ts_ptr[e + 1])
+            if lo >= ts_ptr[e + 1]:
+                break
+            t = ts_vals[lo]
+        else:
+            return True
+    return False
+
+
+def enumerate_cycles(
+    indptr:       np.ndarray,
+    indices:      np.ndarray,
+    nodes:        np.ndarray,
+    min_length:   int,
+    max_length:   int,
+    max_per_node: int,
+    ts_ptr:       Optional[np.ndarray] = None,
+    ts_vals:      Optional[np.ndarray] = None,
+) -> list[tuple]:
+    """
+    Simple directed cycles with min_length..max_length accounts inside
+    one strongly connected component, given as a local CSR (`nodes[i]`
+    is the global code of local node i, in ascending order).
+
+    Each cycle is reported once, starting at its smallest node: the DFS
+    from start s only visits nodes > s, and a reverse BFS from s bounds
+    how far each node may still be from closing the loop. At most
+    `max_per_node` cycles are kept per start node. With ts_ptr/ts_vals
+    (sorted timestamps per local edge) only cycles whose transactions
+    can follow each other in time are kept.
+
+    Module-level and array-only so it can run in worker processes.
+    """
+    m        = len(nodes)
+    succ_ptr = indptr.tolist()
+    succ     = indices.tolist()
+    glob     = nodes.tolist()
+
+    order    = np.argsort(indices, kind="stable")
+    pred_ptr = np.concatenate([[0], np.cumsum(np.bincount(indices, minlength=m))]).tolist()
+    pred     = np.repeat(np.arange(m), np.diff(indptr))[order].tolist()
+
+    timed = ts_ptr is not None
+    if timed:
+        ts_ptr  = ts_ptr.tolist()
+        ts_vals = ts_vals.tolist()
+
+    found_cycles = []
+
+    for s in range(m):
+        # Hops from each node back to s, through nodes > s only
+        dist     = {s: 0}
+        frontier = [s]
+        for d in range(1, max_length):
+            nxt = []
+            for x in frontier:
+                for p in pred[pred_ptr[x]:pred_ptr[x + 1]]:
+                    if p > s and p not in dist:
+                        dist[p] = d
+                        nxt.append(p)
+            frontier = nxt
+        if len(dist) < min_length:
+            continue
+
+        found   = 0
+        steps   = 0
+        path    = [s]
+        epath   = []
+        on_path = {s}
+        stack   = [succ_ptr[s]]
+
+        while stack:
+            x = path[-1]
+            p = stack[-1]
+            if p == succ_ptr[x + 1] or found >= max_per_node or steps >= MAX_STEPS_PER_NODE:
+                stack.pop()
+                path.pop()
+                on_path.discard(x)
+                if epath:
+                    epath.pop()
+                continue
+
+            stack[-1] = p + 1
+            steps    += 1
+            y = succ[p]
+
+            if y == s:
+                if len(path) >= min_length and (
+                    not timed or _time_feasible(epath + [p], ts_ptr, ts_vals)
+                ):
+                    found_cycles.append(tuple(glob[i] for i in path))
+                    found += 1
+                continue
+
+            if y < s or y in on_path:
+                continue
+            d = dist.get(y)
+            if d is None or len(path) + d > max_length:
+                continue
+
+            path.append(y)
+            epath.append(p)
+            on_path.add(y)
+            stack.append(succ_ptr[y])
+
+    return found_cycles
+
+
+def cycles_through(
+    indptr:       np.ndarray,
+    indices:      np.ndarray,
+    nodes:        np.ndarray,
+    edges:        np.ndarray,
+    max_length:   int,
+    max_per_node: int,
+    kept:         np.ndarray,
+) -> list[tuple]:
+    """
+    Simple directed cycles of 3..max_length accounts that use one of
+    `edges` (local (u, v) pairs), in a local CSR laid out as for
+    enumerate_cycles. Only those cycles, not every cycle of the
+    component, are walked. Per edge u → v, the triangles are the
+    successors of v that precede u, all of them, as in
+    MainEngine.detect_cycles. Longer cycles come from a DFS from v back
+    to u, bounded by a reverse BFS from u over half the cycle length
+    (nodes it did not reach are at least one hop further). As in
+    enumerate_cycles, at most `max_per_node` of those are kept per start
+    node, counting the `kept[i]` that local node i already starts. Each
+    cycle is reported once, starting at its smallest node, however many
+    of `edges` it uses.
+    """
+    m        = len(nodes)
+    succ_ptr = indptr.tolist()
+    succ     = indices.tolist()
+    glob     = nodes.tolist()
+
+    order    = np.argsort(indices, kind="stable")
+    pred_ptr = np.concatenate([[0], np.cumsum(np.bincount(indices, minlength=m))]).tolist()
+    pred     = np.repeat(np.arange(m), np.diff(indptr))[order].tolist()
+
+    depth        = max_length // 2
+    room         = (max_per_node - kept).tolist()
+    found_cycles = []
+    seen         = set()
+
+    def report(path: list) -> None:
+        start = min(path)
+        k     = path.index(start)
+        cycle = tuple(glob[i] for i in path[k:] + path[:k])
+        if cycle in seen or (len(path) > 3 and room[start] <= 0):
+            return
+        seen.add(cycle)
+        found_cycles.append(cycle)
+        if len(path) > 3:
+            room[start] -= 1
+
+    for u, v in edges.tolist():
+        if u == v:
+            continue
+
+        # Triangles u → v → w → u, never capped
+        closing = set(pred[pred_ptr[u]:pred_ptr[u + 1]])
+        for w in succ[succ_ptr[v]:succ_ptr[v + 1]]:
+            if w != u and w != v and w in closing:
+                report([u, v, w])
+
+        # Hops from each node back to u, up to `depth`
+        dist     = {u: 0}
+        frontier = [u]
+        for d in range(1, depth + 1):
+            nxt = []
+            for x in frontier:
+                for p in pred[pred_ptr[x]:pred_ptr[x + 1]]:
+                    if p not in dist:
+                        dist[p] = d
+                        nxt.append(p)
+            frontier = nxt
+        if dist.get(v, depth + 1) > max_length - 1:
+            continue
+
+        steps   = 0
+        path    = [u, v]
+        on_path = {u, v}
+        stack   = [succ_ptr[v]]
+
+        while stack:
+            x = path[-1]
+            p = stack[-1]
+            if p == succ_ptr[x + 1] or steps >= MAX_STEPS_PER_NODE:
+                stack.pop()
+                on_path.discard(path.pop())
+                continue
+
+            stack[-1] = p + 1
+            steps    += 1
+            y = succ[p]
+
+            if y == u:
+                if len(path) >= 4:
+                    report(path)
+                continue
+
+            if y in on_path or len(path) + dist.get(y, depth + 1) > max_length:
+                continue
+
+            path.append(y)
+            on_path.add(y)
+            stack.append(succ_ptr[y])
+
+    return found_cycles
+
+
+def enumerate_components(payloads: list[tuple], params: tuple) -> list[tuple]:
+    """
+    Worker entry point: run enumerate_cycles over a batch of components,
+    each given as (indptr, indices, nodes, (ts_ptr, ts_vals) | None).
+    """
+    min_length, max_length, max_per_node = params
+    found = []
+    for indptr, indices, nodes, local_ts in payloads:
+        ts_ptr, ts_vals = local_ts if local_ts is not None else (None, None)
+        found.extend(enumerate_cycles(
+            indptr, indices, nodes, min_length, max_length, max_per_node,
+            ts_ptr=ts_ptr, ts_vals=ts_vals,
+        ))
+    return found
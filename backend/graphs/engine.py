@@ -1,11 +1,24 @@
-from .build_graph import Graph
-
+from .build_graph import Graph, NAT_NS
+from .cycles import enumerate_components
+from .features import FEATURE_INDEX, FEATURES, feature_matrix, flow_sums, hold_sums, seen_range
+from .profiling import StageProfile
+from .propagation import Direction, Weight, diffuse, transition_transpose
+
+import gc
+import os
+import heapq
 import time
+import inspect
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Optional
 import networkx as nx
-from collections import defaultdict, deque
+from collections import deque
+from itertools import chain, repeat
 import numpy as np
 import pandas as pd
-from scipy.sparse import csr_matrix
+from scipy.sparse import csr_matrix, triu, tril
+from scipy.sparse.csgraph import connected_components
 from sklearn.metrics import (
     precision_recall_curve,
     precision_score,
@@ -20,153 +33,1001 @@ def normalize_array(arr: np.ndarray) -> np.ndarray:
     return arr / max_val if max_val > 0 else np.zeros_like(arr)
 
 
-def _risk_level(score: float) -> str:
-    if score >= 70:  return "HIGH"
-    if score >= 40:  return "MED"
-    return "LOW"
+def _risk_levels(scores: np.ndarray) -> np.ndarray:
+    return np.select([scores >= 70, scores >= 40], ["HIGH", "MED"], "LOW").astype(object)
+
+
+# Pattern bits of the columnar report, in the (sorted) order of the
+# detected_patterns names they stand for
+_CYCLE, _FAN_IN, _FAN_OUT, _SHELL = 1, 2, 4, 8
+_PATTERN_BITS = ((_CYCLE, "cycle"), (_FAN_IN, "fan_in"), (_FAN_OUT, "fan_out"), (_SHELL, "layered_shell"))
+_DETECTED     = [[name for bit, name in _PATTERN_BITS if mask & bit] for mask in range(16)]
+
+def _structural_score(
+    cycle_members: np.ndarray, smurf_accounts: np.ndarray, shell_members: np.ndarray
+) -> np.ndarray:
+    return np.minimum(1.0, (
+        1.0 * cycle_members +
+        0.7 * smurf_accounts +
+        0.8 * shell_members
+    )).astype(np.float32)
+
+
+def _final_scores(
+    structural: np.ndarray,
+    in_deg:     np.ndarray,
+    out_deg:    np.ndarray,
+    network:    np.ndarray,
+    mean_deg:   float,
+    std_deg:    float,
+) -> np.ndarray:
+    """
+    0-100 suspicion score per account from its structural / network
+    components and degrees (shared by MainEngine and IncrementalEngine).
+    """
+    degrees = in_deg + out_deg
+
+    # BEHAVIORAL: (in_deg + out_deg) / 20, capped at 1 
+    behavioral = np.minimum(1.0, degrees / 20.0)
+
+    # STATISTICAL: z-score of degree, capped at 1 
+    z_scores    = np.abs(degrees - mean_deg) / std_deg
+    statistical = np.minimum(1.0, z_scores / 3.0)
+
+    # LEGITIMATE DAMPENING: heavy balanced traders 
+    # high in + out degree → established account, reduce suspicion
+    legitimate = np.where(
+        (in_deg > 50) & (out_deg > 50),
+        0.5,
+        0.0
+    ).astype(np.float32)
+
+    # FINAL SCORE (formula, vectorized sigmoid) 
+    raw = (
+        0.35 * structural  +
+        0.25 * behavioral  +
+        0.15 * statistical +
+        0.10 * network     -
+        0.25 * legitimate
+    ).astype(np.float64)
+
+    # Sigmoid scaled by 5 (matches: 100 / (1 + exp(-5*raw)))
+    return np.round(100.0 / (1.0 + np.exp(-5.0 * raw)), 2)
+
+
+@contextmanager
+def _gc_paused():
+    """
+    Pause the cyclic garbage collector while millions of small, acyclic
+    report lists and dicts are created; its passes would otherwise scan
+    them again and again. Also usable as a decorator.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def _pattern_columns(
+    codes_of: Callable, n: int, cycles: list, smurfing: list, shells: list
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Per account: bitmask of the patterns it is part of, and the index in
+    `smurfing` of its fan-in (column 0) and fan-out (column 1) burst, -1
+    where there is none.
+    """
+    mask  = np.zeros(n, dtype=np.uint8)
+    burst = np.full((n, 2), -1, dtype=np.int64)
+    mask[codes_of(a for c in cycles for a in c["accounts"])]   |= _CYCLE
+    mask[codes_of(a for sh in shells for a in sh["accounts"])] |= _SHELL
+    if smurfing:
+        codes = codes_of(s["account"] for s in smurfing)
+        side  = np.fromiter((s["pattern"] == "fan_out" for s in smurfing), dtype=bool, count=len(smurfing))
+        burst[codes, side.astype(np.int64)] = np.arange(len(smurfing))
+        # ufunc.at: an account can have both a fan-in and a fan-out burst
+        np.bitwise_or.at(mask, codes, np.where(side, _FAN_OUT, _FAN_IN).astype(np.uint8))
+    return mask, burst
+
+
+def _reason_lists(
+    mask:      np.ndarray,
+    burst:     np.ndarray,
+    smurfing:  list,
+    scores:    np.ndarray,
+    total_tx:  np.ndarray,
+    deg:       np.ndarray,
+    in_d:      np.ndarray,
+    out_d:     np.ndarray,
+    triangles: Callable[[np.ndarray], np.ndarray],
+) -> np.ndarray:
+    """
+    Reasons of every report row (arrays over the rows). Each kind of
+    reason is formatted only for the rows that have it; rows are then
+    grouped by which reasons they have and the lists of a group are
+    zipped together at once. `triangles(rows)` gives the directed
+    triangle counts of the given rows (only asked for cycle members).
+    """
+    n = len(mask)
+    texts:   list[np.ndarray] = []
+    present: list[np.ndarray] = []
+
+    def add(rows: np.ndarray, values) -> None:
+        col = np.empty(n, dtype=object)
+        col[rows] = list(values)
+        has = np.zeros(n, dtype=bool)
+        has[rows] = True
+        texts.append(col)
+        present.append(has)
+
+    # Activity gate
+    low = np.flatnonzero(total_tx < 5)
+    add(low, (f"activity_gate(total_tx={t},penalty=0.2)" for t in total_tx[low].tolist()))
+
+    # Cycle centrality (exact number of directed triangles this node is in)
+    rows = np.flatnonzero(mask & _CYCLE)
+    tri  = triangles(rows).tolist() if len(rows) else []
+    add(rows, (
+        f"cycle_centrality(deg={d},size={d + 1},triangles={k})"
+        for d, k in zip(deg[rows].tolist(), tri)
+    ))
+
+    # Fan-in / fan-out intensity: lifetime degree + peak window
+    for side, (bit, head, degree) in enumerate((
+        (_FAN_IN,  "fan_in_intensity(in=",   in_d),
+        (_FAN_OUT, "fan_out_intensity(out=", out_d),
+    )):
+        rows = np.flatnonzero(mask & bit)
+        add(rows, (
+            f"{head}{d},peak={smurfing[j]['counterparties']}/{smurfing[j]['window_hours']}h)"
+            for d, j in zip(degree[rows].tolist(), burst[rows, side].tolist())
+        ))
+
+    # Layered shell
+    rows = np.flatnonzero(mask & _SHELL)
+    add(rows, ["layered_shell_member"] * len(rows))
+
+    # Low activity cap
+    add(low, (
+        f"low_activity_cap(total_tx={t},score_cap={round(v, 1)})"
+        for t, v in zip(total_tx[low].tolist(), scores[low].tolist())
+    ))
+
+    # One key per combination of reasons (6 kinds fit in a byte)
+    present = np.stack(present)
+    key     = np.packbits(present, axis=0, bitorder="little")[0]
+
+    reasons = np.empty(n, dtype=object)
+    for k in np.unique(key).tolist():
+        rows = np.flatnonzero(key == k)
+        have = [col[rows] for col, p in zip(texts, present[:, rows[0]].tolist()) if p]
+        lists = map(list, zip(*have)) if have else ([] for _ in range(len(rows)))
+        reasons[rows] = np.fromiter(lists, dtype=object, count=len(rows))
+    return reasons
+
+
+@_gc_paused()
+def _suspicious_frame(
+    accounts:  list,
+    codes_of:  Callable,
+    picked:    np.ndarray,
+    scores:    np.ndarray,
+    patterns:  tuple[list, list, list],
+    rings:     list,
+    features:  np.ndarray,
+    triangles: Callable[[np.ndarray], np.ndarray],
+    network:   np.ndarray,
+) -> pd.DataFrame:
+    """
+    Report rows of the `picked` account codes, built column by column
+    from per-account arrays (shared by MainEngine and IncrementalEngine).
+    `patterns` is (cycles, smurfing, shells); `features` is the account
+    feature matrix (graphs/features.py); `triangles` maps account codes
+    to their directed triangle counts; `network` is the 0-1 propagated
+    risk of every account.
+    """
+    cycles, smurfing, shells = patterns
+    n = len(scores)
+    mask, burst = _pattern_columns(codes_of, n, cycles, smurfing, shells)
+
+    # Ring of every account; -1 picks the trailing None
+    ring_of = np.full(n, -1, dtype=np.int64)
+    if rings:
+        sizes = [len(r["member_accounts"]) for r in rings]
+        ring_of[codes_of(a for r in rings for a in r["member_accounts"])] = np.repeat(np.arange(len(rings)), sizes)
+    ring_ids = np.array([r["ring_id"] for r in rings] + [None], dtype=object)
+
+    mask  = mask[picked]
+    score = scores[picked]
+    feats = np.asarray(features[picked], dtype=np.float64)
+    col   = lambda name: feats[:, FEATURE_INDEX[name]]
+    in_d  = col("unique_senders").astype(np.int64)
+    out_d = col("unique_receivers").astype(np.int64)
+
+    reasons = _reason_lists(
+        mask      = mask,
+        burst     = burst[picked],
+        smurfing  = smurfing,
+        scores    = score,
+        total_tx  = (col("out_count") + col("in_count")).astype(np.int64),
+        deg       = in_d + out_d,
+        in_d      = in_d,
+        out_d     = out_d,
+        triangles = lambda rows: triangles(picked[rows]),
+    )
+
+    # detected_patterns: one (copied) name list per distinct bitmask
+    detected = np.empty(len(picked), dtype=object)
+    for m in np.unique(mask).tolist():
+        rows = np.flatnonzero(mask == m)
+        detected[rows] = np.fromiter(
+            map(list.copy, repeat(_DETECTED[m], len(rows))), dtype=object, count=len(rows)
+        )
 
+    return pd.DataFrame({
+        "account_id":        pd.Series(np.asarray(accounts, dtype=object)[picked], dtype=object),
+        "suspicion_score":   score,
+        "risk_level":        pd.Series(_risk_levels(score), dtype=object),
+        "reasons":           pd.Series(reasons, dtype=object),
+        "detected_patterns": pd.Series(detected, dtype=object),
+        "ring_id":           pd.Series(ring_ids[ring_of[picked]], dtype=object),
+        "network_risk":      np.round(np.asarray(network, dtype=np.float64)[picked], 4),
+        "in_amount":         np.round(col("in_amount"), 2),
+        "out_amount":        np.round(col("out_amount"), 2),
+        "pass_through":      np.round(col("pass_through"), 4),
+        "hold_hours":        np.round(col("hold_hours"), 2),
+    })
+
+
+@_gc_paused()
+def _records(frame: pd.DataFrame) -> list[dict]:
+    """Rows as plain dicts of Python values, for the JSON report."""
+    columns = list(frame.columns)
+    return [dict(zip(columns, row)) for row in zip(*(frame[c].tolist() for c in columns))]
+
+
+def _segment_positions(starts: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    """Concatenate the index ranges [starts[i], starts[i] + counts[i])."""
+    counts = np.asarray(counts, dtype=np.int64)
+    total  = int(counts.sum())
+    if total == 0:
+        return np.zeros(0, dtype=np.int64)
+    offsets = np.repeat(np.asarray(starts, dtype=np.int64) - (np.cumsum(counts) - counts), counts)
+    return offsets + np.arange(total, dtype=np.int64)
 
-_PATTERN_CLEAN = {
-    "cycle_length_3": "cycle",
-    "fan_in":         "fan_in",
-    "fan_out":        "fan_out",
-    "layered_shell":  "layered_shell",
-    "cycle":          "cycle",
-}
 
 class MainEngine:
+
+    # Longest cycle (in accounts) searched by the full pipeline, and how
+    # many cycles are kept per starting account
+    MAX_CYCLE_LENGTH    = 6
+    MAX_CYCLES_PER_NODE = 50
+
+    # Strongly connected components are searched in worker processes
+    # once they hold at least this many edges in total
+    PARALLEL_MIN_EDGES  = 50_000
+
+    # The pipeline runs the detectors per shard of weakly connected
+    # components (in worker processes) from this many transactions on
+    SHARDED_MIN_ROWS    = 500_000
+
+    # Accounts / rings sent with the partial results of run_full_pipeline
+    PARTIAL_TOP         = 10
+
+    @classmethod
+    def parameters(cls) -> dict:
+        """
+        Everything besides the input that shapes a pipeline report:
+        class limits plus the detector defaults. Used in cache keys.
+        """
+        params = {
+            "MAX_CYCLE_LENGTH":    cls.MAX_CYCLE_LENGTH,
+            "MAX_CYCLES_PER_NODE": cls.MAX_CYCLES_PER_NODE,
+        }
+        for method in (cls.detect_smurfing, cls.detect_layered_shells, cls.propagate_risk):
+            sig = inspect.signature(method)
+            params[method.__name__] = {
+                name: p.default for name, p in sig.parameters.items()
+                if p.default is not inspect.Parameter.empty
+            }
+        return params
+
     def __init__(self, graph: Graph) -> None:
         self.graph = graph
-        self.nx_graph: nx.MultiDiGraph = graph.graph
-        self._sg: nx.DiGraph = graph.structure_graph 
 
-        # Account index 
-        self._accounts: list = list(self._sg.nodes())
-        self._acc_idx:  dict = {a: i for i, a in enumerate(self._accounts)}
+        # Account index (code -> account id, account id -> code)
+        self._accounts: list = graph.accounts.tolist()
+        self._acc_idx:  dict = dict(zip(self._accounts, range(len(self._accounts))))
+        self._acc_index: Optional[pd.Index] = None
         n = len(self._accounts)
 
+        # Adjacency over distinct directed edges: CSR rows are successors,
+        # CSC columns are predecessors (sorted codes in both)
+        self._out_ptr = graph.csr.indptr
+        self._out_idx = graph.csr.indices
+        self._in_ptr  = graph.csc.indptr
+        self._in_idx  = graph.csc.indices
+        self._edge_src = np.repeat(
+            np.arange(n, dtype=np.int32), np.diff(self._out_ptr)
+        )
+
         # Degree vectors (used in scoring + stats) 
-        self._in_deg  = np.array([self._sg.in_degree(a)  for a in self._accounts], dtype=np.float32)
-        self._out_deg = np.array([self._sg.out_degree(a) for a in self._accounts], dtype=np.float32)
+        self._out_deg = np.diff(self._out_ptr).astype(np.float32)
+        self._in_deg  = np.diff(self._in_ptr).astype(np.float32)
         self._degrees = self._in_deg + self._out_deg           # total degree
 
         # Sparse adjacency for network risk (O(edges) multiply)
-        rows, cols = [], []
-        for u, v in self._sg.edges():
-            if u in self._acc_idx and v in self._acc_idx:
-                ui, vi = self._acc_idx[u], self._acc_idx[v]
-                rows += [ui, vi]
-                cols += [vi, ui]
-        self._adj = csr_matrix(
-            (np.ones(len(rows), dtype=np.float32), (rows, cols)),
+        # Undirected, an edge present in both directions counts twice
+        binary = csr_matrix(
+            (np.ones(len(self._out_idx), dtype=np.float32), self._out_idx, self._out_ptr),
             shape=(n, n)
         )
-
-        # Pre-cache successor/predecessor lists 
-        self._successors:   dict = {nd: list(self._sg.successors(nd))   for nd in self._sg.nodes()}
-        self._predecessors: dict = {nd: list(self._sg.predecessors(nd)) for nd in self._sg.nodes()}
-        self._degree_map:   dict = dict(self._sg.degree())
-
-        # DataFrame (only needed for smurfing timestamp windows)
-        df = graph.dataframe[
-            ["transaction_id", "sender_id", "receiver_id", "amount", "timestamp"]
-        ].copy()
-        df["amount"] = pd.to_numeric(df["amount"], errors="coerce")
-        df.sort_values("timestamp", inplace=True)
-        df.reset_index(drop=True, inplace=True)
-        df["ts_ns"] = df["timestamp"].values.astype(np.int64)
+        self._binary = binary
+        self._adj = (binary + binary.T).tocsr()
+
+        # Sorted (src * n + dst) keys of the distinct edges, for O(log E)
+        # vectorized edge-existence checks
+        self._edge_keys = self._edge_src.astype(np.int64) * n + self._out_idx
+        self._triangles:  Optional[np.ndarray] = None
+        self._tri_counts: Optional[np.ndarray] = None
+        self._edge_ts:    Optional[tuple] = None
+        self._hops:       Optional[dict] = None
+        self._network:    Optional[np.ndarray] = None
+
+        # Candidate counts of the last run of each detector (profiling)
+        self.counts: dict[str, dict] = {}
+
+        # Transactions in time order (stable, NaT last), straight from the
+        # graph's arrays: no copy at all when the graph is already sorted,
+        # as a loaded snapshot is. Accounts are categoricals over the codes.
+        self._order = graph.time_order()
+        pick  = (lambda a: np.asarray(a)) if self._order is None else (lambda a: np.asarray(a)[self._order])
+        src   = pick(graph.src)
+        dst   = pick(graph.dst)
+        ts_ns = pick(graph.ts_ns)
+        df = pd.DataFrame({
+            "sender_id":   pd.Categorical.from_codes(src, categories=graph.accounts, validate=False),
+            "receiver_id": pd.Categorical.from_codes(dst, categories=graph.accounts, validate=False),
+            "amount":      pick(graph.amount),
+            "timestamp":   ts_ns.view("M8[ns]"),
+            "src":         src,
+            "dst":         dst,
+            "ts_ns":       ts_ns,
+        }, copy=False)
         self._df = df
 
-        #  Pre-aggregated stats for behavioral/legitimate scoring 
-        self._s_count   = df.groupby("sender_id").size()
-        self._r_count   = df.groupby("receiver_id").size()
-        self._s_span    = df.groupby("sender_id")["ts_ns"].agg(["min", "max"])
-        self._r_span    = df.groupby("receiver_id")["ts_ns"].agg(["min", "max"])
-        self._uniq_recv = df.groupby("sender_id")["receiver_id"].nunique()
-        self._s_amount  = df.groupby("sender_id")["amount"].agg(["mean", "std"])
-        self._r_amount  = df.groupby("receiver_id")["amount"].agg(["mean", "std"])
+        # Account x feature matrix (rows in code order, columns FEATURES),
+        # from per-account sums reduced over the codes with bincount
+        self._flow  = flow_sums(src, dst, df["amount"].to_numpy(), ts_ns, n)
+        self._seen  = seen_range(src, dst, ts_ns, n)
+        self._holds = hold_sums(src, dst, ts_ns, n)
+        self.features: np.ndarray = feature_matrix(
+            self._flow, self._out_deg, self._in_deg, *self._seen, self._holds
+        )
+
+    # networkx views are built on first access only (visualization / export)
+    @property
+    def nx_graph(self) -> nx.MultiDiGraph:
+        return self.graph.graph
+
+    @property
+    def _sg(self) -> nx.DiGraph:
+        return self.graph.structure_graph
+
+    def _account_index(self) -> pd.Index:
+        """Accounts as a pandas Index, for vectorized label -> code lookups."""
+        if self._acc_index is None:
+            self._acc_index = pd.Index(self._accounts)
+        return self._acc_index
+
+    def feature_frame(self) -> pd.DataFrame:
+        """`features` as a DataFrame indexed by account ID."""
+        return pd.DataFrame(self.features, index=self._account_index(), columns=list(FEATURES))
+
+    def _codes_of(self, accounts) -> np.ndarray:
+        idx = self._acc_idx
+        return np.fromiter((idx[a] for a in accounts), dtype=np.int64)
+
+    def _has_edges(self, u: np.ndarray, v: np.ndarray) -> np.ndarray:
+        keys = np.asarray(u, dtype=np.int64) * len(self._accounts) + v
+        pos  = np.searchsorted(self._edge_keys, keys)
+        pos  = np.minimum(pos, max(len(self._edge_keys) - 1, 0))
+        return (self._edge_keys[pos] == keys) if len(self._edge_keys) else np.zeros(len(keys), dtype=bool)
+
+    def _transaction_ids(self, rows: np.ndarray) -> np.ndarray:
+        """Transaction IDs of `_df` rows (time order)."""
+        rows = np.asarray(rows, dtype=np.int64)
+        return self.graph.transaction_ids(rows if self._order is None else self._order[rows])
+
+    def _successors(self, code: int) -> np.ndarray:
+        return self._out_idx[self._out_ptr[code]:self._out_ptr[code + 1]]
+
+    def _predecessors(self, code: int) -> np.ndarray:
+        return self._in_idx[self._in_ptr[code]:self._in_ptr[code + 1]]
 
     # ─────────────────────────────────────────────────────────────────
     # 1. CYCLE DETECTION
-    #    Logic: explicit 3-node triangle check on the graph.
-    #    Faster than all_simple_paths for triangles — O(V × avg_degree²).
+    #    Logic: directed triangles u→v→w→u via masked sparse products.
+    #    With A the self-loop-free adjacency, U = triu(A) and L = tril(A),
+    #    (U @ A) ⊙ Lᵀ counts for every (u, w) the v with u→v→w→u and
+    #    u < v, u < w — i.e. each triangle once, rotated so the smallest
+    #    code comes first. The middle v is then recovered with a sorted
+    #    edge-key lookup. Rows are processed in blocks bounded by their
+    #    wedge count so hubs cannot blow up memory.
     #    Kept pure graph — no DataFrame involved.
     # ─────────────────────────────────────────────────────────────────
-    def detect_cycles(self) -> list[dict]:
-        cycles = []
-        G      = self._sg
-        succs  = self._successors
-
-        for u in G.nodes:
-            for v in succs.get(u, []):
-                if v == u:
-                    continue
-                for w in succs.get(v, []):
-                    if w == u or w == v:
-                        continue
-
-                    if G.has_edge(w, u):
-                        cycles.append({
-                            "accounts": [u, v, w],
-                            "pattern":  "cycle_length_3"
-                        })
+    def _triangle_codes(self, max_wedges: int = 20_000_000) -> np.ndarray:
+        if self._triangles is not None:
+            return self._triangles
+
+        n     = len(self._accounts)
+        loops = self._edge_src == self._out_idx
+        A  = csr_matrix(
+            (np.ones(int((~loops).sum()), dtype=np.float32),
+             (self._edge_src[~loops], self._out_idx[~loops])),
+            shape=(n, n)
+        )
+        U  = triu(A, k=1, format="csr")
+        LT = tril(A, k=-1, format="csr").T.tocsr()
+        AT = A.T.tocsr()                                 # rows = predecessors
+        u_deg  = np.diff(U.indptr)
+        in_deg = np.diff(AT.indptr)
+
+        # Only rows that can close a candidate are worth expanding
+        rows   = np.flatnonzero((u_deg > 0) & (np.diff(LT.indptr) > 0))
+        wedges = (U[rows] @ np.diff(A.indptr).astype(np.float64))
+        cum    = np.concatenate([[0.0], np.cumsum(wedges)])
+
+        found = []
+        lo    = 0
+        while lo < len(rows):
+            hi    = int(np.searchsorted(cum, cum[lo] + max_wedges, side="right")) - 1
+            hi    = max(hi, lo + 1)
+            block = rows[lo:hi]
+            lo    = hi
+
+            P = (U[block] @ A).multiply(LT[block]).tocoo()
+            if not P.nnz:
+                continue
+            pu = block[P.row].astype(np.int64)
+            pw = P.col.astype(np.int64)
+
+            # Recover v by scanning the shorter side of each (u, w) pair:
+            # successors v > u of u (check v→w) or predecessors v of w
+            # (check v > u and u→v)
+            by_u = u_deg[pu] <= in_deg[pw]
+
+            cu, cw = pu[by_u], pw[by_u]
+            counts = u_deg[cu]
+            v      = U.indices[_segment_positions(U.indptr[cu], counts)]
+            cu, cw = np.repeat(cu, counts), np.repeat(cw, counts)
+            hit    = (v != cw) & self._has_edges(v, cw)
+            found.append(np.column_stack([cu[hit], v[hit], cw[hit]]))
+
+            cu, cw = pu[~by_u], pw[~by_u]
+            counts = in_deg[cw]
+            v      = AT.indices[_segment_positions(AT.indptr[cw], counts)]
+            cu, cw = np.repeat(cu, counts), np.repeat(cw, counts)
+            hit    = (v > cu) & self._has_edges(cu, v)
+            found.append(np.column_stack([cu[hit], v[hit], cw[hit]]))
+
+        self._triangles = (
+            np.concatenate(found).astype(np.int32) if found
+            else np.zeros((0, 3), dtype=np.int32)
+        )
+        return self._triangles
+
+    def _edge_timestamps(self) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Sorted transaction timestamps of every distinct edge:
+        edge e (CSR position) owns vals[ptr[e]:ptr[e + 1]]. NaT is dropped.
+        """
+        if self._edge_ts is None:
+            ts    = np.asarray(self.graph.ts_ns)
+            valid = ts != NAT_NS
+            eid   = np.asarray(self.graph.edge_ids)[valid]
+            vals  = ts[valid]
+            order = np.lexsort((vals, eid))
+            ptr   = np.zeros(len(self._out_idx) + 1, dtype=np.int64)
+            np.cumsum(np.bincount(eid, minlength=len(self._out_idx)), out=ptr[1:])
+            self._edge_ts = (ptr, vals[order])
+        return self._edge_ts
+
+    def _component_payloads(self, min_size: int, time_ordered: bool) -> list[tuple]:
+        """
+        Local CSR (+ per-edge timestamps) of every strongly connected
+        component with at least `min_size` accounts, largest first.
+        """
+        n = len(self._accounts)
+        n_comp, labels = connected_components(
+            self._binary, directed=True, connection="strong"
+        )
+        sizes = np.bincount(labels, minlength=n_comp)
+        keep  = np.flatnonzero(sizes >= min_size)
+        if not len(keep):
+            return []
+
+        # Edge positions travel as data (+1 so position 0 survives)
+        positions = csr_matrix(
+            (np.arange(1, len(self._out_idx) + 1, dtype=np.int64), self._out_idx, self._out_ptr),
+            shape=(n, n)
+        )
+        order  = np.argsort(labels, kind="stable")
+        starts = np.concatenate([[0], np.cumsum(sizes)])
+        if time_ordered:
+            ts_ptr, ts_vals = self._edge_timestamps()
+
+        payloads = []
+        for c in keep[np.argsort(-sizes[keep], kind="stable")].tolist():
+            nodes = order[starts[c]:starts[c + 1]]
+            sub   = positions[nodes][:, nodes]
+            sub.sort_indices()
+            local_ts = None
+            if time_ordered:
+                e      = sub.data - 1
+                counts = ts_ptr[e + 1] - ts_ptr[e]
+                local_ts = (
+                    np.concatenate([[0], np.cumsum(counts)]),
+                    ts_vals[_segment_positions(ts_ptr[e], counts)],
+                )
+            payloads.append((sub.indptr, sub.indices, nodes.astype(np.int64), local_ts))
+        return payloads
 
+    def detect_cycles(
+        self,
+        max_length:          int = 3,
+        max_cycles_per_node: int = 50,
+        time_ordered:        bool = False,
+        workers:             Optional[int] = None,
+    ) -> list[dict]:
+        """
+        Directed cycles of 3..max_length accounts, each reported once as
+        "cycle_length_<k>" starting at its smallest account code.
+
+        Triangles come from the sparse-product search above. Longer cycles
+        (and all cycles when time_ordered, which keeps only cycles whose
+        transactions can follow each other in time) are enumerated per
+        strongly connected component, capped at max_cycles_per_node per
+        starting account, in up to `workers` processes (default: cores).
+        """
+        acc      = self._accounts
+        cycles   = []
+        min_dfs  = 3 if time_ordered else 4
+
+        if not time_ordered:
+            cycles = [
+                {"accounts": [acc[u], acc[v], acc[w]], "pattern": "cycle_length_3"}
+                for u, v, w in self._triangle_codes().tolist()
+            ]
+        self.counts["cycles"] = {"triangles": len(cycles), "components": 0, "component_edges": 0}
+        if max_length < min_dfs:
+            return cycles
+
+        payloads = self._component_payloads(min_dfs, time_ordered)
+        params   = (min_dfs, max_length, max_cycles_per_node)
+        workers  = workers or os.cpu_count() or 1
+        n_edges  = sum(len(p[1]) for p in payloads)
+        self.counts["cycles"].update(components=len(payloads), component_edges=n_edges)
+
+        if workers > 1 and len(payloads) > 1 and n_edges >= self.PARALLEL_MIN_EDGES:
+            # Largest components first, small ones batched to ~equal edge counts
+            tasks, batch, batch_edges = [], [], 0
+            target = max(n_edges // (4 * workers), 1)
+            for p in payloads:
+                batch.append(p)
+                batch_edges += len(p[1])
+                if batch_edges >= target:
+                    tasks.append(batch)
+                    batch, batch_edges = [], 0
+            if batch:
+                tasks.append(batch)
+
+            with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+                parts = list(pool.map(enumerate_components, tasks, [params] * len(tasks)))
+            found = [c for part in parts for c in part]
+        else:
+            found = enumerate_components(payloads, params)
+
+        cycles.extend(
+            {"accounts": [acc[i] for i in cyc], "pattern": f"cycle_length_{len(cyc)}"}
+            for cyc in found
+        )
         return cycles
 
+    def _triangle_count_vector(self) -> np.ndarray:
+        if self._tri_counts is None:
+            self._tri_counts = np.bincount(
+                self._triangle_codes().ravel(), minlength=len(self._accounts)
+            )
+        return self._tri_counts
+
+    def triangle_counts(self) -> dict:
+        """Number of directed 3-cycles each account belongs to (non-zero only)."""
+        counts = self._triangle_count_vector()
+        acc    = self._accounts
+        return {acc[i]: int(counts[i]) for i in np.flatnonzero(counts).tolist()}
+
     # ─────────────────────────────────────────────────────────────────
     # 2. SMURFING DETECTION
-    #    Logic: in_degree / out_degree threshold on graph.
-    #    No DataFrame scanning needed — pure graph structural check.
-    #    Much faster than sliding timestamp windows for large datasets.
+    #    Logic: distinct counterparties inside a sliding time window.
+    #    A window [a, a + W] contains a transaction at t iff a ∈ [t - W, t],
+    #    so each (account, counterparty) pair contributes merged intervals
+    #    of window starts; the peak number of overlapping intervals per
+    #    account (one sort + one cumulative sweep over NumPy arrays) is
+    #    the peak number of distinct counterparties in any W-long window.
+    #    O(n log n) over the timestamp-sorted transactions.
     # ─────────────────────────────────────────────────────────────────
-    def detect_smurfing(self, threshold: int = 8) -> list[dict]:
-        suspicious = []
-        G          = self._sg
+    @staticmethod
+    def _window_peaks(
+        acc: np.ndarray, cp: np.ndarray, t: np.ndarray, window_ns: int
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        For every account in `acc`: (account codes, peak distinct
+        counterparties within window_ns, start of the first peak window).
+        Times are int64 ns.
+        """
+        if not len(acc):
+            empty = np.zeros(0, dtype=np.int64)
+            return empty, empty, empty
+
+        order      = np.lexsort((t, cp, acc))
+        acc, cp, t = acc[order], cp[order], t[order]
+
+        # A new interval starts at a new pair or after a gap longer than W
+        new_pair = np.ones(len(acc), dtype=bool)
+        new_pair[1:] = (acc[1:] != acc[:-1]) | (cp[1:] != cp[:-1])
+        new_run  = new_pair.copy()
+        new_run[1:] |= (t[1:] - window_ns) > t[:-1]
+
+        first = np.flatnonzero(new_run)
+        last  = np.append(first[1:] - 1, len(acc) - 1)
+        r_acc = acc[first]
+
+        # Sweep events: +1 at interval start before -1 at an equal end
+        ev_acc  = np.concatenate([r_acc, r_acc])
+        ev_time = np.concatenate([t[first] - window_ns, t[last]])
+        ev_kind = np.concatenate([np.zeros(len(first), np.int8), np.ones(len(first), np.int8)])
+        order   = np.lexsort((ev_kind, ev_time, ev_acc))
+        ev_acc, ev_time = ev_acc[order], ev_time[order]
+        level   = np.cumsum(np.where(ev_kind[order] == 0, 1, -1))
+
+        # Each account's events sum to zero, so the global running sum
+        # restarts at 0 for every account group
+        starts  = np.flatnonzero(np.append(True, ev_acc[1:] != ev_acc[:-1]))
+        peak    = np.maximum.reduceat(level, starts)
+        group   = np.repeat(np.arange(len(starts)), np.diff(np.append(starts, len(ev_acc))))
+        at_peak = np.flatnonzero(level == peak[group])
+        _, hit  = np.unique(group[at_peak], return_index=True)
+
+        # The event after a peak is always an interval end: the latest
+        # window start on that plateau, which sits on a real transaction
+        return ev_acc[starts], peak, ev_time[at_peak[hit] + 1]
+
+    def detect_smurfing(
+        self,
+        threshold:     int = 8,
+        windows_hours: tuple = (24, 72),
+    ) -> list[dict]:
+        """
+        fan_in / fan_out: at least `threshold` distinct senders / receivers
+        within one window. Windows are tried shortest first; the first
+        one that triggers is reported with its peak count and position.
+        """
+        df    = self._df
+        valid = df["timestamp"].notna().to_numpy() & (df["src"].to_numpy() != df["dst"].to_numpy())
+        src   = df["src"].to_numpy()[valid]
+        dst   = df["dst"].to_numpy()[valid]
+        t     = df["ts_ns"].to_numpy()[valid]
+        self.counts["smurfing"] = {"transactions": len(t)}
+
+        found: dict = {}
+        for pattern, acc, cp in (("fan_in", dst, src), ("fan_out", src, dst)):
+            for hours in sorted(windows_hours):
+                window_ns = int(hours * 3_600_000_000_000)
+                codes, peak, start = self._window_peaks(acc, cp, t, window_ns)
+                hit = peak >= threshold
+                for i, k, a in zip(codes[hit].tolist(), peak[hit].tolist(), start[hit].tolist()):
+                    if (i, pattern) not in found:
+                        found[(i, pattern)] = {
+                            "account":        self._accounts[i],
+                            "pattern":        pattern,
+                            "window_hours":   hours,
+                            "counterparties": k,
+                            "window_start":   pd.Timestamp(a).isoformat(),
+                            "window_end":     pd.Timestamp(a + window_ns).isoformat(),
+                        }
+
+        # Account order, fan_in before fan_out
+        return [found[key] for key in sorted(found, key=lambda k: (k[0], k[1] != "fan_in"))]
 
-        for node in G.nodes:
-            in_d  = G.in_degree(node)
-            out_d = G.out_degree(node)
+    # ─────────────────────────────────────────────────────────────────
+    # 3. LAYERED SHELL DETECTION
+    #    Logic: chains of 3..k transactions A→B→C→…, where every
+    #    intermediate is a low-out-degree shell, each hop leaves the shell
+    #    after the money arrived (within a dwell window) and forwards an
+    #    amount within a tolerance of what it received.
+    #    Frontier expansion over transaction arrays sorted by
+    #    (sender, time): the next hops of a whole frontier are found with
+    #    two searchsorted calls, then filtered by amount and by revisits.
+    #    Hard caps on frontier size and wall time bound the search.
+    # ─────────────────────────────────────────────────────────────────
+    def _hop_index(self) -> dict:
+        """Usable transactions (timestamp, amount > 0, no self-transfer) sorted by (sender, time)."""
+        if self._hops is None:
+            df    = self._df
+            src   = df["src"].to_numpy()
+            dst   = df["dst"].to_numpy()
+            amt   = df["amount"].to_numpy(dtype=np.float64)
+            t     = df["ts_ns"].to_numpy()
+            rows  = np.flatnonzero(df["timestamp"].notna().to_numpy() & (amt > 0) & (src != dst))
+            rows  = rows[np.lexsort((t[rows], src[rows]))]
+
+            # (sender, time-rank) packed into one sorted int64 key
+            uniq_t = np.unique(t[rows])
+            stride = len(uniq_t) + 1
+            self._hops = {
+                "row":    rows,
+                "src":    src[rows],
+                "dst":    dst[rows],
+                "amt":    amt[rows],
+                "t":      t[rows],
+                "uniq_t": uniq_t,
+                "stride": stride,
+                "key":    src[rows].astype(np.int64) * stride + np.searchsorted(uniq_t, t[rows]),
+            }
+        return self._hops
+
+    @staticmethod
+    def _extend_hops(
+        h:         dict,
+        last:      np.ndarray,
+        shell_ok:  np.ndarray,
+        dwell_ns:  int,
+        tolerance: float,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Valid next hops for chains ending in transactions `last`:
+        (index into `last`, next transaction) pairs.
+        """
+        par  = np.flatnonzero(shell_ok[h["dst"][last]])
+        last = last[par]
+        base = h["dst"][last].astype(np.int64) * h["stride"]
+        t0   = h["t"][last]
+
+        r_lo = np.searchsorted(h["uniq_t"], t0)
+        r_hi = np.searchsorted(h["uniq_t"], t0 + dwell_ns, side="right") - 1
+        lo   = np.searchsorted(h["key"], base + r_lo, side="right")   # strictly later
+        hi   = np.searchsorted(h["key"], base + r_hi, side="right")
+        counts = np.maximum(hi - lo, 0)
+
+        child  = _segment_positions(lo, counts)
+        parent = np.repeat(np.arange(len(last)), counts)
+
+        received = h["amt"][last[parent]]
+        keep     = np.abs(h["amt"][child] - received) <= tolerance * received
+        return par[parent[keep]], child[keep]
+
+    @staticmethod
+    def _extends_back(h: dict, tx: np.ndarray, pred_child: np.ndarray, pred_parent: np.ndarray) -> np.ndarray:
+        """
+        Which chains (rows of transactions `tx`) a valid earlier hop can
+        extend onto an account they do not visit yet, given the one-hop
+        pairs (pred_parent → pred_child) sorted by pred_child.
+        """
+        lo     = np.searchsorted(pred_child, tx[:, 0])
+        counts = np.searchsorted(pred_child, tx[:, 0], side="right") - lo
+        owner  = np.repeat(np.arange(len(tx)), counts)
+
+        new_acc = h["src"][pred_parent[_segment_positions(lo, counts)]]
+        clash   = new_acc == h["src"][tx[owner, 0]]
+        for k in range(tx.shape[1]):
+            clash |= new_acc == h["dst"][tx[owner, k]]
+
+        extendable = np.zeros(len(tx), dtype=bool)
+        extendable[owner[~clash]] = True
+        return extendable
+
+    def detect_layered_shells(
+        self,
+        min_hops:             int   = 3,
+        max_hops:             int   = 6,
+        amount_tolerance:     float = 0.10,
+        max_dwell_hours:      float = 72,
+        max_shell_out_degree: int   = 2,
+        max_frontier:         int   = 2_000_000,
+        time_budget_s:        float = 30.0,
+    ) -> list[dict]:
+        h        = self._hop_index()
+        acc      = self._accounts
+        deadline = time.perf_counter() + time_budget_s
+        dwell_ns = int(max_dwell_hours * 3_600_000_000_000)
+        shell_ok = self._out_deg <= max_shell_out_degree
+
+        # One hop from every transaction. Every pair starts a chain, since
+        # whether an earlier hop extends a chain depends on all of its
+        # accounts; chains that one still extends are dropped when they
+        # end, in favour of the longer chain
+        parent, child = self._extend_hops(
+            h, np.arange(len(h["t"])), shell_ok, dwell_ns, amount_tolerance
+        )
+        order  = np.argsort(child, kind="stable")
+        before = (child[order], parent[order])
+        paths  = np.column_stack([parent, child])
+        paths  = paths[h["dst"][paths[:, 1]] != h["src"][paths[:, 0]]]
+
+        def maximal(tx: np.ndarray, hops: int) -> np.ndarray:
+            # A chain of max_hops is kept: the longer one was cut short
+            return tx if hops >= max_hops else tx[~self._extends_back(h, tx, *before)]
+
+        chains    = []
+        hops      = 2
+        explored  = len(paths)
+        truncated = False
+        while len(paths) and hops < max_hops:
+            if time.perf_counter() > deadline:
+                print(f"[!] layered shell search hit its time budget at {hops} hops")
+                truncated = True
+                break
+
+            parent, child = self._extend_hops(
+                h, paths[:, -1], shell_ok, dwell_ns, amount_tolerance
+            )
 
-            if in_d >= threshold:
-                suspicious.append({"account": node, "pattern": "fan_in"})
-            if out_d >= threshold:
-                suspicious.append({"account": node, "pattern": "fan_out"})
+            # No account may appear twice in a chain
+            new_acc = h["dst"][child]
+            clash   = new_acc == h["src"][paths[parent, 0]]
+            for k in range(hops):
+                clash |= new_acc == h["dst"][paths[parent, k]]
+            parent, child = parent[~clash], child[~clash]
+
+            if hops >= min_hops:
+                extended = np.zeros(len(paths), dtype=bool)
+                extended[parent] = True
+                chains.append(maximal(paths[~extended], hops))
+
+            paths = np.column_stack([paths[parent], child])
+            hops += 1
+            explored += len(paths)
+            if len(paths) > max_frontier:
+                print(f"[!] layered shell frontier capped at {max_frontier} chains ({hops} hops)")
+                paths     = paths[:max_frontier]
+                truncated = True
+
+        if hops >= min_hops and len(paths):
+            chains.append(maximal(paths, hops))
+        self.counts["shells"] = {
+            "hop_transactions": len(h["t"]),
+            "paths_explored":   explored,
+            "truncated":        int(truncated),
+        }
 
-        return suspicious
+        results = []
+        for tx in chains:
+            if not len(tx):
+                continue
+            members = np.column_stack([h["src"][tx[:, 0]], h["dst"][tx]])
+
+            # Same account sequence via different transactions → one chain
+            _, first = np.unique(members, axis=0, return_index=True)
+            first    = np.sort(first)
+            rows     = h["row"][tx[first]]
+            tx_ids   = self._transaction_ids(rows.ravel()).reshape(rows.shape)
+            for path, ids in zip(members[first].tolist(), tx_ids.tolist()):
+                results.append({
+                    "accounts":        [acc[a] for a in path],
+                    "pattern":         "layered_shell",
+                    "hops":            len(ids),
+                    "transaction_ids": ids,
+                })
+
+        return results
 
     # ─────────────────────────────────────────────────────────────────
-    # 3. LAYERED SHELL DETECTION
-    #    Logic: node → low-out-degree neighbour → next hop.
-    #    Kept as constrained iterative DFS with dedup and hard cap to
-    #    prevent path explosion on dense graphs.
+    # SHARDED DETECTION
+    #    Logic: every pattern lies inside one weakly connected component
+    #    (cycles, chains and bursts follow edges, and an account's
+    #    degrees and counterparties are all in its component), so the
+    #    detectors can run per component. Components too small for any
+    #    pattern are dropped, the rest are bin-packed into balanced
+    #    shards and detected in worker processes; scores, threshold,
+    #    rings and report stay global.
     # ─────────────────────────────────────────────────────────────────
-    def detect_layered_shells(self) -> list[dict]:
-        suspicious_chains = []
-        G         = self._sg
-        succs     = self._successors
-        seen_sets = set()
-        MAX_PATHS = 500
-
-        for node in G.nodes:
-            for neighbor in succs.get(node, []):
-                # Shell intermediate must have low out-degree (≤ 2)
-                if G.out_degree(neighbor) > 2:
-                    continue
-                count = 0
-                for next_node in succs.get(neighbor, []):
-                    if next_node == node or count >= MAX_PATHS:
-                        continue
-                    path = [node, neighbor, next_node]
-                    key  = frozenset(path)
-                    if key not in seen_sets:
-                        seen_sets.add(key)
-                        suspicious_chains.append({
-                            "accounts": path,
-                            "pattern":  "layered_shell"
-                        })
-                        count += 1
-
-        return suspicious_chains
+    def shard_plan(self, shards: int, min_accounts: int = 3, min_edges: int = 3) -> list[np.ndarray]:
+        """
+        Graph rows (transactions) of up to `shards` shards. Components
+        with fewer than `min_accounts` accounts or `min_edges` distinct
+        edges (the smallest pattern is a triangle) are left out; the rest
+        go largest first to the least loaded shard by transaction count.
+        """
+        n_comp, labels = connected_components(self._binary, directed=True, connection="weak")
+        sizes = np.bincount(labels, minlength=n_comp)
+        edges = np.bincount(labels[self._edge_src], minlength=n_comp)
+        row_comp = labels[np.asarray(self.graph.src)]
+        rows  = np.bincount(row_comp, minlength=n_comp)
+        keep  = np.flatnonzero((sizes >= min_accounts) & (edges >= min_edges))
+
+        loads  = [(0, b) for b in range(max(shards, 1))]
+        assign = np.full(n_comp, -1, dtype=np.int64)
+        for c in keep[np.argsort(-rows[keep], kind="stable")].tolist():
+            load, b = heapq.heappop(loads)
+            assign[c] = b
+            heapq.heappush(loads, (load + int(rows[c]), b))
+
+        row_shard = assign[row_comp]
+        order     = np.argsort(row_shard, kind="stable")
+        bounds    = np.searchsorted(row_shard[order], np.arange(len(loads) + 1))
+        plan      = [order[bounds[b]:bounds[b + 1]] for b in range(len(loads))]
+
+        self.counts["shards"] = {
+            "components":       int(n_comp),
+            "kept_components":  len(keep),
+            "kept_accounts":    int(sizes[keep].sum()),
+            "kept_rows":        int(rows[keep].sum()),
+            "shards":           sum(1 for p in plan if len(p)),
+            "max_shard_rows":   max((len(p) for p in plan), default=0),
+        }
+        return [p for p in plan if len(p)]
+
+    def detect_sharded(
+        self,
+        workers: Optional[int] = None,
+        shards:  Optional[int] = None,
+    ) -> tuple[list, list, list]:
+        """
+        (cycles, smurfing, shells) as run_full_pipeline finds them, from
+        the detectors run per shard in up to `workers` processes
+        (default: cores; one shard per worker unless `shards` is given).
+        The patterns are those of the unsharded detectors, merged into
+        a fixed order that does not depend on the shards: cycles by
+        length then account codes, bursts by account, chains by hops
+        then account codes. The unsharded detectors order their results
+        differently (triangles come out in sparse-product order), so
+        compare the two as sets.
+        """
+        workers = workers or os.cpu_count() or 1
+        plan    = self.shard_plan(shards or workers)
+        params  = {
+            "max_length":          self.MAX_CYCLE_LENGTH,
+            "max_cycles_per_node": self.MAX_CYCLES_PER_NODE,
+        }
+
+        # Only the kept rows are materialized, never the whole frame. A
+        # shard keeps the global code order of its accounts (whatever the
+        # row order), since capped cycle enumeration depends on it.
+        src, dst = np.asarray(self.graph.src), np.asarray(self.graph.dst)
+        tasks = (
+            (self.graph.frame(rows), self.graph.accounts[np.union1d(src[rows], dst[rows])])
+            for rows in plan
+        )
+        if workers > 1 and len(plan) > 1:
+            with ProcessPoolExecutor(max_workers=min(workers, len(plan))) as pool:
+                parts = list(pool.map(_detect_shard, tasks, repeat(params)))
+        else:
+            parts = [_detect_shard(task, params) for task in tasks]
+
+        idx = self._acc_idx
+        def codes(accounts):
+            return tuple(idx[a] for a in accounts)
+
+        cycles   = sorted(chain.from_iterable(p[0] for p in parts), key=lambda c: (len(c["accounts"]), codes(c["accounts"])))
+        smurfing = sorted(chain.from_iterable(p[1] for p in parts), key=lambda s: (idx[s["account"]], s["pattern"] != "fan_in"))
+        shells   = sorted(chain.from_iterable(p[2] for p in parts), key=lambda c: (c["hops"], codes(c["accounts"])))
+
+        for part in parts:
+            for stage, counts in part[3].items():
+                total = self.counts.setdefault(stage, {})
+                for key, value in counts.items():
+                    total[key] = total.get(key, 0) + value
+
+        # Every triangle is a reported 3-cycle, so the report's triangle
+        # counts need no global triangle search
+        triangles = [c["accounts"] for c in cycles if len(c["accounts"]) == 3]
+        self._tri_counts = np.bincount(
+            self._codes_of(chain.from_iterable(triangles)), minlength=len(self._accounts)
+        )
+        return cycles, smurfing, shells
 
     # ─────────────────────────────────────────────────────────────────
     # 4. ADAPTIVE THRESHOLD
@@ -179,106 +1040,177 @@ class MainEngine:
     # 5. COMPUTE SCORES
     #    Logic  — structural / behavioral / statistical /
     #    legitimate — all ported to vectorized numpy arrays.
-    #    Network risk uses sparse matrix multiply (O(edges), not O(V×k)).
+    #    Network risk is diffused over several hops (sparse mat-vecs, O(edges) each).
     # ─────────────────────────────────────────────────────────────────
     def compute_scores(
         self, cycles: list, smurfing: list, shells: list
     ) -> dict:
-        n       = len(self._accounts)
-        idx_map = self._acc_idx
-        G       = self._sg
-
-        structural  = np.zeros(n, dtype=np.float32)
-        behavioral  = np.zeros(n, dtype=np.float32)
-        statistical = np.zeros(n, dtype=np.float32)
-        legitimate  = np.zeros(n, dtype=np.float32)
-
-
-        cycle_members  = {a for c in cycles for a in c["accounts"]}
-        smurf_accounts = {s["account"] for s in smurfing}
-        shell_members  = {a for sh in shells for a in sh["accounts"]}
-
-        for i, acc in enumerate(self._accounts):
-            score = 0.0
-            if acc in cycle_members:  score += 1.0
-            if acc in smurf_accounts: score += 0.7
-            if acc in shell_members:  score += 0.8
-            structural[i] = min(1.0, score)
-
-        # BEHAVIORAL: (in_deg + out_deg) / 20, capped at 1 
-        behavioral = np.minimum(1.0, (self._in_deg + self._out_deg) / 20.0)
-
-        # NETWORK: sparse neighbour structural score propagation 
-        network = normalize_array(self._adj.dot(structural))
-
-        # STATISTICAL: z-score of degree, capped at 1 
-        mean_deg    = self._degrees.mean()
-        std_deg     = float(self._degrees.std()) or 1.0
-        z_scores    = np.abs(self._degrees - mean_deg) / std_deg
-        statistical = np.minimum(1.0, z_scores / 3.0)
-
-        # LEGITIMATE DAMPENING: heavy balanced traders 
-        # high in + out degree → established account, reduce suspicion
-        legitimate = np.where(
-            (self._in_deg > 50) & (self._out_deg > 50),
-            0.5,
-            0.0
-        ).astype(np.float32)
-
-        # FINAL SCORE (formula, vectorized sigmoid) 
-        raw = (
-            0.35 * structural  +
-            0.25 * behavioral  +
-            0.15 * statistical +
-            0.10 * network     -
-            0.25 * legitimate
-        ).astype(np.float64)
-
-        # Sigmoid scaled by 5 (matches: 100 / (1 + exp(-5*raw)))
-        final = np.round(100.0 / (1.0 + np.exp(-5.0 * raw)), 2)
-
-        return {acc: float(final[i]) for i, acc in enumerate(self._accounts)}
+        n = len(self._accounts)
+
+        cycle_members  = np.zeros(n, dtype=bool)
+        smurf_accounts = np.zeros(n, dtype=bool)
+        shell_members  = np.zeros(n, dtype=bool)
+        cycle_members[self._codes_of(a for c in cycles for a in c["accounts"])]   = True
+        smurf_accounts[self._codes_of(s["account"] for s in smurfing)]           = True
+        shell_members[self._codes_of(a for sh in shells for a in sh["accounts"])] = True
+
+        structural = _structural_score(cycle_members, smurf_accounts, shell_members)
+
+        # NETWORK: structural risk diffused over several hops
+        network = self._network = normalize_array(self.propagate_risk(structural))
+
+        mean_deg = self._degrees.mean()
+        std_deg  = float(self._degrees.std()) or 1.0
+
+        final = _final_scores(
+            structural, self._in_deg, self._out_deg, network, mean_deg, std_deg
+        )
+
+        return dict(zip(self._accounts, final.tolist()))
+
+    def propagate_risk(
+        self,
+        structural: np.ndarray,
+        direction:  Direction = "both",
+        weight:     Weight = "none",
+        damping:    float = 0.5,
+        tol:        float = 1e-6,
+        max_iter:   int = 50,
+    ) -> np.ndarray:
+        """
+        Network risk per account: `structural` diffused over the distinct
+        edges, each further hop damped by `damping` (see
+        graphs/propagation.py). `direction` "out" follows the money,
+        "in" goes against it, "both" ignores it; `weight` splits an
+        account's risk by distinct edge ("none"), transaction count or
+        total amount. The default runs on `_adj`.
+        """
+        PT = transition_transpose(
+            self.graph, direction, weight,
+            adjacency=self._adj if (direction, weight) == ("both", "none") else None,
+        )
+        network, stats = diffuse(PT, structural, damping=damping, tol=tol, max_iter=max_iter)
+        self.counts["propagation"] = stats
+        return network
 
     # ─────────────────────────────────────────────────────────────────
     # 6. BUILD FRAUD RINGS
-    #    Logic: cycle + shell members form rings,
-    #    skip if any member already used (no overlap).
+    #    Logic: cycle + shell groups sharing accounts are unioned
+    #    into one ring (connected components, order-independent).
     # ─────────────────────────────────────────────────────────────────
+    @staticmethod
+    def _ring_risk(avg_score: np.ndarray, size: np.ndarray, max_score: np.ndarray) -> list[float]:
+        risk = np.minimum(100.0, 0.5 * avg_score + 0.3 * size * 5 + 0.2 * max_score)
+        return [round(r, 2) for r in risk.tolist()]
+
     def build_fraud_rings(
         self,
-        cycles:  list,
-        smurfing: list,
-        shells:  list,
-        scores:  dict
+        cycles:              list,
+        smurfing:            list,
+        shells:              list,
+        scores:              dict,
+        min_shared_accounts: int = 1,
     ) -> list[dict]:
-        rings   = []
-        ring_id = 1
-        used    = set()
-
-        for group in cycles + shells:
-            members = set(group["accounts"])
-            if members & used:          # skip overlapping groups
-                continue
-            used.update(members)
-
-            member_scores = [scores.get(m, 0) for m in members]
-            avg_score     = float(np.mean(member_scores))
-            max_score     = float(max(member_scores))
-            size_factor   = len(members)
-
-            risk = round(min(100.0,
-                0.5 * avg_score +
-                0.3 * size_factor * 5 +
-                0.2 * max_score
-            ), 2)
-
+        """
+        Rings are connected components of the pattern groups (cycles and
+        shell chains): two groups join one ring when they share at least
+        `min_shared_accounts` accounts, so with the default 1 this is a
+        disjoint-set union over all groups and rings never overlap. With
+        a higher threshold only strongly overlapping groups merge (rings
+        may then share an account). Groups are unioned as sparse graphs
+        on integer codes and ring statistics are array group-bys, so the
+        result does not depend on group order. Rings are numbered by
+        descending risk; a ring of several pattern types is "mixed".
+        """
+        groups = cycles + shells
+        if not groups:
+            return []
+
+        # Local integer codes over all group members (works for any
+        # account labels, including ones this engine has not indexed)
+        sizes = np.fromiter((len(g["accounts"]) for g in groups), dtype=np.int64, count=len(groups))
+        flat  = np.array(list(chain.from_iterable(g["accounts"] for g in groups)), dtype=object)
+        codes, labels = pd.factorize(flat)
+        n_groups, n_acc = len(groups), len(labels)
+        group_of = np.repeat(np.arange(n_groups), sizes)
+        first    = np.cumsum(sizes) - sizes
+
+        if min_shared_accounts <= 1:
+            # Consecutive members of a group are linked: account components
+            # are exactly the unions of overlapping groups
+            same = group_of[1:] == group_of[:-1]
+            link = csr_matrix(
+                (np.ones(int(same.sum()), dtype=np.int8), (codes[:-1][same], codes[1:][same])),
+                shape=(n_acc, n_acc),
+            )
+            n_rings, acc_ring = connected_components(link, directed=False)
+            group_ring = acc_ring[codes[first]]
+            m_ring, m_acc = acc_ring, np.arange(n_acc)
+        else:
+            # Group overlap graph, weighted by the number of shared accounts
+            member = csr_matrix(
+                (np.ones(len(codes), dtype=np.float32), (group_of, codes)), shape=(n_groups, n_acc)
+            )
+            member.data[:] = 1
+            overlap = (member @ member.T).tocoo()
+            keep    = overlap.data >= min_shared_accounts
+            link    = csr_matrix(
+                (np.ones(int(keep.sum()), dtype=np.int8), (overlap.row[keep], overlap.col[keep])),
+                shape=(n_groups, n_groups),
+            )
+            n_rings, group_ring = connected_components(link, directed=False)
+            pairs  = np.unique(group_ring[group_of].astype(np.int64) * n_acc + codes)
+            m_ring, m_acc = pairs // n_acc, pairs % n_acc
+
+        # Members are ordered by account code (first seen in the data), or
+        # by label when some are not indexed here (incremental deltas)
+        rank  = self._account_index().get_indexer(labels)
+        known = bool(len(rank)) and rank.min() >= 0
+        if not known:
+            rank = np.argsort(np.argsort(labels.astype(str), kind="stable"), kind="stable")
+
+        if known and len(scores) == len(self._accounts) and list(scores) == self._accounts:
+            # Scores straight from compute_scores: already in code order
+            acc_score = np.fromiter(scores.values(), dtype=np.float64, count=len(scores))[rank]
+        else:
+            acc_score = np.fromiter((scores.get(a, 0) for a in labels), dtype=np.float64, count=n_acc)
+
+        # Group-bys over the (ring, account) membership pairs
+        size       = np.bincount(m_ring, minlength=n_rings)
+        avg_score  = np.bincount(m_ring, weights=acc_score[m_acc], minlength=n_rings) / size
+        max_score  = np.full(n_rings, -np.inf)
+        np.maximum.at(max_score, m_ring, acc_score[m_acc])
+        first_rank = np.full(n_rings, np.iinfo(np.int64).max)
+        np.minimum.at(first_rank, m_ring, rank[m_acc])
+        risk       = self._ring_risk(avg_score, size, max_score)
+
+        # Pattern types per ring: one name list per distinct combination
+        pat_codes, pat_names = pd.factorize(np.array([g["pattern"] for g in groups], dtype=object))
+        present = np.zeros((n_rings, len(pat_names)), dtype=bool)
+        present[group_ring, pat_codes] = True
+        combos, combo_of = np.unique(present, axis=0, return_inverse=True)
+        combo_types = [sorted(pat_names[c].tolist()) for c in combos]
+        combo_type  = [t[0] if len(t) == 1 else "mixed" for t in combo_types]
+
+        # Rings by descending risk, then first member; members in rank order
+        order    = np.lexsort((first_rank, -np.asarray(risk)))
+        position = np.empty(n_rings, dtype=np.int64)
+        position[order] = np.arange(n_rings)
+        entries  = np.lexsort((rank[m_acc], position[m_ring]))
+        names    = labels[m_acc[entries]].tolist()
+        bounds   = np.cumsum(size[order]).tolist()
+
+        rings, lo = [], 0
+        for ring_id, (r, hi) in enumerate(zip(order.tolist(), bounds), start=1):
+            c = int(combo_of[r])
             rings.append({
                 "ring_id":         f"RING_{str(ring_id).zfill(3)}",
-                "pattern_type":    group["pattern"],
-                "member_accounts": list(members),
-                "risk_score":      risk
+                "pattern_type":    combo_type[c],
+                "pattern_types":   list(combo_types[c]),
+                "member_accounts": names[lo:hi],
+                "risk_score":      risk[r],
             })
-            ring_id += 1
+            lo = hi
 
         return rings
 
@@ -286,144 +1218,223 @@ class MainEngine:
         if not fraud_rings:
             return pd.DataFrame()
 
-        rows = []
-        for ring in fraud_rings:
-            members    = ring["member_accounts"]
-            member_set = set(members)
-            mc         = len(members)
-
-            # Count internal edges using graph (no DataFrame) 
-            internal_edges = sum(
-                1 for u in members
-                for v in self._successors.get(u, [])
-                if v in member_set
-            )
+        # Ring x account membership on engine codes
+        sizes   = np.array([len(r["member_accounts"]) for r in fraud_rings], dtype=np.int64)
+        codes   = self._codes_of(a for r in fraud_rings for a in r["member_accounts"])
+        rows    = np.repeat(np.arange(len(fraud_rings)), sizes)
+        members = csr_matrix(
+            (np.ones(len(codes), dtype=np.float32), (rows, codes)),
+            shape=(len(fraud_rings), len(self._accounts)),
+        )
 
-            max_edges = mc * (mc - 1) if mc > 1 else 1
-            density   = round(internal_edges / max_edges, 3)
-            s_vals    = [account_scores.get(m, 0) for m in members]
-            risk      = ring["risk_score"]
-
-            rows.append({
-                "Ring ID":               ring["ring_id"],
-                "Pattern Type":          ring["pattern_type"],
-                "Member Count":          mc,
-                "Risk Score":            risk,
-                "Member Account IDs":    ", ".join(sorted(str(m) for m in members)),
-                "Avg Member Score":      round(float(np.mean(s_vals)), 2),
-                "Max Member Score":      round(float(max(s_vals)), 2),
-                "Structural Complexity": mc + internal_edges,
-                "Internal Edge Count":   internal_edges,
-                "Ring Density":          density,
-                "Risk Category": (
-                    "Critical" if risk >= 85 else
-                    "High"     if risk >= 70 else
-                    "Medium"   if risk >= 50 else "Low"
-                )
-            })
+        # Internal edges of ring r = row r of (M · A) restricted to M's columns
+        internal = np.asarray(
+            (members @ self._binary).multiply(members).sum(axis=1)
+        ).ravel().astype(np.int64)
 
-        return (
-            pd.DataFrame(rows)
-            .sort_values("Risk Score", ascending=False)
-            .reset_index(drop=True)
+        s_vals   = np.fromiter(
+            (account_scores.get(a, 0) for r in fraud_rings for a in r["member_accounts"]),
+            dtype=np.float64, count=len(codes),
         )
-    
-    
+        starts    = np.cumsum(sizes) - sizes
+        avg_score = np.add.reduceat(s_vals, starts) / sizes
+        max_score = np.maximum.reduceat(s_vals, starts)
+        max_edges = np.where(sizes > 1, sizes * (sizes - 1), 1)
+        risk      = np.array([r["risk_score"] for r in fraud_rings], dtype=np.float64)
+
+        table = pd.DataFrame({
+            "Ring ID":               [r["ring_id"] for r in fraud_rings],
+            "Pattern Type":          [r["pattern_type"] for r in fraud_rings],
+            "Member Count":          sizes,
+            "Risk Score":            risk,
+            "Member Account IDs":    [
+                ", ".join(sorted(str(m) for m in r["member_accounts"])) for r in fraud_rings
+            ],
+            "Avg Member Score":      np.round(avg_score, 2),
+            "Max Member Score":      np.round(max_score, 2),
+            "Structural Complexity": sizes + internal,
+            "Internal Edge Count":   internal,
+            "Ring Density":          np.round(internal / max_edges, 3),
+            "Risk Category":         np.select(
+                [risk >= 85, risk >= 70, risk >= 50], ["Critical", "High", "Medium"], "Low"
+            ),
+        })
 
-    def _build_reasons(
-        self,
-        acc:      str,
-        score:    float,
-        meta:     dict,
-        smurfing: list,
-    ) -> list[str]:
-        reasons = []
-        G       = self._sg
-
-        total_tx = int(
-            self._s_count.get(acc, 0) + self._r_count.get(acc, 0)
+        return (
+            table
+            .sort_values("Risk Score", ascending=False, kind="stable")
+            .reset_index(drop=True)
         )
 
-        # Activity gate
-        penalty = 0.2 if total_tx < 5 else 0.0
-        if penalty:
-            reasons.append(f"activity_gate(total_tx={total_tx},penalty={penalty})")
-
-        patterns = meta.get("patterns", set())
-
-        # Cycle centrality
-        if "cycle_length_3" in patterns or "cycle" in patterns:
-            deg  = G.degree(acc)
-            # count how many cycles this node appears in (approx via neighbours)
-            size = deg + 1
-            reasons.append(f"cycle_centrality(deg={deg},size={size})")
-
-        # Fan-in intensity
-        if "fan_in" in patterns:
-            in_d = G.in_degree(acc)
-            reasons.append(f"fan_in_intensity(in={in_d})")
-
-        # Fan-out intensity
-        if "fan_out" in patterns:
-            out_d = G.out_degree(acc)
-            reasons.append(f"fan_out_intensity(out={out_d})")
-
-        # Layered shell
-        if "layered_shell" in patterns:
-            reasons.append("layered_shell_member")
-
-        # Low activity cap
-        if total_tx < 5:
-            cap = round(score, 1)
-            reasons.append(f"low_activity_cap(total_tx={total_tx},score_cap={cap})")
-
-        return reasons
-
-
-    def run_full_pipeline(self) -> dict:
-        t0 = time.perf_counter()
-
-        cycles    = self.detect_cycles()
-        smurfing  = self.detect_smurfing()
-        shells    = self.detect_layered_shells()
-        scores    = self.compute_scores(cycles, smurfing, shells)
-        threshold = self.adaptive_threshold(scores)
-        rings     = self.build_fraud_rings(cycles, smurfing, shells, scores)
 
 
-        account_meta: dict = defaultdict(lambda: {"patterns": set(), "ring_id": None})
-        for c  in cycles:   [account_meta[a]["patterns"].add(c["pattern"])  for a in c["accounts"]]
-        for s  in smurfing:  account_meta[s["account"]]["patterns"].add(s["pattern"])
-        for sh in shells:   [account_meta[a]["patterns"].add(sh["pattern"]) for a in sh["accounts"]]
-        for r  in rings:    [account_meta[a].__setitem__("ring_id", r["ring_id"]) for a in r["member_accounts"]]
+    def suspicious_table(
+        self,
+        cycles:    list,
+        smurfing:  list,
+        shells:    list,
+        rings:     list,
+        scores:    dict,
+        threshold: float,
+    ) -> pd.DataFrame:
+        """
+        One row per account scoring at or above threshold (account
+        order): account_id, suspicion_score, risk_level, reasons,
+        detected_patterns, ring_id, network_risk and the flow features
+        in_amount, out_amount, pass_through, hold_hours. Pattern
+        membership is kept as a bitmask per account and every column is
+        built over arrays.
+        """
+        n      = len(self._accounts)
+        values = np.fromiter((scores.get(a, 0.0) for a in self._accounts), dtype=np.float64, count=n)
+
+        return _suspicious_frame(
+            accounts  = self._accounts,
+            codes_of  = self._codes_of,
+            picked    = np.flatnonzero(values >= threshold),
+            scores    = values,
+            patterns  = (cycles, smurfing, shells),
+            rings     = rings,
+            features  = feature_matrix(
+                self._flow, self._out_deg, self._in_deg, *self._seen, self._holds, dtype=np.float64
+            ),
+            triangles = lambda codes: self._triangle_count_vector()[codes],
+            network   = self._network if self._network is not None else np.zeros(n),
+        )
 
-        suspicious = []
-        for acc, score in scores.items():
-            if score < threshold:
-                continue
-            meta     = account_meta[acc]
-            patterns = meta["patterns"]
-            reasons  = self._build_reasons(acc, score, meta, smurfing)
-
-            suspicious.append({
-                "account_id":        acc,
-                "suspicion_score":   score,
-                "risk_level":        _risk_level(score),   # ← added
-                "reasons":           reasons,               # ← added
-                "detected_patterns": [_PATTERN_CLEAN.get(p, p) for p in patterns],
-                "ring_id":           meta["ring_id"],
-            })
 
+    def _top_accounts(self, scores: dict, threshold: float) -> list[dict]:
+        """The PARTIAL_TOP highest-scoring accounts at or above threshold."""
+        values = np.fromiter(scores.values(), dtype=np.float64, count=len(scores))
+        picked = np.flatnonzero(values >= threshold)
+        if len(picked) > self.PARTIAL_TOP:
+            picked = picked[np.argpartition(-values[picked], self.PARTIAL_TOP - 1)[: self.PARTIAL_TOP]]
+        picked = picked[np.argsort(-values[picked], kind="stable")]
+        top    = np.round(values[picked], 2)
+        return [
+            {"account_id": self._accounts[i], "suspicion_score": score, "risk_level": level}
+            for i, score, level in zip(picked.tolist(), top.tolist(), _risk_levels(top).tolist())
+        ]
+
+    def run_full_pipeline(
+        self,
+        on_stage:   Optional[Callable[[str], None]] = None,
+        profile:    Optional[StageProfile] = None,
+        sharded:    Optional[bool] = None,
+        on_partial: Optional[Callable[[str, dict], None]] = None,
+        workers:    Optional[int] = None,
+    ) -> dict:
+        """
+        on_stage, if given, is called with the stage name ("cycles",
+        "smurfing", "shells", "scores", "rings", "report") as soon as
+        that stage has finished — used for job progress reporting.
+        on_partial, if given, is called right before it with the stage
+        name and what that stage produced so far: pattern counts, then
+        the top accounts once scores exist, the top rings, and the
+        summary (PARTIAL_TOP entries at most).
+        Every stage is recorded in `profile` (a new one if not given,
+        e.g. to continue the parse / build stages of an upload), which
+        is embedded in the report as "profile". With `sharded` (default:
+        from SHARDED_MIN_ROWS transactions when `workers` > 1) the three
+        detectors run as one "shards" stage via detect_sharded().
+        `workers` (default: cores) caps the processes the detectors may
+        start; with 1, as inside a pool worker, no process is started.
+        """
+        t0      = time.perf_counter()
+        profile = profile if profile is not None else StageProfile()
+        workers = workers or os.cpu_count() or 1
+        if sharded is None:
+            sharded = len(self.graph.src) >= self.SHARDED_MIN_ROWS and workers > 1
+
+        def notify(stage: str, partial: Callable[[], dict]) -> None:
+            if on_partial is not None:
+                on_partial(stage, partial())
+            if on_stage is not None:
+                on_stage(stage)
+
+        if sharded:
+            with profile.stage("shards") as counts:
+                cycles, smurfing, shells = self.detect_sharded(workers=workers)
+                counts.update(
+                    self.counts.get("shards", {}),
+                    cycles=len(cycles), smurfing=len(smurfing), shells=len(shells),
+                    shells_truncated=self.counts.get("shells", {}).get("truncated", 0),
+                )
+            for stage, found in (("cycles", cycles), ("smurfing", smurfing), ("shells", shells)):
+                notify(stage, lambda: {"found": len(found)})
+        else:
+            with profile.stage("cycles") as counts:
+                cycles = self.detect_cycles(
+                    max_length=self.MAX_CYCLE_LENGTH,
+                    max_cycles_per_node=self.MAX_CYCLES_PER_NODE,
+                    workers=workers,
+                )
+                counts.update(self.counts.get("cycles", {}), found=len(cycles))
+            notify("cycles", lambda: {"found": len(cycles)})
+            with profile.stage("smurfing") as counts:
+                smurfing = self.detect_smurfing()
+                counts.update(self.counts.get("smurfing", {}), found=len(smurfing))
+            notify("smurfing", lambda: {"found": len(smurfing)})
+            with profile.stage("shells") as counts:
+                shells = self.detect_layered_shells()
+                counts.update(self.counts.get("shells", {}), found=len(shells))
+            notify("shells", lambda: {"found": len(shells)})
+        with profile.stage("scores", accounts=len(self._accounts)) as counts:
+            scores    = self.compute_scores(cycles, smurfing, shells)
+            threshold = self.adaptive_threshold(scores)
+            counts.update(self.counts.get("propagation", {}))
+        notify("scores", lambda: {
+            "threshold":    round(threshold, 2),
+            "top_accounts": self._top_accounts(scores, threshold),
+        })
+        with profile.stage("rings") as counts:
+            rings = self.build_fraud_rings(cycles, smurfing, shells, scores)
+            counts["found"] = len(rings)
+        notify("rings", lambda: {
+            "found":     len(rings),
+            "top_rings": [
+                {
+                    "ring_id":      r["ring_id"],
+                    "pattern_type": r["pattern_type"],
+                    "member_count": len(r["member_accounts"]),
+                    "risk_score":   r["risk_score"],
+                }
+                for r in sorted(rings, key=lambda r: r["risk_score"], reverse=True)[: self.PARTIAL_TOP]
+            ],
+        })
+
+        with profile.stage("report") as counts:
+            suspicious = _records(self.suspicious_table(
+                cycles, smurfing, shells, rings, scores, threshold
+            ))
+            counts["suspicious_accounts"] = len(suspicious)
+        summary = {
+            "total_accounts_analyzed":     len(self._accounts),
+            "suspicious_accounts_flagged": len(suspicious),
+            "fraud_rings_detected":        len(rings),
+            "processing_time_seconds":     round(time.perf_counter() - t0, 3),
+        }
+        notify("report", lambda: {"summary": summary})
 
         return {
             "suspicious_accounts": suspicious,
             "fraud_rings":         rings,
             "account_scores":      scores,
-            "summary": {
-                "total_accounts_analyzed":     len(self._accounts),
-                "suspicious_accounts_flagged": len(suspicious),
-                "fraud_rings_detected":        len(rings),
-                "processing_time_seconds":     round(time.perf_counter() - t0, 3),
-            }
+            "summary":             summary,
+            "profile":             profile.to_dict(),
         }
-    
\ No newline at end of file
+    
+
+
+def _detect_shard(shard: tuple, params: dict) -> tuple[list, list, list, dict]:
+    """
+    The three detectors on one shard ((normalized rows of whole
+    components, their accounts in code order)) — a worker-process task
+    of MainEngine.detect_sharded.
+    """
+    frame, accounts = shard
+    engine   = MainEngine(graph=Graph.from_normalized(frame, accounts=accounts))
+    cycles   = engine.detect_cycles(workers=1, **params)
+    smurfing = engine.detect_smurfing()
+    shells   = engine.detect_layered_shells()
+    return cycles, smurfing, shells, engine.counts
@@ -0,0 +1,174 @@
+"""
+Per-account feature matrix.
+
+Everything is reduced over integer account codes with np.bincount (or
+ufunc.at for min / max) — no groupby over labels. The reductions are
+split in two: `flow_sums` are plain sums per account, so batches can be
+added to them (IncrementalEngine keeps them up to date that way), and
+`feature_matrix` turns the sums plus degree, first / last-seen and
+`hold_sums` arrays into one dense account × feature matrix (float32
+unless asked otherwise) whose columns are FEATURES. A new feature is
+one more column here.
+
+`hold_sums` is the exception to "plain sums": how long an account holds
+money depends on the order of all of its transactions, so it is
+recomputed from an account's full history rather than added up.
+"""
+
+import numpy as np
+
+from .parsing import NAT_NS
+
+
+NS_PER_HOUR = 3_600_000_000_000
+
+# Additive per-account sums (float64), in column order
+FLOW_SUMS = (
+    "out_count", "in_count",                 # transactions
+    "out_valued", "in_valued",               # ... of them with an amount
+    "out_amount", "in_amount",               # sum of amounts
+    "out_amount_sq", "in_amount_sq",         # sum of squared amounts
+)
+
+# Per-account hold sums (float64), in column order
+HOLD_SUMS = (
+    "hold_hours",         # sum over received transactions of the wait until the next one sent
+    "holds",              # received transactions followed by one sent
+)
+
+FEATURES = (
+    "out_count",          # transactions sent
+    "in_count",           # transactions received
+    "unique_receivers",   # distinct counterparties paid (out-degree)
+    "unique_senders",     # distinct counterparties paid by (in-degree)
+    "out_amount",         # total amount sent
+    "in_amount",          # total amount received
+    "out_mean",           # mean amount sent
+    "in_mean",            # mean amount received
+    "out_std",            # sample std of amounts sent (0 under two)
+    "in_std",             # sample std of amounts received
+    "active_hours",       # first to last transaction
+    "pass_through",       # min(in, out) / max(in, out) of the total amounts
+    "hold_hours",         # mean wait from a transaction received to the next one sent
+)
+FEATURE_INDEX = {name: i for i, name in enumerate(FEATURES)}
+
+_SUM = {name: i for i, name in enumerate(FLOW_SUMS)}
+
+
+def flow_sums(
+    src:    np.ndarray,
+    dst:    np.ndarray,
+    amount: np.ndarray,
+    ts_ns:  np.ndarray,
+    n:      int,
+) -> np.ndarray:
+    """(n, len(FLOW_SUMS)) float64 sums over the transactions given."""
+    amount = np.asarray(amount, dtype=np.float64)
+    ts_ns  = np.asarray(ts_ns)
+    valued = ~np.isnan(amount)
+    value  = np.where(valued, amount, 0.0)
+
+    sums = np.empty((n, len(FLOW_SUMS)), dtype=np.float64)
+    for side, codes in (("out", np.asarray(src)), ("in", np.asarray(dst))):
+        for name, weights in (
+            ("count",     None),
+            ("valued",    valued),
+            ("amount",    value),
+            ("amount_sq", value * value),
+        ):
+            sums[:, _SUM[f"{side}_{name}"]] = np.bincount(codes, weights=weights, minlength=n)
+    return sums
+
+
+def hold_sums(src: np.ndarray, dst: np.ndarray, ts_ns: np.ndarray, n: int) -> np.ndarray:
+    """
+    (n, len(HOLD_SUMS)) float64: for every timestamped transaction an
+    account receives, the hours until the first one it sends at or after
+    that time, summed, and how many received transactions had one.
+    Self-transfers are left out. `src` / `dst` / `ts_ns` must hold all of
+    each account's transactions (order does not matter).
+    """
+    src, dst, ts_ns = np.asarray(src), np.asarray(dst), np.asarray(ts_ns)
+    keep = (ts_ns != NAT_NS) & (src != dst)
+    src, dst, ts_ns = src[keep].astype(np.int64), dst[keep].astype(np.int64), ts_ns[keep]
+
+    # (account, time rank) packed into one sortable int64: the first send
+    # at or after a receipt is the searchsorted position of its key (a
+    # sentinel past every account ends the array)
+    times, rank = np.unique(ts_ns, return_inverse=True)
+    span  = np.int64(len(times) + 1)
+    sends = np.append(np.sort(src * span + rank), np.iinfo(np.int64).max)
+    nxt   = sends[np.searchsorted(sends, dst * span + rank, side="left")]
+    found = (nxt // span) == dst
+
+    sums = np.zeros((n, len(HOLD_SUMS)), dtype=np.float64)
+    wait = (times[nxt[found] % span] - ts_ns[found]) / NS_PER_HOUR
+    sums[:, 0] = np.bincount(dst[found], weights=wait, minlength=n)
+    sums[:, 1] = np.bincount(dst[found], minlength=n)
+    return sums
+
+
+def seen_range(src: np.ndarray, dst: np.ndarray, ts_ns: np.ndarray, n: int) -> tuple[np.ndarray, np.ndarray]:
+    """(first, last) int64 timestamp of every account, NaT_NS where it has none."""
+    ts_ns = np.asarray(ts_ns)
+    timed = ts_ns != NAT_NS
+    first = np.full(n, np.iinfo(np.int64).max, dtype=np.int64)
+    last  = np.full(n, np.iinfo(np.int64).min, dtype=np.int64)
+    for codes in (np.asarray(src)[timed], np.asarray(dst)[timed]):
+        np.minimum.at(first, codes, ts_ns[timed])
+        np.maximum.at(last,  codes, ts_ns[timed])
+    missing = first > last
+    first[missing] = NAT_NS
+    last[missing]  = NAT_NS
+    return first, last
+
+
+def feature_matrix(
+    sums:       np.ndarray,
+    out_degree: np.ndarray,
+    in_degree:  np.ndarray,
+    first_seen: np.ndarray,
+    last_seen:  np.ndarray,
+    holds:      np.ndarray,
+    dtype=np.float32,
+) -> np.ndarray:
+    """
+    (n, len(FEATURES)) matrix from flow_sums(), hold_sums() and the
+    per-account arrays. float32 for scoring; reports ask for float64 so amount totals
+    keep their cents.
+    """
+    s = lambda name: sums[:, _SUM[name]]
+    n = len(sums)
+
+    def ratio(num: np.ndarray, den: np.ndarray) -> np.ndarray:
+        return np.divide(num, den, out=np.zeros(n), where=den > 0)
+
+    def std(side: str) -> np.ndarray:
+        k   = s(f"{side}_valued")
+        var = ratio(s(f"{side}_amount_sq") - ratio(s(f"{side}_amount") ** 2, k), k - 1)
+        return np.where(k >= 2, np.sqrt(np.maximum(var, 0.0)), 0.0)
+
+    out_amount, in_amount = s("out_amount"), s("in_amount")
+    first, last = np.asarray(first_seen), np.asarray(last_seen)
+    seen  = (first != NAT_NS) & (last != NAT_NS) & (last >= first)
+
+    columns = {
+        "out_count":        s("out_count"),
+        "in_count":         s("in_count"),
+        "unique_receivers": out_degree,
+        "unique_senders":   in_degree,
+        "out_amount":       out_amount,
+        "in_amount":        in_amount,
+        "out_mean":         ratio(out_amount, s("out_valued")),
+        "in_mean":          ratio(in_amount,  s("in_valued")),
+        "out_std":          std("out"),
+        "in_std":           std("in"),
+        "active_hours":     np.where(seen, (last - first) / NS_PER_HOUR, 0.0),
+        "pass_through":     ratio(np.minimum(out_amount, in_amount), np.maximum(out_amount, in_amount)),
+        "hold_hours":       ratio(holds[:, 0], holds[:, 1]),
+    }
+    matrix = np.empty((n, len(FEATURES)), dtype=dtype)
+    for name, values in columns.items():
+        matrix[:, FEATURE_INDEX[name]] = values
+    return matrix
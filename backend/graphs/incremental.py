@@ -0,0 +1,819 @@
+import inspect
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import connected_components
+
+from .build_graph import Graph, NAT_NS
+from .cycles import cycles_through
+from .features import FLOW_SUMS, HOLD_SUMS, feature_matrix, flow_sums, hold_sums
+from .engine import (
+    MainEngine,
+    _final_scores,
+    _structural_score,
+    _records,
+    _segment_positions,
+    _suspicious_frame,
+)
+
+
+# Detector parameters shared by the detector calls and the region search
+SHELL_MAX_HOPS       = 6
+SHELL_MAX_OUT_DEGREE = 2
+SMURF_WINDOWS_HOURS  = (24, 72)
+
+# Adjacency entries each region search of an append may expand, per batch
+# transaction (never less than the floor): the cheapest accounts of a hop
+# are expanded first, hubs past the budget stay in the region unexpanded
+REGION_SCAN_PER_ROW = 100
+REGION_SCAN_MIN     = 10_000
+
+# Diffusion settings of MainEngine.propagate_risk, for the local updates
+_PROPAGATION = {
+    name: p.default
+    for name, p in inspect.signature(MainEngine.propagate_risk).parameters.items()
+    if p.default is not inspect.Parameter.empty
+}
+
+_GROWABLE = {
+    "_in_deg":       np.float32,
+    "_out_deg":      np.float32,
+    "_flow":         np.float64,
+    "_holds":        np.float64,
+    "_first_seen":   np.int64,
+    "_last_seen":    np.int64,
+    "_cycle_cnt":    np.int32,
+    "_cycle3_cnt":   np.int32,
+    "_cycle_starts": np.int32,
+    "_shell_cnt":    np.int32,
+    "_smurf_cnt":    np.int32,
+    "_structural":   np.float32,
+    "_net_raw":      np.float64,
+    "_scores":       np.float64,
+}
+
+# Trailing shape of the growable arrays that are not one value per account
+_ROW_SHAPE = {"_flow": (len(FLOW_SUMS),), "_holds": (len(HOLD_SUMS),)}
+
+_NO_TIME_MIN = np.iinfo(np.int64).max
+_NO_TIME_MAX = np.iinfo(np.int64).min
+_UNREACHED   = np.iinfo(np.int32).max // 2
+
+
+def _ts_ns(timestamps: pd.Series) -> np.ndarray:
+    """Timestamps as int64 nanoseconds, NaT as _NO_TIME_MIN."""
+    ts = pd.to_datetime(timestamps).dt.as_unit("ns")
+    return np.where(ts.notna().to_numpy(), ts.to_numpy().astype(np.int64), _NO_TIME_MIN)
+
+
+def _grouped(codes: np.ndarray, n: int) -> tuple[np.ndarray, np.ndarray]:
+    """Row order grouped by code, with a pointer array (CSR-style)."""
+    order = np.argsort(codes, kind="stable")
+    ptr   = np.concatenate([[0], np.cumsum(np.bincount(codes, minlength=n))])
+    return order, ptr
+
+
+class IncrementalEngine:
+    """
+    Long-lived detection state that takes new transaction batches
+    without re-analyzing the whole history.
+
+    History is a compacted base (a MainEngine over every transaction up
+    to the last compaction) plus a delta of newer transactions indexed
+    per account. A batch can only create or break patterns that contain
+    one of the accounts it touches, so each append:
+      * updates degree / flow-sum / span arrays and the adjacency in place,
+      * searches cycles only through the new distinct edges, inside the
+        strongly connected components they close,
+      * re-runs burst detection on each touched account's transactions
+        around its new ones only,
+      * re-runs chain detection on the region a layering chain through a
+        touched shell-like account can reach, and swaps those chains,
+      * rescores only the accounts whose score inputs changed.
+    The region searches are budgeted by degree in proportion to the
+    batch, so a batch next to a hub does not pull in the hub's whole
+    neighbourhood. Once the delta exceeds `compaction_ratio` × base,
+    everything is folded into a new base and rescored exactly, so the
+    amortized cost of an append stays proportional to the batch.
+
+    Accounts outside an update keep the degree mean/std and network
+    normalization they were last scored with until the next compaction.
+    Patterns only reachable past a hub the budget did not expand
+    ("region_truncated") are also found at the next compaction.
+    """
+
+    def __init__(
+        self,
+        graph:            Optional[Graph] = None,
+        compaction_ratio: float = 0.5,
+    ) -> None:
+        self.compaction_ratio = compaction_ratio
+
+        self._base: Optional[MainEngine] = None
+        self._reset([])
+        if graph is not None and len(graph.dataframe):
+            self._compact(graph.dataframe)
+
+    # ─────────────────────────────────────────────────────────────────
+    # State
+    # ─────────────────────────────────────────────────────────────────
+    def _reset(self, accounts: list) -> None:
+        self._accounts: list = list(accounts)
+        self._acc_idx:  dict = dict(zip(self._accounts, range(len(self._accounts))))
+        self._n = len(self._accounts)
+
+        capacity = max(self._n, 1024)
+        for name, dtype in _GROWABLE.items():
+            setattr(self, name, np.zeros((capacity, *_ROW_SHAPE.get(name, ())), dtype=dtype))
+        self._first_seen[:] = _NO_TIME_MIN
+        self._last_seen[:]  = _NO_TIME_MAX
+
+        # Delta since the last compaction
+        self._delta_cols:  dict = {c: [] for c in Graph.REQUIRED_COLUMNS}
+        self._delta_src:   list = []
+        self._delta_dst:   list = []
+        self._delta_ts:    list = []
+        self._delta_out:   dict = {}          # sender code   -> delta row ids
+        self._delta_in:    dict = {}          # receiver code -> delta row ids
+        self._delta_edges: dict = {}          # (u, v) -> tx count, edges not in base
+        self._delta_succ:  dict = {}          # code -> successors via delta edges
+        self._delta_pred:  dict = {}          # code -> predecessors via delta edges
+
+        # Pattern instances: key -> instance dict, and code -> keys
+        self._patterns:   dict = {}
+        self._by_account: dict = {}
+
+        self._deg_sum   = 0.0
+        self._deg_sumsq = 0.0
+        self._net_max   = 0.0
+
+    def _ensure_capacity(self, n: int) -> None:
+        capacity = len(self._in_deg)
+        if n <= capacity:
+            return
+        capacity = max(n, 2 * capacity)
+        for name in _GROWABLE:
+            old = getattr(self, name)
+            new = np.zeros((capacity, *old.shape[1:]), dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+        self._first_seen[self._n:] = _NO_TIME_MIN
+        self._last_seen[self._n:]  = _NO_TIME_MAX
+
+    def _codes_of(self, accounts) -> np.ndarray:
+        idx = self._acc_idx
+        return np.fromiter((idx[a] for a in accounts), dtype=np.int64)
+
+    @property
+    def _base_n(self) -> int:
+        return len(self._base._accounts) if self._base is not None else 0
+
+    @property
+    def _delta_size(self) -> int:
+        return len(self._delta_src)
+
+    # ─────────────────────────────────────────────────────────────────
+    # Compaction: exact rebuild from the full history
+    # ─────────────────────────────────────────────────────────────────
+    def _delta_frame(self, rows: Optional[list] = None) -> pd.DataFrame:
+        cols = self._delta_cols
+        if rows is not None:
+            cols = {c: [cols[c][r] for r in rows] for c in Graph.REQUIRED_COLUMNS}
+        frame = pd.DataFrame(cols, columns=Graph.REQUIRED_COLUMNS)
+        return frame.astype(self._base.graph.dataframe.dtypes.to_dict())
+
+    def _compact(self, frame: pd.DataFrame) -> None:
+        graph = Graph.from_normalized(frame)
+        base  = MainEngine(graph)
+        self._base = base
+        self._reset(base._accounts)
+
+        n = self._n
+        self._in_deg[:n]  = base._in_deg
+        self._out_deg[:n] = base._out_deg
+        self._flow[:n]    = flow_sums(graph.src, graph.dst, graph.amount, graph.ts_ns, n)
+        self._holds[:n]   = base._holds
+        self._base_ts = _ts_ns(graph.dataframe["timestamp"])
+        self._record_spans(graph.src, graph.dst, self._base_ts)
+
+        # Base rows grouped by sender and by receiver, for region extraction
+        self._base_by_src, self._base_src_ptr = _grouped(graph.src, n)
+        self._base_by_dst, self._base_dst_ptr = _grouped(graph.dst, n)
+
+        self._swap_patterns(set(), self._keyed(*self._run_detectors(base)))
+
+        degrees = self._in_deg[:n] + self._out_deg[:n]
+        self._deg_sum   = float(degrees.sum())
+        self._deg_sumsq = float((degrees.astype(np.float64) ** 2).sum())
+        self._net_raw[:n] = base.propagate_risk(self._structural[:n], **_PROPAGATION)
+        self._net_max     = float(self._net_raw[:n].max()) if n else 0.0
+        self._rescore(np.arange(n))
+
+    # ─────────────────────────────────────────────────────────────────
+    # Appending a batch
+    # ─────────────────────────────────────────────────────────────────
+    def append(self, raw_dataframe: pd.DataFrame, normalized: bool = False) -> dict:
+        """
+        Add a batch of transactions (raw CSV columns, or already
+        normalized with normalized=True) and update patterns and scores.
+        Returns what the update touched.
+        """
+        batch = raw_dataframe if normalized else Graph._normalize_columns(df=raw_dataframe)
+        batch = batch[Graph.REQUIRED_COLUMNS].reset_index(drop=True)
+
+        n_before  = self._n
+        base_rows = len(self._base.graph.dataframe) if self._base is not None else 0
+        if self._delta_size + len(batch) > self.compaction_ratio * base_rows:
+            history = [self._base.graph.dataframe, self._delta_frame()] if self._base is not None else []
+            self._compact(pd.concat(history + [batch], ignore_index=True))
+            return {
+                "transactions":      len(batch),
+                "new_accounts":      self._n - n_before,
+                "touched_accounts":  self._n,
+                "region_accounts":   self._n,
+                "region_truncated":  False,
+                "rescored_accounts": self._n,
+                "compacted":         True,
+            }
+
+        src, dst = self._register_accounts(batch)
+
+        t = _ts_ns(batch["timestamp"])
+
+        # Flow sums over the batch's own accounts, added to theirs
+        ends, local = np.unique(np.concatenate([src, dst]), return_inverse=True)
+        self._flow[ends] += flow_sums(
+            local[:len(src)], local[len(src):], batch["amount"].to_numpy(dtype=np.float64),
+            np.where(t != _NO_TIME_MIN, t, NAT_NS), len(ends),
+        )
+        self._record_spans(src, dst, t)
+
+        touched   = np.unique(np.concatenate([src, dst]))
+        was_shell = self._out_deg[touched] <= SHELL_MAX_OUT_DEGREE
+        old_deg   = (self._in_deg[touched] + self._out_deg[touched]).astype(np.float64)
+        new_edges = self._add_edges(src, dst)
+        new_deg   = (self._in_deg[touched] + self._out_deg[touched]).astype(np.float64)
+        self._deg_sum   += float((new_deg - old_deg).sum())
+        self._deg_sumsq += float((new_deg ** 2 - old_deg ** 2).sum())
+
+        self._add_delta_rows(batch, src, dst, t)
+        self._refresh_holds(touched)
+
+        budget = max(REGION_SCAN_MIN, REGION_SCAN_PER_ROW * len(batch))
+
+        # A cycle runs over distinct edges: only a new edge can close a new
+        # one, and every cycle through a new edge is new
+        cycle_region, cycles_cut = self._cycle_region(new_edges, budget)
+        cycles = self._cycles_through(cycle_region, new_edges)
+
+        # A burst peak can only grow, and only in windows around the new
+        # transactions of each account
+        smurfing = self._detect_smurfing(self._sub_engine(*self._window_rows(src, dst, t)))
+
+        # An account that is not shell-like before or after the batch can
+        # only start or end a layering chain, and those chains change only
+        # through a shell-like account the batch also touches
+        shell_seeds = touched[was_shell | (self._out_deg[touched] <= SHELL_MAX_OUT_DEGREE)]
+        shell_region, shells_cut = self._shell_region(shell_seeds, budget)
+        shells = self._detect_shells(self._sub_engine(*self._region_rows(shell_region)))
+
+        # Swap the bursts of touched accounts and the chains through shell seeds
+        found = self._keyed(cycles, smurfing, shells)
+        found = [
+            (key, inst) for key, inst in self._involving(found, touched, shell_seeds)
+            if key[0] != "smurf" or self._stronger_burst(inst, self._patterns.get(key))
+        ]
+        stale = {
+            key for c in shell_seeds.tolist() for key in self._by_account.get(c, ())
+            if key[0] == "shell"
+        }
+        changed = self._swap_patterns(stale, found)
+
+        affected = np.unique(np.concatenate([touched, changed]))
+        self._rescore(affected)
+
+        return {
+            "transactions":      len(batch),
+            "new_accounts":      self._n - n_before,
+            "touched_accounts":  len(touched),
+            "region_accounts":   len(np.union1d(cycle_region, shell_region)),
+            "region_truncated":  cycles_cut or shells_cut,
+            "patterns_removed":  len(stale),
+            "patterns_added":    len(found),
+            "rescored_accounts": len(affected),
+            "compacted":         False,
+        }
+
+    def _register_accounts(self, batch: pd.DataFrame) -> tuple[np.ndarray, np.ndarray]:
+        # Same interleaved first-seen order as Graph, so codes survive compaction
+        m    = len(batch)
+        ends = np.empty(2 * m, dtype=object)
+        ends[0::2] = batch["sender_id"].to_numpy(dtype=object)
+        ends[1::2] = batch["receiver_id"].to_numpy(dtype=object)
+
+        for a in pd.unique(ends).tolist():
+            if a not in self._acc_idx:
+                self._acc_idx[a] = len(self._accounts)
+                self._accounts.append(a)
+        self._ensure_capacity(len(self._accounts))
+        self._n = len(self._accounts)
+
+        codes = self._codes_of(ends.tolist())
+        return codes[0::2], codes[1::2]
+
+    def _record_spans(self, src: np.ndarray, dst: np.ndarray, t: np.ndarray) -> None:
+        valid = t != _NO_TIME_MIN
+        for codes in (src[valid], dst[valid]):
+            np.minimum.at(self._first_seen, codes, t[valid])
+            np.maximum.at(self._last_seen,  codes, t[valid])
+
+    def _refresh_holds(self, codes: np.ndarray) -> None:
+        """Recompute the hold sums of `codes` from all of their transactions."""
+        b_out, d_out = self._rows(codes, outgoing=True)
+        b_in,  d_in  = self._rows(codes, outgoing=False)
+        base  = np.unique(np.concatenate([b_out, b_in]))
+        delta = np.unique(np.asarray(d_out + d_in, dtype=np.int64))
+
+        src = np.concatenate([self._base.graph.src[base], np.asarray(self._delta_src, dtype=np.int64)[delta]])
+        dst = np.concatenate([self._base.graph.dst[base], np.asarray(self._delta_dst, dtype=np.int64)[delta]])
+        ts  = np.concatenate([self._base_ts[base], np.asarray(self._delta_ts, dtype=np.int64)[delta]])
+
+        ends, local = np.unique(np.concatenate([src, dst]), return_inverse=True)
+        sums = hold_sums(
+            local[:len(src)], local[len(src):], np.where(ts != _NO_TIME_MIN, ts, NAT_NS), len(ends)
+        )
+        self._holds[codes] = sums[np.searchsorted(ends, codes)]
+
+    def _has_edge(self, u: int, v: int) -> bool:
+        if (u, v) in self._delta_edges:
+            return True
+        if u < self._base_n and v < self._base_n:
+            return bool(self._base._has_edges(np.array([u]), np.array([v]))[0])
+        return False
+
+    def _add_edges(self, src: np.ndarray, dst: np.ndarray) -> np.ndarray:
+        """Count the batch's edges in; returns the new distinct ones as (u, v) rows."""
+        pairs, counts = np.unique(np.column_stack([src, dst]), axis=0, return_counts=True)
+        new = []
+        for (u, v), k in zip(pairs.tolist(), counts.tolist()):
+            if not self._has_edge(u, v):
+                new.append((u, v))
+                # New distinct edge: degrees move, and each end gets the
+                # first-hop share of the other's risk (the rest of the
+                # re-weighting waits for the next compaction)
+                self._out_deg[u] += 1
+                self._in_deg[v]  += 1
+                self._delta_succ.setdefault(u, []).append(v)
+                self._delta_pred.setdefault(v, []).append(u)
+                self._net_raw[u] += self._structural[v] / (self._in_deg[v] + self._out_deg[v])
+                self._net_raw[v] += self._structural[u] / (self._in_deg[u] + self._out_deg[u])
+            self._delta_edges[(u, v)] = self._delta_edges.get((u, v), 0) + k
+        return np.array(new, dtype=np.int64).reshape(-1, 2)
+
+    def _add_delta_rows(
+        self, batch: pd.DataFrame, src: np.ndarray, dst: np.ndarray, t: np.ndarray
+    ) -> None:
+        start = self._delta_size
+        for c in Graph.REQUIRED_COLUMNS:
+            self._delta_cols[c].extend(batch[c].tolist())
+        self._delta_src.extend(src.tolist())
+        self._delta_dst.extend(dst.tolist())
+        self._delta_ts.extend(t.tolist())
+        for row, (u, v) in enumerate(zip(src.tolist(), dst.tolist()), start=start):
+            self._delta_out.setdefault(u, []).append(row)
+            self._delta_in.setdefault(v, []).append(row)
+
+    # ─────────────────────────────────────────────────────────────────
+    # Region extraction
+    # ─────────────────────────────────────────────────────────────────
+    def _adjacent(self, codes: np.ndarray, outgoing: bool) -> tuple[np.ndarray, np.ndarray]:
+        """(index into codes, neighbour) for every distinct out- or in-edge of `codes`."""
+        owners, nbrs = [], []
+        b = np.flatnonzero(codes < self._base_n)
+        if len(b):
+            base     = self._base
+            ptr, idx = (base._out_ptr, base._out_idx) if outgoing else (base._in_ptr, base._in_idx)
+            counts   = ptr[codes[b] + 1] - ptr[codes[b]]
+            owners.append(np.repeat(b, counts))
+            nbrs.append(idx[_segment_positions(ptr[codes[b]], counts)].astype(np.int64))
+
+        delta = self._delta_succ if outgoing else self._delta_pred
+        for i, c in enumerate(codes.tolist()):
+            extra = delta.get(c)
+            if extra:
+                owners.append(np.full(len(extra), i, dtype=np.int64))
+                nbrs.append(np.asarray(extra, dtype=np.int64))
+
+        if not owners:
+            empty = np.zeros(0, dtype=np.int64)
+            return empty, empty
+        return np.concatenate(owners), np.concatenate(nbrs)
+
+    def _neighbour_pairs(self, codes: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Undirected adjacency of `codes`, with the same multiplicity as MainEngine._adj."""
+        o_out, n_out = self._adjacent(codes, outgoing=True)
+        o_in,  n_in  = self._adjacent(codes, outgoing=False)
+        return np.concatenate([o_out, o_in]), np.concatenate([n_out, n_in])
+
+    def _distances(
+        self,
+        seeds:    np.ndarray,
+        outgoing: bool,
+        depth:    int,
+        budget:   int,
+        through:  Optional[np.ndarray] = None,
+    ) -> tuple[np.ndarray, bool]:
+        """
+        Directed BFS hop counts from `seeds` (or towards them with
+        outgoing=False). With `through`, only seeds and accounts where
+        through[x] is True are expanded further. Expanding an account
+        costs its degree in that direction against `budget`: per hop the
+        cheapest accounts go first, the others keep their distance but are
+        not expanded. Returns (dist, truncated).
+        """
+        degree    = self._out_deg if outgoing else self._in_deg
+        dist      = np.full(self._n, _UNREACHED, dtype=np.int32)
+        dist[seeds] = 0
+        frontier  = seeds
+        truncated = False
+        for d in range(1, depth + 1):
+            if through is not None:
+                frontier = frontier[(dist[frontier] == 0) | through[frontier]]
+            cost  = degree[frontier].astype(np.int64)
+            order = np.argsort(cost, kind="stable")
+            spent = np.cumsum(cost[order])
+            fit   = int(np.searchsorted(spent, budget, side="right"))
+            truncated |= fit < len(frontier)
+            if not fit:
+                break
+            budget  -= int(spent[fit - 1])
+            _, nbrs  = self._adjacent(frontier[order[:fit]], outgoing)
+            frontier = np.unique(nbrs[dist[nbrs] == _UNREACHED])
+            if not len(frontier):
+                break
+            dist[frontier] = d
+        return dist, bool(truncated)
+
+    def _cycle_region(self, edges: np.ndarray, budget: int) -> tuple[np.ndarray, bool]:
+        """
+        Accounts that can sit on a cycle through one of the new `edges`
+        (u → v rows): on a path from some v to some u short enough for the
+        edge to close it. Returns (sorted codes, truncated).
+        """
+        if not len(edges):
+            return np.zeros(0, dtype=np.int64), False
+        max_len = MainEngine.MAX_CYCLE_LENGTH
+        fwd, fwd_cut = self._distances(np.unique(edges[:, 1]), True,  max_len - 1, budget)
+        bwd, bwd_cut = self._distances(np.unique(edges[:, 0]), False, max_len - 1, budget)
+        return np.flatnonzero(fwd.astype(np.int64) + bwd <= max_len - 1), fwd_cut or bwd_cut
+
+    def _shell_region(self, seeds: np.ndarray, budget: int) -> tuple[np.ndarray, bool]:
+        """
+        Accounts on a layering chain through a shell seed: chains only
+        continue across shell-like accounts (one extra step back decides
+        whether a chain start is itself a continuation). Returns (sorted
+        codes, truncated).
+        """
+        if not len(seeds):
+            return np.zeros(0, dtype=np.int64), False
+        shell_ok = self._out_deg[:self._n] <= SHELL_MAX_OUT_DEGREE
+        fwd, fwd_cut = self._distances(seeds, True,  SHELL_MAX_HOPS,     budget, through=shell_ok)
+        bwd, bwd_cut = self._distances(seeds, False, SHELL_MAX_HOPS + 1, budget, through=shell_ok)
+        return np.flatnonzero((fwd != _UNREACHED) | (bwd != _UNREACHED)), fwd_cut or bwd_cut
+
+    def _cycles_through(self, region: np.ndarray, edges: np.ndarray) -> list[dict]:
+        """
+        Cycles through the new `edges`, searched over the distinct edges
+        inside `region`, within the strongly connected components that
+        contain both ends of one of them.
+        """
+        if not len(region):
+            return []
+        r = len(region)
+        owner, nbrs = self._adjacent(region, outgoing=True)
+        at     = np.searchsorted(region, nbrs)
+        inside = (at < r) & (region[np.minimum(at, r - 1)] == nbrs)
+        local  = csr_matrix(
+            (np.ones(int(inside.sum()), dtype=np.int8), (owner[inside], at[inside])), shape=(r, r)
+        )
+        _, labels = connected_components(local, directed=True, connection="strong")
+
+        u, v   = (np.searchsorted(region, edges[:, i]) for i in (0, 1))
+        closed = (u < r) & (v < r)
+        closed[closed] &= (region[u[closed]] == edges[closed, 0]) & (region[v[closed]] == edges[closed, 1])
+        closed[closed] &= labels[u[closed]] == labels[v[closed]]
+        if not closed.any():
+            return []
+
+        keep = np.flatnonzero(np.isin(labels, labels[u[closed]]))
+        sub  = local[keep][:, keep].tocsr()
+        sub.sort_indices()
+        found = cycles_through(
+            sub.indptr, sub.indices, region[keep],
+            np.column_stack([np.searchsorted(keep, u[closed]), np.searchsorted(keep, v[closed])]),
+            MainEngine.MAX_CYCLE_LENGTH, MainEngine.MAX_CYCLES_PER_NODE,
+            self._cycle_starts[region[keep]],
+        )
+        acc = self._accounts
+        return [
+            {"accounts": [acc[i] for i in cycle], "pattern": f"cycle_length_{len(cycle)}"}
+            for cycle in found
+        ]
+
+    def _rows(self, codes: np.ndarray, outgoing: bool) -> tuple[np.ndarray, list]:
+        """Base and delta row ids of transactions sent (or received) by `codes`."""
+        order, ptr = (
+            (self._base_by_src, self._base_src_ptr) if outgoing
+            else (self._base_by_dst, self._base_dst_ptr)
+        )
+        b      = codes[codes < self._base_n]
+        counts = ptr[b + 1] - ptr[b]
+        delta  = self._delta_out if outgoing else self._delta_in
+        return (
+            order[_segment_positions(ptr[b], counts)],
+            [r for c in codes.tolist() for r in delta.get(c, ())],
+        )
+
+    def _region_rows(self, region: np.ndarray) -> tuple[np.ndarray, list]:
+        """Base and delta row ids of the transactions inside `region`."""
+        in_region = np.zeros(self._n, dtype=bool)
+        in_region[region] = True
+        base_rows, delta_rows = self._rows(region, outgoing=True)
+        return (
+            base_rows[in_region[self._base.graph.dst[base_rows]]],
+            [r for r in delta_rows if in_region[self._delta_dst[r]]],
+        )
+
+    def _window_rows(
+        self, src: np.ndarray, dst: np.ndarray, t: np.ndarray
+    ) -> tuple[np.ndarray, list]:
+        """
+        Base and delta row ids of the transactions of every account of
+        the batch (src → dst at t) within the longest burst window of one
+        of its new transactions: all a changed burst peak can rest on.
+        """
+        valid = t != _NO_TIME_MIN
+        ends, local = np.unique(np.concatenate([src[valid], dst[valid]]), return_inverse=True)
+        times = np.concatenate([t[valid], t[valid]])
+        reach = int(max(SMURF_WINDOWS_HOURS) * 3_600_000_000_000)
+        lo    = np.full(len(ends), _NO_TIME_MIN, dtype=np.int64)
+        hi    = np.full(len(ends), _NO_TIME_MAX, dtype=np.int64)
+        np.minimum.at(lo, local, times)
+        np.maximum.at(hi, local, times)
+        lo, hi = lo - reach, hi + reach
+
+        base_parts, delta_rows = [], []
+        at     = dict(zip(ends.tolist(), range(len(ends))))
+        lo_, hi_ = lo.tolist(), hi.tolist()
+        for outgoing in (True, False):
+            b, d  = self._rows(ends, outgoing)
+            owner = np.searchsorted(ends, (self._base.graph.src if outgoing else self._base.graph.dst)[b])
+            ts    = self._base_ts[b]
+            base_parts.append(b[(ts >= lo[owner]) & (ts <= hi[owner])])
+
+            owners = self._delta_src if outgoing else self._delta_dst
+            delta_rows.extend(
+                r for r in d if lo_[at[owners[r]]] <= self._delta_ts[r] <= hi_[at[owners[r]]]
+            )
+        return np.concatenate(base_parts), delta_rows
+
+    def _sub_engine(self, base_rows: np.ndarray, delta_rows: list) -> Optional[MainEngine]:
+        """MainEngine over the given base and delta rows (None when there are none)."""
+        if not len(base_rows) and not delta_rows:
+            return None
+        frame = pd.concat([
+            self._base.graph.dataframe.iloc[np.unique(base_rows)],
+            self._delta_frame(sorted(set(delta_rows))),
+        ], ignore_index=True)
+        engine = MainEngine(Graph.from_normalized(frame))
+
+        # Shell and burst checks must see each account's full-graph degree,
+        # not its degree inside the extracted rows
+        codes = self._codes_of(engine._accounts)
+        engine._in_deg  = self._in_deg[codes].copy()
+        engine._out_deg = self._out_deg[codes].copy()
+        engine._degrees = engine._in_deg + engine._out_deg
+        return engine
+
+    # ─────────────────────────────────────────────────────────────────
+    # Patterns and scores
+    # ─────────────────────────────────────────────────────────────────
+    @staticmethod
+    def _detect_smurfing(engine: Optional[MainEngine]) -> list:
+        return engine.detect_smurfing(windows_hours=SMURF_WINDOWS_HOURS) if engine is not None else []
+
+    @staticmethod
+    def _detect_shells(engine: Optional[MainEngine]) -> list:
+        if engine is None:
+            return []
+        return engine.detect_layered_shells(
+            max_hops=SHELL_MAX_HOPS,
+            max_shell_out_degree=SHELL_MAX_OUT_DEGREE,
+        )
+
+    @classmethod
+    def _run_detectors(cls, engine: MainEngine) -> tuple[list, list, list]:
+        cycles = engine.detect_cycles(
+            max_length=engine.MAX_CYCLE_LENGTH,
+            max_cycles_per_node=engine.MAX_CYCLES_PER_NODE,
+        )
+        return cycles, cls._detect_smurfing(engine), cls._detect_shells(engine)
+
+    @staticmethod
+    def _stronger_burst(new: dict, old: Optional[dict]) -> bool:
+        """detect_smurfing keeps the shortest triggering window, then its peak."""
+        if old is None:
+            return True
+        return (new["window_hours"], -new["counterparties"]) < (old["window_hours"], -old["counterparties"])
+
+    @staticmethod
+    def _keyed(cycles: list, smurfing: list, shells: list) -> list[tuple]:
+        return (
+            [(("cycle", tuple(c["accounts"])), c) for c in cycles] +
+            [(("smurf", s["account"], s["pattern"]), s) for s in smurfing] +
+            [(("shell", tuple(sh["accounts"])), sh) for sh in shells]
+        )
+
+    def _involving(self, keyed, touched: np.ndarray, shell_seeds: np.ndarray) -> list[tuple]:
+        """Pattern instances an append must rebuild: cycles and bursts of a
+        touched account, layering chains through a shell seed."""
+        touched = {self._accounts[c] for c in touched.tolist()}
+        seeds   = {self._accounts[c] for c in shell_seeds.tolist()}
+        return [
+            (key, inst) for key, inst in keyed
+            if any(a in (seeds if key[0] == "shell" else touched) for a in inst.get("accounts", [inst.get("account")]))
+        ]
+
+    def _members(self, key: tuple, inst: dict) -> np.ndarray:
+        if key[0] == "smurf":
+            return self._codes_of([inst["account"]])
+        return np.unique(self._codes_of(inst["accounts"]))
+
+    def _swap_patterns(self, remove: set, add: list) -> np.ndarray:
+        """
+        Drop pattern keys `remove`, insert (key, instance) pairs `add`,
+        and propagate the resulting structural changes into the network
+        sums. Returns the accounts whose score inputs moved.
+        """
+        touched = []
+
+        def count(key: tuple, inst: dict, sign: int) -> None:
+            members = self._members(key, inst)
+            touched.append(members)
+            if key[0] == "cycle":
+                self._cycle_cnt[members] += sign
+                if len(inst["accounts"]) == 3:
+                    self._cycle3_cnt[members] += sign
+                else:
+                    # The DFS cap of detect_cycles counts per starting account
+                    self._cycle_starts[self._acc_idx[inst["accounts"][0]]] += sign
+            elif key[0] == "shell":
+                self._shell_cnt[members] += sign
+            else:
+                self._smurf_cnt[members] += sign
+            for c in members.tolist():
+                if sign > 0:
+                    self._by_account.setdefault(c, set()).add(key)
+                else:
+                    self._by_account.get(c, set()).discard(key)
+
+        for key in remove:
+            inst = self._patterns.pop(key, None)
+            if inst is not None:
+                count(key, inst, -1)
+        for key, inst in add:
+            old = self._patterns.get(key)
+            if old is not None:
+                count(key, old, -1)
+            self._patterns[key] = inst
+            count(key, inst, +1)
+
+        if not touched:
+            return np.zeros(0, dtype=np.int64)
+        changed = np.unique(np.concatenate(touched))
+
+        new_struct = _structural_score(
+            self._cycle_cnt[changed] > 0,
+            self._smurf_cnt[changed] > 0,
+            self._shell_cnt[changed] > 0,
+        )
+        diff = new_struct - self._structural[changed]
+        self._structural[changed] = new_struct
+
+        moved   = diff != 0
+        reached = self._propagate_change(changed[moved], diff[moved])
+
+        return np.unique(np.concatenate([changed, reached]))
+
+    def _propagate_change(self, codes: np.ndarray, delta: np.ndarray) -> np.ndarray:
+        """
+        Add the diffusion of structural changes `delta` at `codes` to the
+        network sums: the series MainEngine.propagate_risk sums, pushed
+        hop by hop over the current adjacency and only as far as the
+        change stays above `tol` of its largest entry. Returns the
+        accounts whose sums moved.
+        """
+        if not len(codes):
+            return np.zeros(0, dtype=np.int64)
+        damping  = _PROPAGATION["damping"]
+        floor    = _PROPAGATION["tol"] * float(np.abs(delta).max())
+        frontier = codes
+        values   = delta.astype(np.float64)
+        reached  = []
+
+        for _ in range(_PROPAGATION["max_iter"]):
+            owner, nbrs = self._neighbour_pairs(frontier)
+            if not len(nbrs):
+                break
+            degree = (self._in_deg[frontier] + self._out_deg[frontier]).astype(np.float64)
+            frontier, inverse = np.unique(nbrs, return_inverse=True)
+            values = np.bincount(inverse, weights=(values / degree)[owner])
+            self._net_raw[frontier] += values
+            reached.append(frontier)
+
+            values = values * damping
+            keep   = np.abs(values) > floor
+            frontier, values = frontier[keep], values[keep]
+            if not len(frontier):
+                break
+
+        return np.unique(np.concatenate(reached)) if reached else np.zeros(0, dtype=np.int64)
+
+    def _rescore(self, codes: np.ndarray) -> None:
+        if not len(codes):
+            return
+        n    = max(self._n, 1)
+        mean = self._deg_sum / n
+        std  = float(np.sqrt(max(self._deg_sumsq / n - mean ** 2, 0.0))) or 1.0
+
+        self._net_max = max(self._net_max, float(self._net_raw[codes].max()))
+        network = (
+            self._net_raw[codes] / self._net_max if self._net_max > 0
+            else np.zeros(len(codes))
+        )
+        self._scores[codes] = _final_scores(
+            self._structural[codes], self._in_deg[codes], self._out_deg[codes],
+            network, mean, std,
+        )
+
+    # ─────────────────────────────────────────────────────────────────
+    # Results
+    # ─────────────────────────────────────────────────────────────────
+    def scores(self) -> dict:
+        return dict(zip(self._accounts, self._scores[:self._n].tolist()))
+
+    def patterns(self) -> tuple[list, list, list]:
+        found = {"cycle": [], "smurf": [], "shell": []}
+        for key, inst in self._patterns.items():
+            found[key[0]].append(inst)
+        return found["cycle"], found["smurf"], found["shell"]
+
+    def report(self) -> dict:
+        """Current state in the same shape as MainEngine.run_full_pipeline()."""
+        if self._base is None:
+            return {
+                "suspicious_accounts": [],
+                "fraud_rings":         [],
+                "account_scores":      {},
+                "summary": {
+                    "total_accounts_analyzed":     0,
+                    "suspicious_accounts_flagged": 0,
+                    "fraud_rings_detected":        0,
+                },
+            }
+
+        scores    = self.scores()
+        cycles, smurfing, shells = self.patterns()
+        threshold = self._base.adaptive_threshold(scores)
+        rings     = self._base.build_fraud_rings(cycles, smurfing, shells, scores)
+        n         = self._n
+
+        suspicious = _records(_suspicious_frame(
+            accounts  = self._accounts,
+            codes_of  = self._codes_of,
+            picked    = np.flatnonzero(self._scores[:n] >= threshold),
+            scores    = self._scores[:n].astype(np.float64),
+            patterns  = (cycles, smurfing, shells),
+            rings     = rings,
+            features  = feature_matrix(
+                self._flow[:n], self._out_deg[:n], self._in_deg[:n],
+                self._first_seen[:n], self._last_seen[:n], self._holds[:n], dtype=np.float64,
+            ),
+            triangles = lambda codes: self._cycle3_cnt[codes],
+            network   = (
+                self._net_raw[:n] / self._net_max if self._net_max > 0 else np.zeros(n)
+            ),
+        ))
+
+        return {
+            "suspicious_accounts": suspicious,
+            "fraud_rings":         rings,
+            "account_scores":      scores,
+            "summary": {
+                "total_accounts_analyzed":     self._n,
+                "suspicious_accounts_flagged": len(suspicious),
+                "fraud_rings_detected":        len(rings),
+            },
+        }
@@ -0,0 +1,371 @@
+"""
+Out-of-core graph build: raw CSV chunks in, a Graph snapshot out,
+without the whole file ever being in memory.
+
+Every chunk is normalized like Graph does it, its accounts get global
+codes (first-seen order over interleaved sender / receiver, as in
+Graph), and it is sorted by time and spilled to disk as one run. The
+runs are merged block by block straight into the snapshot's row arrays;
+the distinct edges come from sorting and merging the (src, dst) keys the
+same way, and the CSC order from a second pass over (dst, src). The
+result is the snapshot Graph.save would have written for the whole
+frame, so Graph.load maps it and nothing downstream changes.
+
+`memory_limit_mb` bounds the rows held at once (chunk and merge block
+sizes). What grows with the number of accounts instead of transactions
+— the account table, indptr arrays and labels — is not bounded by it.
+"""
+
+import os
+import shutil
+import tempfile
+from typing import Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+from .build_graph import Graph
+from .parsing import MAX_EXAMPLES, NAT_NS
+from .snapshot import SnapshotWriter, encode_labels
+
+
+# Rough peak bytes per row while a raw CSV chunk is parsed and normalized,
+# and per row held in a merge block (all columns plus sort scratch)
+PARSE_BYTES_PER_ROW = 1200
+MERGE_BYTES_PER_ROW = 160
+
+MIN_CHUNK_ROWS = 10_000
+MAX_CHUNK_ROWS = 1_000_000
+MIN_BLOCK_ROWS = 4_096
+
+_ROW_COLUMNS = ("src", "dst", "amount", "ts_ns", "tx_ids")
+_LAST        = np.iinfo(np.int64).max
+
+
+def chunk_rows(memory_limit_mb: int) -> int:
+    """CSV rows to parse at a time: half the budget goes to one chunk."""
+    rows = memory_limit_mb * 2**20 // 2 // PARSE_BYTES_PER_ROW
+    return int(min(max(rows, MIN_CHUNK_ROWS), MAX_CHUNK_ROWS))
+
+
+def _block_rows(memory_limit_mb: int, runs: int) -> int:
+    """Rows taken from each of `runs` runs per merge step."""
+    rows = memory_limit_mb * 2**20 // 2 // MERGE_BYTES_PER_ROW
+    return int(max(rows // max(runs, 1), MIN_BLOCK_ROWS))
+
+
+# ─────────────────────────────────────────────────────────────────────
+# Spill files and merging
+# ─────────────────────────────────────────────────────────────────────
+class _Spill:
+    """Append-only raw file of one dtype, mapped read-only once written."""
+
+    def __init__(self, directory: str, name: str, dtype) -> None:
+        self.path  = os.path.join(directory, f"{name}.bin")
+        self.dtype = np.dtype(dtype)
+        self.size  = 0
+        self._file = open(self.path, "wb")
+
+    def append(self, values: np.ndarray) -> None:
+        np.ascontiguousarray(values, dtype=self.dtype).tofile(self._file)
+        self.size += len(values)
+
+    def array(self) -> np.ndarray:
+        self._file.close()
+        if self.size == 0:
+            return np.empty(0, dtype=self.dtype)
+        return np.memmap(self.path, dtype=self.dtype, mode="r", shape=(self.size,))
+
+
+def _save_run(directory: str, name: str, columns: dict[str, np.ndarray]) -> dict[str, np.ndarray]:
+    """Write one sorted run as .npy files; returns their read-only maps."""
+    run = {}
+    for column, values in columns.items():
+        path = os.path.join(directory, f"{name}.{column}.npy")
+        np.save(path, np.ascontiguousarray(values))
+        run[column] = np.load(path, mmap_mode="r")
+    return run
+
+
+def _count_le(head: dict, keys: tuple, cut: tuple) -> int:
+    """Length of the prefix of a sorted block that is <= `cut`."""
+    lo, hi = 0, len(head[keys[0]])
+    for key, value in zip(keys[:-1], cut[:-1]):
+        col    = head[key][lo:hi]
+        lo, hi = lo + int(np.searchsorted(col, value, "left")), lo + int(np.searchsorted(col, value, "right"))
+    return lo + int(np.searchsorted(head[keys[-1]][lo:hi], cut[-1], "right"))
+
+
+def _merge_runs(
+    runs:       list[dict[str, np.ndarray]],
+    keys:       tuple[str, ...],
+    block_rows: int,
+    dtypes:     Optional[dict] = None,
+):
+    """
+    Blocks of the rows of `runs` (dicts of equal-length columns, each
+    sorted by the `keys` columns) in merged order. Each step looks at the
+    next `block_rows` rows of every run and emits everything up to the
+    smallest last key of a run that continues past its block, so a block
+    holds at most block_rows rows per run. Columns named in `dtypes` are
+    cast to that dtype before runs are joined.
+    """
+    dtypes = dtypes or {}
+    pos    = [0] * len(runs)
+    sizes  = [len(run[keys[0]]) for run in runs]
+
+    while True:
+        live = [i for i in range(len(runs)) if pos[i] < sizes[i]]
+        if not live:
+            return
+        heads = {
+            i: {name: col[pos[i]:pos[i] + block_rows] for name, col in runs[i].items()}
+            for i in live
+        }
+        ends = [
+            tuple(heads[i][k][-1] for k in keys)
+            for i in live if pos[i] + block_rows < sizes[i]
+        ]
+        cut = min(ends) if ends else None
+
+        parts = []
+        for i in live:
+            take = block_rows if cut is None else _count_le(heads[i], keys, cut)
+            take = min(take, sizes[i] - pos[i])
+            if take:
+                parts.append({name: col[:take] for name, col in heads[i].items()})
+                pos[i] += take
+
+        block = {
+            name: np.concatenate([
+                np.asarray(p[name]).astype(dtypes.get(name, p[name].dtype), copy=False)
+                for p in parts
+            ])
+            for name in parts[0]
+        }
+        order = np.lexsort(tuple(block[k] for k in reversed(keys)))
+        yield {name: col[order] for name, col in block.items()}
+
+
+def _sum_duplicates(keys: np.ndarray, counts: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Sorted `keys` made unique, with the counts of equal keys summed."""
+    if len(keys) == 0:
+        return keys, counts
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    return keys[starts], np.add.reduceat(counts, starts)
+
+
+def _merge_issues(total: dict, chunk: dict, offset: int) -> None:
+    """Add one chunk's parse issues to `total` (example rows made global)."""
+    for column, issues in chunk.items():
+        acc = total.setdefault(column, {**issues, "missing": 0, "unparseable": 0, "examples": []})
+        acc["missing"]     += issues["missing"]
+        acc["unparseable"] += issues["unparseable"]
+        room = MAX_EXAMPLES - len(acc["examples"])
+        acc["examples"]    += [
+            {**example, "row": example["row"] + offset} for example in issues["examples"][:room]
+        ]
+
+
+# ─────────────────────────────────────────────────────────────────────
+# Build
+# ─────────────────────────────────────────────────────────────────────
+def build_snapshot(
+    chunks:          Iterable[pd.DataFrame],
+    path:            str,
+    memory_limit_mb: int,
+    spill_dir:       Optional[str] = None,
+) -> dict:
+    """
+    Write the snapshot of the transactions in `chunks` (raw frames as
+    read_csv(chunksize=chunk_rows(memory_limit_mb)) yields them) to
+    `path`. Spill files go to a temporary directory under `spill_dir`
+    and are removed at the end. Returns counts for profiling.
+    """
+    spill  = tempfile.mkdtemp(dir=spill_dir, prefix=".spill-")
+    writer = SnapshotWriter(path)
+    try:
+        return _build(chunks, writer, memory_limit_mb, spill)
+    except BaseException:
+        writer.abort()
+        raise
+    finally:
+        shutil.rmtree(spill, ignore_errors=True)
+
+
+def _spill_chunks(chunks: Iterable[pd.DataFrame], spill: str) -> tuple[list, list, dict, dict, int]:
+    """
+    Normalize, code and time-sort every chunk into a run on disk.
+    Returns (runs, tx_id kinds, account table, parse issues, raw rows).
+    """
+    table:  dict = {}
+    issues: dict = {}
+    runs, kinds  = [], []
+    raw_rows = rows = 0
+
+    for chunk in chunks:
+        chunk_issues: dict = {}
+        df = Graph._normalize_columns(df=chunk, issues=chunk_issues)
+        _merge_issues(issues, chunk_issues, offset=raw_rows)
+        raw_rows += len(chunk)
+        m = len(df)
+        if m == 0:
+            continue
+
+        ends = np.empty(2 * m, dtype=object)
+        ends[0::2] = df["sender_id"].to_numpy(dtype=object)
+        ends[1::2] = df["receiver_id"].to_numpy(dtype=object)
+        local, uniques = pd.factorize(ends)
+        codes = np.fromiter(
+            (table.setdefault(u, len(table)) for u in uniques.tolist()),
+            dtype=np.int64, count=len(uniques),
+        )[local]
+
+        ts_ns = df["timestamp"].dt.as_unit("ns").to_numpy().view(np.int64)
+        key   = np.where(ts_ns != NAT_NS, ts_ns, _LAST)
+        order = np.argsort(key, kind="stable")
+        tx_ids, kind = encode_labels(df["transaction_id"].to_numpy(dtype=object))
+
+        runs.append(_save_run(spill, f"run{len(runs)}", {
+            "key":    key[order],
+            "row":    rows + order,
+            "src":    codes[0::2][order].astype(np.int32),
+            "dst":    codes[1::2][order].astype(np.int32),
+            "amount": df["amount"].to_numpy(dtype=np.float64)[order],
+            "ts_ns":  ts_ns[order],
+            "tx_ids": tx_ids[order],
+        }))
+        kinds.append(kind)
+        rows += m
+        del df, ends, local, codes
+
+    return runs, kinds, table, issues, raw_rows
+
+
+def _index_dtype(nnz: int) -> np.dtype:
+    """indptr dtype scipy would pick for `nnz` stored edges."""
+    return np.dtype(np.int32 if nnz <= np.iinfo(np.int32).max else np.int64)
+
+
+def _tx_dtype(runs: list, kinds: list) -> tuple[np.dtype, str]:
+    """Snapshot dtype and kind of the transaction IDs of all runs."""
+    if kinds and all(kind == "int" for kind in kinds):
+        return np.dtype(np.int64), "int"
+    width = 1
+    for run, kind in zip(runs, kinds):
+        ids = run["tx_ids"]
+        if kind == "str":
+            width = max(width, ids.dtype.itemsize)
+        elif len(ids):
+            width = max(width, len(str(ids.min())), len(str(ids.max())))
+    return np.dtype(f"S{width}"), "str"
+
+
+def _build(chunks: Iterable[pd.DataFrame], writer: SnapshotWriter, memory_limit_mb: int, spill: str) -> dict:
+    runs, kinds, table, issues, raw_rows = _spill_chunks(chunks, spill)
+    m = sum(len(run["key"]) for run in runs)
+    n = len(table)
+    block = _block_rows(memory_limit_mb, len(runs))
+
+    accounts = np.empty(n, dtype=object)
+    accounts[:] = list(table)
+    del table
+    accounts, accounts_kind = encode_labels(accounts)
+    writer.save("accounts", accounts)
+    del accounts
+
+    # Rows in time order (NaT last, ties by position) like Graph.save
+    tx_dtype, tx_kind = _tx_dtype(runs, kinds)
+    out = {
+        "src":    writer.array("src",    np.int32,   (m,)),
+        "dst":    writer.array("dst",    np.int32,   (m,)),
+        "amount": writer.array("amount", np.float64, (m,)),
+        "ts_ns":  writer.array("ts_ns",  np.int64,   (m,)),
+        "tx_ids": writer.array("tx_ids", tx_dtype,   (m,)),
+    }
+    pos = 0
+    for rows in _merge_runs(runs, ("key", "row"), block, {"tx_ids": tx_dtype}):
+        k = len(rows["key"])
+        for name in _ROW_COLUMNS:
+            out[name][pos:pos + k] = rows[name]
+        pos += k
+    del runs
+
+    # Distinct edges: per-block unique (src * n + dst) keys, merged
+    width = max(n, 1)
+    step  = block * 4
+    src, dst = out["src"], out["dst"]
+    edge_runs = []
+    for start in range(0, m, step):
+        keys = src[start:start + step].astype(np.int64) * n + dst[start:start + step]
+        uniq, counts = np.unique(keys, return_counts=True)
+        edge_runs.append(_save_run(spill, f"edges{len(edge_runs)}", {"key": uniq, "count": counts}))
+
+    edge_keys = _Spill(spill, "edge_keys", np.int64)
+    edge_mult = _Spill(spill, "edge_mult", np.int64)
+    for edges in _merge_runs(edge_runs, ("key",), _block_rows(memory_limit_mb, len(edge_runs))):
+        keys, counts = _sum_duplicates(edges["key"], edges["count"])
+        edge_keys.append(keys)
+        edge_mult.append(counts)
+    edge_keys, edge_mult = edge_keys.array(), edge_mult.array()
+    e = len(edge_keys)
+
+    # Edge of every row: its key's position among the distinct keys
+    edge_ids = writer.array("edge_ids", np.int32, (m,))
+    for start in range(0, m, step):
+        keys = src[start:start + step].astype(np.int64) * n + dst[start:start + step]
+        edge_ids[start:start + step] = np.searchsorted(edge_keys, keys)
+
+    # CSR straight from the sorted keys; CSC needs them by (dst, src)
+    csr_ptr  = np.zeros(n + 1, dtype=np.int64)
+    csr_idx  = writer.array("csr_indices", np.int32,   (e,))
+    csr_data = writer.array("csr_data",    np.float32, (e,))
+    csc_runs = []
+    for start in range(0, e, step):
+        keys = np.asarray(edge_keys[start:start + step])
+        rows, cols = keys // width, keys % width
+        csr_ptr[1:] += np.bincount(rows, minlength=n)
+        csr_idx[start:start + step]  = cols
+        csr_data[start:start + step] = edge_mult[start:start + step]
+
+        transposed = cols * n + rows
+        order      = np.argsort(transposed)
+        csc_runs.append(_save_run(spill, f"csc{len(csc_runs)}", {
+            "key":   transposed[order],
+            "count": np.asarray(edge_mult[start:start + step])[order],
+        }))
+    np.cumsum(csr_ptr, out=csr_ptr)
+    writer.save("csr_indptr", csr_ptr.astype(_index_dtype(e)))
+
+    csc_ptr  = np.zeros(n + 1, dtype=np.int64)
+    csc_idx  = writer.array("csc_indices", np.int32,   (e,))
+    csc_data = writer.array("csc_data",    np.float32, (e,))
+    pos = 0
+    for edges in _merge_runs(csc_runs, ("key",), _block_rows(memory_limit_mb, len(csc_runs))):
+        keys = edges["key"]
+        k    = len(keys)
+        csc_ptr[1:] += np.bincount(keys // width, minlength=n)
+        csc_idx[pos:pos + k]  = keys % width
+        csc_data[pos:pos + k] = edges["count"]
+        pos += k
+    np.cumsum(csc_ptr, out=csc_ptr)
+    writer.save("csc_indptr", csc_ptr.astype(_index_dtype(e)))
+
+    for arr in (*out.values(), edge_ids, csr_idx, csr_data, csc_idx, csc_data):
+        arr.flush()
+    writer.commit({
+        "accounts_kind":  accounts_kind,
+        "tx_ids_kind":    tx_kind,
+        "n_accounts":     n,
+        "n_transactions": m,
+        "n_edges":        e,
+        "parse_issues":   issues,
+    })
+    return {
+        "raw_rows":   raw_rows,
+        "rows":       m,
+        "accounts":   n,
+        "edges":      e,
+        "runs":       len(kinds),
+        "block_rows": block,
+    }
@@ -0,0 +1,378 @@
+"""
+Typed parsing of the amount and timestamp columns.
+
+The format of a column is inferred once from a sample of its values and
+cached under the column's signature (the digit / letter shapes of the
+sample), so later files with the same layout skip inference. Values are
+then read as fixed-width unicode arrays, one uint32 code point per cell,
+and digits, separators and date fields are decoded with array arithmetic
+instead of a per-row regex or strptime. Only the rows the fast path does
+not accept go through pandas; what still fails is reported as
+unparseable instead of silently becoming NaN / NaT.
+"""
+
+import re
+from collections import OrderedDict
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_bool_dtype, is_datetime64_any_dtype, is_numeric_dtype
+
+
+# int64 value of NaT in `ts_ns`
+NAT_NS = np.iinfo(np.int64).min
+
+SAMPLE_SIZE  = 1000                 # values looked at to infer a format
+CHUNK_ROWS   = 1 << 18              # rows decoded per array pass (bounds temporaries)
+MAX_EXAMPLES = 5                    # unparseable values reported per column
+CACHE_SIZE   = 128                  # remembered column signatures
+
+# Tried in order; with equal hits the earlier one wins, so day-first
+# layouts are preferred like pd.to_datetime(dayfirst=True) did
+TIMESTAMP_FORMATS = (
+    "%d/%m/%Y %H:%M:%S", "%d/%m/%Y %H:%M", "%d/%m/%Y",
+    "%d-%m-%Y %H:%M:%S", "%d-%m-%Y %H:%M", "%d-%m-%Y",
+    "%d.%m.%Y %H:%M:%S", "%d.%m.%Y %H:%M", "%d.%m.%Y",
+    "%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%d",
+    "%Y/%m/%d %H:%M:%S", "%Y/%m/%d",
+    "%m/%d/%Y %H:%M:%S", "%m/%d/%Y %H:%M", "%m/%d/%Y",
+    "%d/%m/%y %H:%M:%S", "%d/%m/%y",
+    "ISO8601",
+)
+
+# Width of the strptime fields the fixed-width decoder understands
+_FIELDS = {"d": 2, "m": 2, "Y": 4, "y": 2, "H": 2, "M": 2, "S": 2}
+
+# Dropped from amounts wherever they appear, besides the thousands separator
+CURRENCY_SYMBOLS = "₹$€£¥ "
+MAX_AMOUNT_WIDTH = 32
+_MAX_DIGITS      = 15               # exact in float64 (< 2**53)
+
+# Character classes of amounts (signs last, so `>= _MINUS` is any sign)
+_OTHER, _DIGIT, _SKIP, _POINT, _MINUS, _PLUS = range(6)
+
+_POW10_FLOAT = 10.0 ** np.arange(_MAX_DIGITS + 1)
+_DAYS        = np.array([0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31], dtype=np.int64)
+_SUFFIXES    = re.compile(r"(cr|dr)", re.I)
+
+_format_cache: "OrderedDict[tuple, object]" = OrderedDict()
+
+
+# ─────────────────────────────────────────────────────────────────────
+# Shared helpers
+# ─────────────────────────────────────────────────────────────────────
+def _text(column: pd.Series) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(values as an object array of str, missing mask, lengths)."""
+    text = column.to_numpy(dtype=object)
+    try:
+        lens = np.fromiter(map(len, text), dtype=np.int64, count=len(text))
+    except TypeError:
+        # Missing values, or other objects (e.g. ints next to strings)
+        text = np.array(
+            ["" if pd.isna(v) else v if isinstance(v, str) else str(v) for v in text.tolist()],
+            dtype=object,
+        )
+        lens = np.fromiter(map(len, text), dtype=np.int64, count=len(text))
+    return text, lens == 0, lens
+
+
+def _codepoints(values: np.ndarray, width: int) -> np.ndarray:
+    """
+    (width, n) uint32 code points of `values`, zero padded: row j holds
+    character j of every value, so decoders walk short contiguous rows.
+    """
+    width = max(width, 1)
+    return np.ascontiguousarray(values.astype(f"U{width}").view(np.uint32).reshape(len(values), width).T)
+
+
+def _chunks(rows: np.ndarray):
+    for start in range(0, len(rows), CHUNK_ROWS):
+        yield rows[start:start + CHUNK_ROWS]
+
+
+def _sample(text: np.ndarray) -> np.ndarray:
+    """Up to SAMPLE_SIZE values spread evenly over the column."""
+    if len(text) <= SAMPLE_SIZE:
+        return text
+    return text[np.linspace(0, len(text) - 1, SAMPLE_SIZE).astype(np.int64)]
+
+
+def _signature(kind: str, sample: np.ndarray) -> tuple:
+    shapes = {re.sub(r"[A-Za-z]", "a", re.sub(r"\d", "9", v)) for v in sample.tolist()}
+    return (kind, tuple(sorted(shapes)))
+
+
+def _cached(key: tuple, infer):
+    if key in _format_cache:
+        _format_cache.move_to_end(key)
+        return _format_cache[key]
+    value = _format_cache[key] = infer()
+    while len(_format_cache) > CACHE_SIZE:
+        _format_cache.popitem(last=False)
+    return value
+
+
+def _issues(fmt, text: np.ndarray, missing: np.ndarray, failed: np.ndarray) -> dict:
+    rows = np.flatnonzero(failed)
+    return {
+        "format":      fmt,
+        "missing":     int(missing.sum()),
+        "unparseable": int(len(rows)),
+        "examples":    [
+            {"row": int(i), "value": str(text[i])} for i in rows[:MAX_EXAMPLES].tolist()
+        ],
+    }
+
+
+# ─────────────────────────────────────────────────────────────────────
+# Timestamps
+# ─────────────────────────────────────────────────────────────────────
+def infer_timestamp_format(sample: np.ndarray) -> Optional[str]:
+    """The candidate format that parses most of `sample`, or None."""
+    best, hits = None, 0
+    for fmt in TIMESTAMP_FORMATS:
+        parsed = pd.to_datetime(sample, format=fmt, errors="coerce", utc=True)
+        n = int(parsed.notna().sum())
+        if n > hits:
+            best, hits = fmt, n
+            if n == len(sample):
+                break
+    return best
+
+
+def _fixed_layout(fmt: Optional[str]):
+    """(width, {field: offset}, [(offset, code point)]) of a fixed-width format."""
+    if not fmt or fmt == "ISO8601":
+        return None
+    fields, literals, pos, i = {}, [], 0, 0
+    while i < len(fmt):
+        if fmt[i] == "%":
+            code = fmt[i + 1:i + 2]
+            if code not in _FIELDS or code in fields:
+                return None
+            fields[code] = pos
+            pos += _FIELDS[code]
+            i += 2
+        else:
+            literals.append((pos, ord(fmt[i])))
+            pos += 1
+            i += 1
+    if "d" not in fields or "m" not in fields or not ("Y" in fields or "y" in fields):
+        return None
+    return pos, fields, literals
+
+
+def _days_from_civil(y: np.ndarray, m: np.ndarray, d: np.ndarray) -> np.ndarray:
+    """Days since 1970-01-01 of proleptic Gregorian dates (vectorized)."""
+    y   = y - (m <= 2)
+    era = np.floor_divide(y, 400)
+    yoe = y - era * 400
+    doy = (153 * (m + np.where(m > 2, -3, 9)) + 2) // 5 + d - 1
+    doe = yoe * 365 + yoe // 4 - yoe // 100 + doy
+    return era * 146097 + doe - 719468
+
+
+def _decode_timestamps(codes: np.ndarray, layout) -> tuple[np.ndarray, np.ndarray]:
+    """(ns since epoch, ok mask) of fixed-width rows laid out as `layout`."""
+    _, fields, literals = layout
+    ok = np.ones(codes.shape[1], dtype=bool)
+
+    for pos, code in literals:
+        ok &= codes[pos] == code
+
+    def field(name):
+        if name not in fields:
+            return np.zeros(codes.shape[1], dtype=np.int64)
+        value = np.zeros(codes.shape[1], dtype=np.int64)
+        for c in codes[fields[name]:fields[name] + _FIELDS[name]]:
+            digit = c - 48                  # wraps around below "0"
+            ok[:] &= digit < 10
+            value = value * 10 + digit
+        return value
+
+    if "Y" in fields:
+        year = field("Y")
+    else:
+        # strptime's pivot: 00-68 → 20xx, 69-99 → 19xx
+        yy   = field("y")
+        year = yy + np.where(yy < 69, 2000, 1900)
+    month, day = field("m"), field("d")
+    hour, minute, second = field("H"), field("M"), field("S")
+
+    ok &= (month >= 1) & (month <= 12) & (day >= 1)
+    leap  = (year % 4 == 0) & ((year % 100 != 0) | (year % 400 == 0))
+    mdays = _DAYS[np.where(ok, month, 0)] + ((month == 2) & leap)
+    ok   &= (day <= mdays) & (hour < 24) & (minute < 60) & (second < 60)
+
+    days = _days_from_civil(year, month, day)
+    secs = ((days * 24 + hour) * 60 + minute) * 60 + second
+    return secs * 1_000_000_000, ok
+
+
+def _to_ns(values: np.ndarray, **kwargs) -> np.ndarray:
+    parsed = pd.to_datetime(values, errors="coerce", utc=True, **kwargs)
+    return pd.DatetimeIndex(parsed).tz_localize(None).as_unit("ns").asi8.copy()
+
+
+def _pandas_timestamps(values: np.ndarray, fmt: Optional[str]) -> np.ndarray:
+    """
+    Rows the fixed-width decoder did not take: the inferred format, then
+    ISO 8601 (which day-first inference would misread), then per-value
+    day-first inference.
+    """
+    ns = _to_ns(values, **({"format": fmt} if fmt else {"dayfirst": True}))
+    for retry in ({"format": "ISO8601"}, {"format": "mixed", "dayfirst": True}):
+        rows = np.flatnonzero(ns == NAT_NS)
+        if len(rows):
+            ns[rows] = _to_ns(values[rows], **retry)
+    return ns
+
+
+def parse_timestamps(column: pd.Series) -> tuple[np.ndarray, dict]:
+    """
+    int64 ns since the epoch (naive, offsets converted to UTC; NAT_NS
+    where missing or unparseable) and the column's parse issues.
+    """
+    n = len(column)
+    if is_datetime64_any_dtype(column.dtype) or (
+        is_numeric_dtype(column.dtype) and not is_bool_dtype(column.dtype)
+    ):
+        ns      = _to_ns(column.to_numpy())
+        missing = column.isna().to_numpy()
+        return ns, _issues(str(column.dtype), np.asarray(column), missing, (ns == NAT_NS) & ~missing)
+
+    text, missing, lens = _text(column)
+    present = text[~missing]
+    sample  = _sample(present)
+    fmt     = (
+        _cached(_signature("timestamp", sample), lambda: infer_timestamp_format(sample))
+        if len(sample) else None
+    )
+
+    ns      = np.full(n, NAT_NS, dtype=np.int64)
+    pending = ~missing
+    layout  = _fixed_layout(fmt)
+    if layout is not None:
+        width = layout[0]
+        for rows in _chunks(np.flatnonzero(pending & (lens == width))):
+            values, ok = _decode_timestamps(_codepoints(text[rows], width), layout)
+            ns[rows[ok]]      = values[ok]
+            pending[rows[ok]] = False
+
+    rows = np.flatnonzero(pending)
+    if len(rows):
+        ns[rows] = _pandas_timestamps(text[rows], fmt)
+
+    return ns, _issues(fmt, text, missing, (ns == NAT_NS) & ~missing)
+
+
+# ─────────────────────────────────────────────────────────────────────
+# Amounts
+# ─────────────────────────────────────────────────────────────────────
+def infer_amount_format(sample: np.ndarray) -> tuple[str, str]:
+    """
+    (decimal, thousands) separators. Comma-decimal ("1.234,56") only when
+    the sample shows a comma after the last dot and never the reverse;
+    everything else reads as "1,234.56".
+    """
+    comma_decimal = dot_decimal = False
+    for v in sample.tolist():
+        dot, comma = v.rfind("."), v.rfind(",")
+        if dot >= 0 and comma >= 0:
+            if comma > dot:
+                comma_decimal = True
+            else:
+                dot_decimal = True
+    return (",", ".") if comma_decimal and not dot_decimal else (".", ",")
+
+
+def _amount_classes(fmt: tuple[str, str]) -> np.ndarray:
+    """Lookup table: code point → character class of an amount."""
+    decimal, thousands = fmt
+    skip  = "\0" + thousands + CURRENCY_SYMBOLS
+    table = np.full(max(map(ord, skip + decimal)) + 2, _OTHER, dtype=np.uint8)
+    table[ord("0"):ord("9") + 1] = _DIGIT
+    table[[ord(ch) for ch in skip]] = _SKIP
+    table[ord(decimal)] = _POINT
+    table[ord("-")]     = _MINUS
+    table[ord("+")]     = _PLUS
+    return table
+
+
+def _decode_amounts(codes: np.ndarray, fmt: tuple[str, str]) -> tuple[np.ndarray, np.ndarray]:
+    """(values, ok mask) of rows made only of digits, sign, separators and currency."""
+    table = _amount_classes(fmt)
+    last  = len(table) - 1
+    n     = codes.shape[1]
+
+    # Horner over the characters: the mantissa is an exact integer,
+    # scaled once at the end by a single correctly rounded division,
+    # so the result equals float() of the cleaned text
+    mantissa = np.zeros(n, dtype=np.int64)
+    ndigits  = np.zeros(n, dtype=np.int64)
+    fraction = np.zeros(n, dtype=np.int64)
+    points   = np.zeros(n, dtype=np.int64)
+    signs    = np.zeros(n, dtype=np.int64)
+    negative = np.zeros(n, dtype=bool)
+    ok       = np.ones(n, dtype=bool)
+    for c in codes:
+        kind     = table[np.minimum(c, last)]
+        is_digit = kind == _DIGIT
+        is_sign  = kind >= _MINUS
+        mantissa = np.where(is_digit, mantissa * 10 + (c - 48), mantissa)
+        ndigits  += is_digit
+        fraction += is_digit & (points > 0)
+        points   += kind == _POINT
+        negative |= kind == _MINUS
+        signs    += is_sign
+        # A sign only before the first digit
+        ok &= (kind != _OTHER) & ~(is_sign & (ndigits > 0))
+
+    ok &= (ndigits >= 1) & (ndigits <= _MAX_DIGITS) & (points <= 1) & (signs <= 1)
+    result = mantissa / _POW10_FLOAT[np.minimum(fraction, _MAX_DIGITS)]
+    return np.where(negative, -result, result), ok
+
+
+def _pandas_amounts(values: np.ndarray, fmt: tuple[str, str]) -> np.ndarray:
+    """Rows the decoder did not take: strip symbols and cr/dr marks, then to_numeric."""
+    decimal, thousands = fmt
+    cleaned = pd.Series(values, dtype=object).str.replace(_SUFFIXES, "", regex=True)
+    for ch in thousands + CURRENCY_SYMBOLS:
+        cleaned = cleaned.str.replace(ch, "", regex=False)
+    if decimal != ".":
+        cleaned = cleaned.str.replace(decimal, ".", regex=False)
+    return pd.to_numeric(cleaned.str.strip(), errors="coerce").to_numpy(dtype=np.float64)
+
+
+def parse_amounts(column: pd.Series) -> tuple[np.ndarray, dict]:
+    """float64 amounts (NaN where missing or unparseable) and the column's parse issues."""
+    n = len(column)
+    if is_numeric_dtype(column.dtype) and not is_bool_dtype(column.dtype):
+        values  = column.to_numpy(dtype=np.float64, na_value=np.nan)
+        missing = np.isnan(values)
+        return values, _issues(str(column.dtype), values, missing, np.zeros(n, dtype=bool))
+
+    text, missing, lens = _text(column)
+    sample = _sample(text[~missing])
+    fmt    = _cached(_signature("amount", sample), lambda: infer_amount_format(sample))
+
+    values  = np.full(n, np.nan)
+    pending = ~missing
+    short   = np.flatnonzero(pending & (lens <= MAX_AMOUNT_WIDTH))
+    if len(short):
+        width = int(lens[short].max())
+        for rows in _chunks(short):
+            parsed, ok = _decode_amounts(_codepoints(text[rows], width), fmt)
+            values[rows[ok]]  = parsed[ok]
+            pending[rows[ok]] = False
+
+    rows = np.flatnonzero(pending)
+    if len(rows):
+        values[rows] = _pandas_amounts(text[rows], fmt)
+        # Nothing left once the symbols are gone: missing, not malformed
+        blank = pd.Series(text[rows], dtype=object).str.strip(CURRENCY_SYMBOLS + fmt[1]) == ""
+        missing[rows[blank.to_numpy()]] = True
+
+    label = "1,234.56" if fmt == (".", ",") else "1.234,56"
+    return values, _issues(label, text, missing, np.isnan(values) & ~missing)
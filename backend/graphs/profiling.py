@@ -0,0 +1,109 @@
+"""
+Per-stage instrumentation: wall time, CPU time, peak memory and item
+counts for every stage a file goes through, from upload to JSON write.
+
+A StageProfile is a plain picklable object, so one started in the API
+process (spooling, parsing) can travel with the graph to a worker
+process (detection, report) and back inside the result.
+
+Peak memory is the RSS high-water mark of the process, reset at the
+start of every stage where Linux allows it (/proc/self/clear_refs).
+With DETECT_TRACE_MALLOC=1 the peak of Python + NumPy allocations
+(tracemalloc) is recorded as well; it is exact but slows things down.
+"""
+
+import os
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Iterator
+
+try:
+    import resource
+except ImportError:                    # Windows
+    resource = None
+
+
+TRACE_MALLOC = os.getenv("DETECT_TRACE_MALLOC", "0") == "1"
+
+
+def reset_peak_rss() -> bool:
+    """Reset the process' RSS high-water mark; False where that is not possible."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss_mb() -> float | None:
+    """RSS high-water mark of this process in MiB (since the last reset)."""
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS, KiB elsewhere
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def _cpu_seconds() -> float:
+    # Own CPU time plus that of finished child processes (the cycle
+    # search may fan out to a process pool)
+    cpu = time.process_time()
+    if resource is not None:
+        ru   = resource.getrusage(resource.RUSAGE_CHILDREN)
+        cpu += ru.ru_utime + ru.ru_stime
+    return cpu
+
+
+class StageProfile:
+    """
+    Ordered stage name -> {wall_seconds, cpu_seconds, peak_rss_mb,
+    [peak_alloc_mb], counts}. Stages are recorded with
+
+        with profile.stage("graph_build") as counts:
+            graph = Graph(df)
+            counts["accounts"] = graph.n_accounts
+    """
+
+    def __init__(self) -> None:
+        self.stages: dict[str, dict] = {}
+
+    @contextmanager
+    def stage(self, name: str, **counts) -> Iterator[dict]:
+        if TRACE_MALLOC:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+        reset_peak_rss()
+        wall = time.perf_counter()
+        cpu  = _cpu_seconds()
+        try:
+            yield counts
+        finally:
+            entry = {
+                "wall_seconds": round(time.perf_counter() - wall, 4),
+                "cpu_seconds":  round(_cpu_seconds() - cpu, 4),
+                "peak_rss_mb":  peak_rss_mb(),
+            }
+            if TRACE_MALLOC:
+                entry["peak_alloc_mb"] = round(tracemalloc.get_traced_memory()[1] / 2**20, 1)
+            entry["counts"] = counts
+            self.stages[name] = entry
+
+    def to_dict(self) -> dict:
+        rss = [s["peak_rss_mb"] for s in self.stages.values() if s["peak_rss_mb"] is not None]
+        return {
+            "stages":       self.stages,
+            "wall_seconds": round(sum(s["wall_seconds"] for s in self.stages.values()), 4),
+            "cpu_seconds":  round(sum(s["cpu_seconds"] for s in self.stages.values()), 4),
+            "peak_rss_mb":  max(rss, default=None),
+        }
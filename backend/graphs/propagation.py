@@ -0,0 +1,127 @@
+"""
+Multi-hop risk propagation over the account adjacency.
+
+Risk diffuses from the structurally suspicious accounts along the
+transition matrix P (row i: where account i's risk goes, weights
+normalized to 1), damped by `damping` per extra hop:
+
+    network = Pᵀs + damping·(Pᵀ)²s + damping²·(Pᵀ)³s + …
+
+i.e. personalized PageRank with the restart term removed, so an account
+is not its own neighbour. The series is summed by the fixed-point
+iteration x ← Pᵀ(s + damping·x), which contracts by `damping` per step,
+in float32 with its vectors allocated once: the mat-vec writes into a
+preallocated buffer (scipy's sparse product has no `out=`), and the
+current / next iterates swap.
+"""
+
+from typing import Literal, Optional
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+try:
+    from scipy.sparse._sparsetools import csr_matvec
+except ImportError:                    # private module: moved or gone in some scipy
+    csr_matvec = None
+
+
+Direction = Literal["both", "out", "in"]
+Weight    = Literal["none", "count", "amount"]
+
+
+def edge_weights(graph, weight: Weight) -> np.ndarray:
+    """Weight of every distinct edge, in `graph.csr.indices` order."""
+    nnz = len(graph.csr.indices)
+    if weight == "none":
+        return np.ones(nnz, dtype=np.float32)
+    if weight == "count":
+        return np.asarray(graph.csr.data, dtype=np.float32)
+    if weight == "amount":
+        amount = np.nan_to_num(np.asarray(graph.amount, dtype=np.float64), nan=0.0)
+        return np.bincount(
+            graph.edge_ids, weights=np.maximum(amount, 0.0), minlength=nnz
+        ).astype(np.float32)
+    raise ValueError(f"Unknown propagation weight: {weight!r}")
+
+
+def transition_transpose(
+    graph,
+    direction: Direction = "both",
+    weight:    Weight = "none",
+    adjacency: Optional[csr_matrix] = None,
+) -> csr_matrix:
+    """
+    Pᵀ as float32 CSR (row j: what account j receives from each account).
+    "out" moves risk along the money (payer → payee), "in" against it,
+    "both" either way. `adjacency`, if given, is used as the edge matrix
+    of `direction` instead of building it (symmetric for "both").
+    """
+    n = graph.n_accounts
+    if adjacency is None:
+        directed = csr_matrix(
+            (edge_weights(graph, weight), graph.csr.indices, graph.csr.indptr), shape=(n, n)
+        )
+        if direction == "out":
+            adjacency = directed
+        elif direction == "in":
+            adjacency = directed.T.tocsr()
+        elif direction == "both":
+            adjacency = (directed + directed.T).tocsr()
+        else:
+            raise ValueError(f"Unknown propagation direction: {direction!r}")
+
+    out_weight = np.asarray(adjacency.sum(axis=1)).ravel()
+    scale      = np.divide(1.0, out_weight, out=np.zeros(n), where=out_weight > 0).astype(np.float32)
+
+    # Pᵀ[j, i] = W[i, j] / out_weight[i]; a symmetric W is its own transpose
+    WT = adjacency if direction == "both" else adjacency.T.tocsr()
+    return csr_matrix(
+        (WT.data.astype(np.float32) * scale[WT.indices], WT.indices, WT.indptr), shape=(n, n)
+    )
+
+
+def _matvec(A: csr_matrix, x: np.ndarray, out: np.ndarray) -> np.ndarray:
+    """out = A @ x without allocating (out, x and A.data share a dtype)."""
+    if csr_matvec is None:
+        out[:] = A @ x
+        return out
+    out.fill(0)
+    csr_matvec(A.shape[0], A.shape[1], A.indptr, A.indices, A.data, x, out)
+    return out
+
+
+def diffuse(
+    PT:       csr_matrix,
+    seed:     np.ndarray,
+    damping:  float = 0.5,
+    tol:      float = 1e-6,
+    max_iter: int = 50,
+) -> tuple[np.ndarray, dict]:
+    """
+    Σ_k≥1 damping^(k-1)·(Pᵀ)^k·seed, iterated until the L1 change is at
+    most `tol` of the L1 norm (or `max_iter` iterations). Returns the
+    float32 vector and {"iterations", "residual"}.
+    """
+    s   = np.asarray(seed, dtype=np.float32)
+    PT  = PT if PT.dtype == np.float32 else PT.astype(np.float32)
+    x   = _matvec(PT, s, np.empty(PT.shape[0], dtype=np.float32))
+    nxt = np.empty_like(x)
+    y   = np.empty_like(x)
+    d   = np.empty_like(x)
+
+    iterations, residual = 1, 0.0
+    while iterations < max_iter:
+        # y = s + damping * x, then x' = Pᵀ y
+        np.multiply(x, damping, out=y)
+        y += s
+        _matvec(PT, y, nxt)
+        np.subtract(nxt, x, out=d)
+        change   = float(np.abs(d, out=d).sum())
+        norm     = float(np.abs(nxt, out=d).sum())
+        residual = change / norm if norm > 0 else 0.0
+        x, nxt, iterations = nxt, x, iterations + 1
+        if residual <= tol:
+            break
+
+    return x, {"iterations": iterations, "residual": residual}
@@ -0,0 +1,170 @@
+"""
+Fixed-size streaming sketches over hashed account labels.
+
+Every sketch works on uint64 hashes (`hash_labels`) and is updated a
+whole batch at a time with array operations; memory is set by the
+constructor arguments alone, never by the number of transactions or
+accounts seen.
+
+* CountMinSketch — per-key counts; never underestimates, and with
+  probability 1 - delta overestimates by at most epsilon · total.
+* DistinctSketch — per-key distinct item counts: a count-min grid whose
+  cells are HyperLogLog registers (the cell of a key counts the union of
+  the items of all keys hashed there, so it also only overestimates, up
+  to the HyperLogLog error). Cells of two keys can be merged for the
+  size of the union of their items.
+"""
+
+import math
+
+import numpy as np
+import pandas as pd
+
+
+_HASH_KEY = "money-muling-skt"         # 16 characters, as pandas requires
+_MANTISSA = 52                         # hash bits used for the HyperLogLog rank (exact in float64)
+
+
+def hash_labels(values) -> np.ndarray:
+    """Stable uint64 hashes of account labels (any dtype, object included)."""
+    return pd.util.hash_array(np.asarray(values, dtype=object), hash_key=_HASH_KEY, categorize=False)
+
+
+def combine_keys(keys: np.ndarray, salts: np.ndarray) -> np.ndarray:
+    """Hashes of (key, salt) pairs, e.g. an account and a time bucket (splitmix64 finalizer)."""
+    x = np.asarray(keys, dtype=np.uint64) ^ (np.asarray(salts).astype(np.uint64) * np.uint64(0x9E3779B97F4A7C15))
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+def _multipliers(depth: int, seed: int) -> np.ndarray:
+    """Odd 64-bit multipliers, one multiply-shift hash per row."""
+    rng = np.random.default_rng(seed)
+    return rng.integers(1, 2**63, size=depth, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+
+
+def _bucket_bits(width: int) -> int:
+    bits = int(width).bit_length() - 1
+    if width < 2 or 1 << bits != width:
+        raise ValueError(f"Sketch width must be a power of two, got {width}")
+    return bits
+
+
+class CountMinSketch:
+
+    def __init__(self, width: int = 1 << 16, depth: int = 4, seed: int = 0) -> None:
+        self.width = width
+        self.depth = depth
+        self.total = 0
+        self.table = np.zeros((depth, width), dtype=np.int64)
+        self._shift = np.uint64(64 - _bucket_bits(width))
+        self._mult  = _multipliers(depth, seed)
+
+    @property
+    def epsilon(self) -> float:
+        return math.e / self.width
+
+    @property
+    def delta(self) -> float:
+        return math.exp(-self.depth)
+
+    @property
+    def error_bound(self) -> float:
+        """Overcount no estimate exceeds with probability 1 - delta."""
+        return self.epsilon * self.total
+
+    @property
+    def nbytes(self) -> int:
+        return self.table.nbytes
+
+    def _buckets(self, keys: np.ndarray) -> np.ndarray:
+        keys = np.asarray(keys, dtype=np.uint64)
+        return ((keys[None, :] * self._mult[:, None]) >> self._shift).astype(np.int64)
+
+    def add(self, keys: np.ndarray, counts: np.ndarray | None = None) -> None:
+        if not len(keys):
+            return
+        for row, buckets in enumerate(self._buckets(keys)):
+            self.table[row] += np.bincount(buckets, weights=counts, minlength=self.width).astype(np.int64)
+        self.total += int(len(keys) if counts is None else np.sum(counts))
+
+    def estimate(self, keys: np.ndarray) -> np.ndarray:
+        buckets = self._buckets(keys)
+        return self.table[np.arange(self.depth)[:, None], buckets].min(axis=0)
+
+
+class DistinctSketch:
+
+    def __init__(
+        self,
+        width:     int = 1 << 14,
+        depth:     int = 2,
+        registers: int = 64,
+        seed:      int = 0,
+    ) -> None:
+        self.width     = width
+        self.depth     = depth
+        self.registers = registers
+        self.table = np.zeros((depth, width, registers), dtype=np.uint8)
+        self._shift     = np.uint64(64 - _bucket_bits(width))
+        self._reg_shift = np.uint64(64 - _bucket_bits(registers))
+        self._mult      = _multipliers(depth, seed)
+
+        m = registers
+        self._alpha = {16: 0.673, 32: 0.697, 64: 0.709}.get(m, 0.7213 / (1 + 1.079 / m))
+
+    def relative_error(self, n: float) -> float:
+        """
+        Relative standard error of one estimate near n: that of linear
+        counting while the registers are sparse, 1.04 / sqrt(m) beyond.
+        """
+        m = self.registers
+        if 0 < n <= 2.5 * m:
+            t = n / m
+            return math.sqrt(m * (math.exp(t) - t - 1)) / n
+        return 1.04 / math.sqrt(m)
+
+    @property
+    def nbytes(self) -> int:
+        return self.table.nbytes
+
+    def _cells(self, keys: np.ndarray) -> np.ndarray:
+        keys = np.asarray(keys, dtype=np.uint64)
+        buckets = ((keys[None, :] * self._mult[:, None]) >> self._shift).astype(np.int64)
+        return buckets + (np.arange(self.depth, dtype=np.int64) * self.width)[:, None]
+
+    def add(self, keys: np.ndarray, items: np.ndarray) -> None:
+        """Record that each key[i] saw items[i] (both hashes)."""
+        if not len(keys):
+            return
+        items = np.asarray(items, dtype=np.uint64)
+        reg   = (items >> self._reg_shift).astype(np.int64)
+        rest  = (items & np.uint64((1 << _MANTISSA) - 1)).astype(np.float64)
+        # Rank = leading zeros of the 52-bit remainder + 1 (53 when it is 0)
+        rank  = (_MANTISSA + 1 - np.frexp(rest)[1]).astype(np.uint8)
+
+        flat = self.table.reshape(-1)
+        for cells in self._cells(keys):
+            np.maximum.at(flat, cells * self.registers + reg, rank)
+
+    def _registers(self, keys: np.ndarray) -> np.ndarray:
+        return self.table.reshape(self.depth * self.width, self.registers)[self._cells(keys)]
+
+    def _count(self, registers: np.ndarray) -> np.ndarray:
+        """HyperLogLog estimate of every register set, the smallest over the rows."""
+        m     = self.registers
+        raw   = self._alpha * m * m / np.sum(np.ldexp(1.0, -registers.astype(np.int64)), axis=-1)
+        zeros = np.sum(registers == 0, axis=-1)
+        # Linear counting while the registers are still sparse
+        small  = (raw <= 2.5 * m) & (zeros > 0)
+        linear = m * np.log(m / np.maximum(zeros, 1))
+        return np.where(small, linear, raw).min(axis=0)
+
+    def estimate(self, keys: np.ndarray) -> np.ndarray:
+        """Distinct items per key (float64)."""
+        return self._count(self._registers(keys))
+
+    def estimate_union(self, keys: np.ndarray, others: np.ndarray) -> np.ndarray:
+        """Distinct items of keys[i] and others[i] together (registers merged by max)."""
+        return self._count(np.maximum(self._registers(keys), self._registers(others)))
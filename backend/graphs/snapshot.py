@@ -0,0 +1,127 @@
+"""
+A snapshot is a directory of plain .npy files (one per column) plus a
+meta.json written last. .npy keeps the header tiny and the data
+contiguous, so np.load(mmap_mode="r") maps every column with zero copies
+and processes mapping the same snapshot share its pages through the OS
+page cache. Labels (account / transaction IDs) are stored as int64 when
+they are all integers, otherwise as fixed-width UTF-8 bytes.
+"""
+
+import os
+import json
+import shutil
+import tempfile
+from typing import Optional
+
+import numpy as np
+
+
+# Bump when the set or meaning of the stored arrays changes
+SNAPSHOT_FORMAT = 1
+
+META_FILE = "meta.json"
+
+
+def encode_labels(values) -> tuple[np.ndarray, str]:
+    """(array, kind) for a sequence of IDs; kind is "int" or "str"."""
+    values = np.asarray(values, dtype=object)
+    if len(values) and all(
+        isinstance(v, (int, np.integer)) and not isinstance(v, bool)
+        for v in values.tolist()
+    ):
+        return values.astype(np.int64), "int"
+    encoded = [str(v).encode("utf-8") for v in values.tolist()]
+    width   = max((len(b) for b in encoded), default=0) or 1
+    return np.array(encoded, dtype=f"S{width}"), "str"
+
+
+def decode_labels(array: np.ndarray, kind: str) -> np.ndarray:
+    """Object array of the original IDs (only the rows passed in are decoded)."""
+    if kind == "int":
+        return np.asarray(array).astype(object)
+    return np.char.decode(np.asarray(array), "utf-8").astype(object)
+
+
+class SnapshotWriter:
+    """
+    A snapshot written one array at a time: save() stores an array that
+    is at hand, array() creates an empty one to fill in place (a
+    writable map of its .npy), commit() writes meta.json and moves the
+    directory into place. Until then everything lives in a hidden
+    temporary directory next to `path`; abort() removes it.
+    """
+
+    def __init__(self, path: str) -> None:
+        parent = os.path.dirname(os.path.abspath(path))
+        os.makedirs(parent, exist_ok=True)
+        self.path    = path
+        self._tmp    = tempfile.mkdtemp(dir=parent, prefix=".snapshot-")
+        self._arrays: dict[str, list] = {}
+
+    def _file(self, name: str, dtype, shape: tuple) -> str:
+        self._arrays[name] = [str(np.dtype(dtype)), list(shape)]
+        return os.path.join(self._tmp, f"{name}.npy")
+
+    def save(self, name: str, arr: np.ndarray) -> None:
+        arr = np.ascontiguousarray(arr)
+        np.save(self._file(name, arr.dtype, arr.shape), arr)
+
+    def array(self, name: str, dtype, shape: tuple) -> np.memmap:
+        return np.lib.format.open_memmap(
+            self._file(name, dtype, shape), mode="w+", dtype=dtype, shape=shape
+        )
+
+    def commit(self, meta: dict) -> None:
+        meta = {"format": SNAPSHOT_FORMAT, "arrays": self._arrays, **meta}
+        with open(os.path.join(self._tmp, META_FILE), "w", encoding="utf-8") as f:
+            json.dump(meta, f, indent=2)
+
+        shutil.rmtree(self.path, ignore_errors=True)
+        try:
+            os.replace(self._tmp, self.path)
+        except OSError:
+            # Another writer got there first with the same content
+            self.abort()
+            if not is_snapshot(self.path):
+                raise
+
+    def abort(self) -> None:
+        shutil.rmtree(self._tmp, ignore_errors=True)
+
+
+def write_snapshot(path: str, arrays: dict[str, np.ndarray], meta: dict) -> None:
+    """
+    Write `arrays` as <name>.npy under `path` (replaced if it exists).
+    meta.json goes last, so a directory without it is an unfinished write.
+    """
+    writer = SnapshotWriter(path)
+    try:
+        for name, arr in arrays.items():
+            writer.save(name, arr)
+    except BaseException:
+        writer.abort()
+        raise
+    writer.commit(meta)
+
+
+def read_snapshot(path: str, mmap: bool = True) -> tuple[dict[str, np.ndarray], dict]:
+    """(arrays, meta) of a snapshot; arrays are read-only maps with mmap=True."""
+    meta_path = os.path.join(path, META_FILE)
+    if not os.path.exists(meta_path):
+        raise FileNotFoundError(f"No complete snapshot at {path}")
+    with open(meta_path, "r", encoding="utf-8") as f:
+        meta = json.load(f)
+    if meta.get("format") != SNAPSHOT_FORMAT:
+        raise ValueError(
+            f"Snapshot format {meta.get('format')} at {path}, expected {SNAPSHOT_FORMAT}"
+        )
+
+    arrays = {
+        name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r" if mmap else None)
+        for name in meta["arrays"]
+    }
+    return arrays, meta
+
+
+def is_snapshot(path: Optional[str]) -> bool:
+    return bool(path) and os.path.exists(os.path.join(path, META_FILE))
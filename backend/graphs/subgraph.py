@@ -0,0 +1,265 @@
+"""
+Bounded neighbourhood extraction for graph views.
+
+`extract_subgraph` walks k hops out from seed accounts over the CSR
+(successors) and CSC (predecessors) of a Graph, one array gather per hop,
+and returns a view that fits the node / edge caps however large the
+graph is:
+
+* Expansion is budgeted by adjacency entries (`max_scan`): a node only
+  joins once its degree fits the budget, so hubs cannot blow up the
+  work, and the highest-risk candidates of every hop join first.
+* Over `max_nodes`, the lowest-priority accounts (not a seed, lowest
+  risk, furthest out) are collapsed into aggregate nodes, one per
+  nearest kept ancestor on the walk, and the smallest groups into one
+  "rest" aggregate.
+* Parallel transactions are one weighted edge (count, amount, first /
+  last time): the CSR already holds one entry per distinct pair, and
+  `edge_stats` sums the rest per entry. Edges between collapsed
+  accounts are summed again per pair of view nodes; over `max_edges`
+  the lightest edges are dropped.
+"""
+
+from typing import Callable
+
+import numpy as np
+
+from .build_graph import Graph
+from .engine import _segment_positions
+from .parsing import NAT_NS
+
+
+REST = -1                              # anchor of accounts collapsed into the "rest" aggregate
+
+_TS_MAX = np.iinfo(np.int64).max
+
+
+def edge_stats(graph: Graph) -> dict[str, np.ndarray]:
+    """
+    Per CSR entry (distinct sender → receiver pair): total amount and
+    first / last timestamp of its transactions (NAT_NS when none has one).
+    """
+    n_edges = len(graph.csr.indices)
+    edges   = np.asarray(graph.edge_ids)
+    amount  = np.asarray(graph.amount, dtype=np.float64)
+    ts      = np.asarray(graph.ts_ns)
+    timed   = ts != NAT_NS
+
+    first = np.full(n_edges, _TS_MAX, dtype=np.int64)
+    last  = np.full(n_edges, NAT_NS, dtype=np.int64)
+    np.minimum.at(first, edges[timed], ts[timed])
+    np.maximum.at(last,  edges[timed], ts[timed])
+    first[first == _TS_MAX] = NAT_NS
+
+    return {
+        "amount": np.bincount(edges, weights=np.nan_to_num(amount), minlength=n_edges),
+        "first":  first,
+        "last":   last,
+    }
+
+
+def _expand(
+    graph:     Graph,
+    seeds:     np.ndarray,
+    hops:      int,
+    risk:      Callable[[np.ndarray], np.ndarray],
+    max_reach: int,
+    max_scan:  int,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, bool]:
+    """
+    (codes, hop, parent, truncated) of the accounts reached: parent is the
+    local index of the account each one was first reached from (itself
+    for seeds). Every account is charged its degree against max_scan.
+    """
+    out_ptr, out_idx = graph.csr.indptr, graph.csr.indices
+    in_ptr,  in_idx  = graph.csc.indptr, graph.csc.indices
+    degree = lambda c: (out_ptr[c + 1] - out_ptr[c]) + (in_ptr[c + 1] - in_ptr[c])
+
+    def admit(candidates: np.ndarray, room: int, budget: int) -> np.ndarray:
+        """Candidates in priority order (risk, then degree), as many as fit."""
+        order = np.lexsort((-degree(candidates), -risk(candidates)))
+        cost  = np.cumsum(degree(candidates[order]))
+        fit   = min(room, int(np.searchsorted(cost, budget, side="right")))
+        return np.sort(order[:fit])
+
+    truncated = False
+    seeds = np.unique(seeds)
+    take  = admit(seeds, max_reach, max_scan)
+    truncated |= len(take) < len(seeds)
+    codes  = [seeds[take]]
+    hop    = [np.zeros(len(take), dtype=np.int32)]
+    parent = [np.arange(len(take), dtype=np.int64)]
+    budget = max_scan - int(degree(codes[0]).sum())
+    seen   = np.sort(codes[0])
+    start  = 0
+
+    for h in range(1, hops + 1):
+        frontier = codes[-1]
+        if not len(frontier) or budget <= 0:
+            break
+        local = np.arange(start, start + len(frontier), dtype=np.int64)
+        start += len(frontier)
+
+        nbrs, via = [], []
+        for ptr, idx in ((out_ptr, out_idx), (in_ptr, in_idx)):
+            counts = ptr[frontier + 1] - ptr[frontier]
+            nbrs.append(idx[_segment_positions(ptr[frontier], counts)])
+            via.append(np.repeat(local, counts))
+        nbrs = np.concatenate(nbrs).astype(np.int64)
+        via  = np.concatenate(via)
+
+        # First discoverer of every account not reached before
+        fresh = ~np.isin(nbrs, seen, assume_unique=False)
+        new, first = np.unique(nbrs[fresh], return_index=True)
+        via = via[fresh][first]
+
+        room = max_reach - len(seen)
+        take = admit(new, room, budget)
+        truncated |= len(take) < len(new)
+        if not len(take):
+            break
+
+        codes.append(new[take])
+        hop.append(np.full(len(take), h, dtype=np.int32))
+        parent.append(via[take])
+        budget -= int(degree(new[take]).sum())
+        seen = np.union1d(seen, new[take])
+
+    return np.concatenate(codes), np.concatenate(hop), np.concatenate(parent), truncated
+
+
+def _anchors(keep: np.ndarray, hop: np.ndarray, parent: np.ndarray) -> np.ndarray:
+    """Local index of the nearest kept ancestor of every account (REST for none)."""
+    anchor = np.where(keep, np.arange(len(keep)), REST)
+    for h in range(1, int(hop.max(initial=0)) + 1):
+        level = np.flatnonzero((hop == h) & ~keep)
+        anchor[level] = anchor[parent[level]]
+    return anchor
+
+
+def extract_subgraph(
+    graph:     Graph,
+    seeds:     np.ndarray,
+    hops:      int,
+    max_nodes: int,
+    max_edges: int,
+    risk:      Callable[[np.ndarray], np.ndarray],
+    stats:     dict[str, np.ndarray],
+    max_scan:  int = 2_000_000,
+) -> dict:
+    """
+    View of the `hops`-neighbourhood of `seeds` (account codes) within
+    the caps. `risk` maps account codes to a score (0 when unflagged);
+    `stats` is edge_stats(graph). Returns arrays: node `codes` / `hop` /
+    `seed` / `risk` of the kept accounts, `groups` (anchor code, accounts,
+    max risk, min hop, internal transactions) of the aggregates, and per
+    edge `source` / `target` (view node indices: kept accounts first,
+    then aggregates) with `transactions`, `amount`, `first`, `last`.
+    """
+    codes, hop, parent, truncated = _expand(
+        graph, seeds, hops, risk, max_reach=max(max_nodes * 20, 1_000), max_scan=max_scan
+    )
+    n      = len(codes)
+    score  = risk(codes)
+    seeded = hop == 0
+
+    # Level of detail: seeds, then risk, then closeness, then degree
+    keep = np.ones(n, dtype=bool)
+    slots = 0
+    if n > max_nodes:
+        slots  = max(max_nodes // 4, 1)
+        kept_n = max(max_nodes - slots - 1, 1)
+        degree = np.diff(graph.csr.indptr)[codes] + np.diff(graph.csc.indptr)[codes]
+        order  = np.lexsort((-degree, hop, -score, ~seeded))
+        keep[:] = False
+        keep[order[:kept_n]] = True
+
+    kept = np.flatnonzero(keep)
+    view = np.full(n, -1, dtype=np.int64)
+    view[kept] = np.arange(len(kept))
+
+    groups = {"anchor": np.zeros(0, dtype=np.int64)}
+    if slots:
+        anchor    = _anchors(keep, hop, parent)
+        collapsed = np.flatnonzero(~keep)
+        owners, members = np.unique(anchor[collapsed], return_counts=True)
+
+        # The `slots` biggest groups stand alone, the others share "rest"
+        named = owners[owners != REST]
+        if len(named) > slots:
+            sizes = members[owners != REST]
+            named = np.sort(named[np.argsort(-sizes, kind="stable")[:slots]])
+        owner = np.where(np.isin(anchor[collapsed], named), anchor[collapsed], REST)
+        group_keys, group_of = np.unique(owner, return_inverse=True)
+        view[collapsed] = len(kept) + group_of
+
+        g = len(group_keys)
+        max_risk = np.full(g, -np.inf)
+        min_hop  = np.full(g, np.iinfo(np.int32).max, dtype=np.int64)
+        np.maximum.at(max_risk, group_of, score[collapsed])
+        np.minimum.at(min_hop,  group_of, hop[collapsed])
+        groups = {
+            "anchor":   np.where(group_keys == REST, REST, codes[np.maximum(group_keys, 0)]),
+            "accounts": np.bincount(group_of, minlength=g),
+            "max_risk": max_risk,
+            "min_hop":  min_hop,
+        }
+
+    # Induced edges: out-rows of the reached accounts, filtered to them
+    ptr, idx = graph.csr.indptr, graph.csr.indices
+    counts = ptr[codes + 1] - ptr[codes]
+    pos    = _segment_positions(ptr[codes], counts)
+    order  = np.argsort(codes)
+    at     = np.searchsorted(codes, idx[pos], sorter=order)
+    inside = (at < n) & (codes[order[np.minimum(at, n - 1)]] == idx[pos])
+    pos    = pos[inside]
+    src    = view[np.repeat(np.arange(n), counts)[inside]]
+    dst    = view[order[at[inside]]]
+
+    tx     = np.asarray(graph.csr.data, dtype=np.int64)[pos]
+    amount = stats["amount"][pos]
+    first  = np.where(stats["first"][pos] == NAT_NS, _TS_MAX, stats["first"][pos])
+    last   = stats["last"][pos]
+
+    # Collapsed accounts: sum per pair of view nodes; edges inside one
+    # aggregate are counted on it instead
+    internal = np.zeros(len(groups["anchor"]), dtype=np.int64)
+    loops    = (src == dst) & (src >= len(kept))
+    np.add.at(internal, src[loops] - len(kept), tx[loops])
+    src, dst, tx, amount, first, last = (a[~loops] for a in (src, dst, tx, amount, first, last))
+
+    v = len(kept) + len(groups["anchor"])
+    pairs, inv = np.unique(src * v + dst, return_inverse=True)
+    e = len(pairs)
+    edge = {
+        "source":       pairs // max(v, 1),
+        "target":       pairs %  max(v, 1),
+        "transactions": np.bincount(inv, weights=tx, minlength=e).astype(np.int64),
+        "amount":       np.bincount(inv, weights=amount, minlength=e),
+        "first":        np.full(e, _TS_MAX, dtype=np.int64),
+        "last":         np.full(e, NAT_NS, dtype=np.int64),
+    }
+    np.minimum.at(edge["first"], inv, first)
+    np.maximum.at(edge["last"],  inv, last)
+    edge["first"][edge["first"] == _TS_MAX] = NAT_NS
+
+    # Over the edge cap: edges of seeds first, then the heaviest
+    edges_found = e
+    if e > max_edges:
+        is_seed = np.zeros(v, dtype=bool)
+        is_seed[view[seeded & keep]] = True
+        touches = is_seed[edge["source"]] | is_seed[edge["target"]]
+        top = np.sort(np.lexsort((-edge["amount"], -edge["transactions"], ~touches))[:max_edges])
+        edge = {k: a[top] for k, a in edge.items()}
+
+    return {
+        "codes":       codes[kept],
+        "hop":         hop[kept],
+        "seed":        seeded[kept],
+        "risk":        score[kept],
+        "groups":      {**groups, "internal": internal} if slots else groups,
+        "edges":       edge,
+        "reached":     n,
+        "edges_found": edges_found,
+        "truncated":   bool(truncated),
+    }
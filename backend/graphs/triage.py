@@ -0,0 +1,222 @@
+"""
+Approximate one-pass triage for fan-in / fan-out (smurfing).
+
+StreamingTriage reads normalized transaction chunks once and keeps only
+fixed-size sketches, per (account, time bucket): count-min sketches of
+transactions sent / received and count-min grids of HyperLogLogs of
+distinct receivers / senders. For each pattern a bounded heavy-hitter
+table holds the accounts whose estimates reached the shortlist cutoff.
+Memory is the same for a thousand rows or a billion.
+
+Buckets are as long as the longest window, so any window lies within two
+adjacent buckets: its transactions are at most the sum of theirs, its
+counterparties at most the union of theirs (HyperLogLog registers merge
+by max). Count-min never undercounts; HyperLogLog noise is absorbed by
+the cutoff (threshold lowered by three standard errors). The shortlist
+is therefore a superset of the exact result unless a table overflowed
+(reported as `complete: false`).
+
+`exact_smurfing` is the second pass: it keeps only the rows of the
+shortlisted accounts on their side (incoming for fan_in, outgoing for
+fan_out) and runs MainEngine.detect_smurfing on that neighbourhood.
+An account's windows depend on nothing else, so its verdict is exact.
+"""
+
+from typing import Iterable
+
+import numpy as np
+import pandas as pd
+
+from .build_graph import Graph
+from .engine import MainEngine
+from .sketches import CountMinSketch, DistinctSketch, combine_keys, hash_labels
+
+
+PATTERNS = ("fan_in", "fan_out")
+
+_SMURFING = MainEngine.parameters()["detect_smurfing"]
+
+
+class StreamingTriage:
+
+    # Count-min sketches of transactions per (account, bucket), sent and
+    # received (4 × 2^18 int64 each)
+    ACTIVITY_WIDTH = 1 << 18
+    ACTIVITY_DEPTH = 4
+
+    # Distinct counterparties per (account, bucket): 2 × 2^18 cells of
+    # 32 one-byte HyperLogLog registers, per pattern
+    DISTINCT_WIDTH = 1 << 18
+    DISTINCT_DEPTH = 2
+    REGISTERS      = 32
+
+    # Heavy-hitter table size per pattern
+    CAPACITY       = 50_000
+
+    def __init__(
+        self,
+        threshold:     int | None = None,
+        windows_hours: tuple | None = None,
+        capacity:      int | None = None,
+        seed:          int = 0,
+    ) -> None:
+        self.threshold     = threshold if threshold is not None else _SMURFING["threshold"]
+        self.windows_hours = tuple(windows_hours or _SMURFING["windows_hours"])
+        self.capacity      = capacity or self.CAPACITY
+        self._bucket_ns    = int(max(self.windows_hours) * 3_600_000_000_000)
+
+        self.transactions = 0
+        self.activity = {
+            side: CountMinSketch(self.ACTIVITY_WIDTH, self.ACTIVITY_DEPTH, seed=seed)
+            for side in ("out", "in")
+        }
+        self.distinct = {
+            pattern: DistinctSketch(self.DISTINCT_WIDTH, self.DISTINCT_DEPTH, self.REGISTERS, seed=seed + 1)
+            for pattern in PATTERNS
+        }
+        # pattern -> {account: (highest two-bucket counterparty estimate,
+        #                       transactions in those buckets)}
+        self.candidates: dict[str, dict] = {pattern: {} for pattern in PATTERNS}
+        self.evicted:    dict[str, int]  = {pattern: 0 for pattern in PATTERNS}
+
+        margin = 3 * self.distinct["fan_in"].relative_error(self.threshold)
+        self.cutoff = max(self.threshold * (1 - margin), 1.0)
+
+    @property
+    def nbytes(self) -> int:
+        """Sketch memory (the candidate tables add at most 2 × capacity entries)."""
+        return sum(s.nbytes for s in (*self.activity.values(), *self.distinct.values()))
+
+    def update(self, frame: pd.DataFrame) -> None:
+        """Fold in one chunk that went through Graph._normalize_columns."""
+        if frame.empty:
+            return
+        senders   = frame["sender_id"].to_numpy(dtype=object)
+        receivers = frame["receiver_id"].to_numpy(dtype=object)
+        self.transactions += len(frame)
+
+        # Same rows detect_smurfing counts: timestamped, no self-transfers
+        valid     = frame["timestamp"].notna().to_numpy() & (senders != receivers)
+        senders   = senders[valid]
+        receivers = receivers[valid]
+        h_send    = hash_labels(senders)
+        h_recv    = hash_labels(receivers)
+        bucket    = frame["timestamp"].to_numpy()[valid].astype(np.int64) // self._bucket_ns
+
+        for pattern, side, labels, keys, items in (
+            ("fan_in",  "in",  receivers, h_recv, h_send),
+            ("fan_out", "out", senders,   h_send, h_recv),
+        ):
+            cells = combine_keys(keys, bucket)
+            self.activity[side].add(cells)
+            self.distinct[pattern].add(cells, items)
+
+            # For each (account, bucket) this chunk touched, bound every
+            # window overlapping b by bucket b plus its busier neighbour
+            cells, first = np.unique(cells, return_index=True)
+            keys, b  = keys[first], bucket[first]
+            before   = combine_keys(keys, b - 1)
+            after    = combine_keys(keys, b + 1)
+            activity = self.activity[side]
+            sent_or_received = activity.estimate(cells) + np.maximum(activity.estimate(before), activity.estimate(after))
+            distinct = self.distinct[pattern]
+            counterparties   = np.maximum(distinct.estimate_union(cells, before), distinct.estimate_union(cells, after))
+
+            # Transactions bound counterparties exactly, the HyperLogLog
+            # estimate within the noise margin
+            hit   = (sent_or_received >= self.threshold) & (counterparties >= self.cutoff)
+            table = self.candidates[pattern]
+            for account, value, count in zip(
+                labels[first[hit]].tolist(), counterparties[hit].tolist(), sent_or_received[hit].tolist()
+            ):
+                if value > table.get(account, (0.0, 0))[0]:
+                    table[account] = (value, count)
+            if len(table) > self.capacity:
+                self._prune(pattern)
+
+    def _prune(self, pattern: str) -> None:
+        """Keep the `capacity` accounts with the highest estimates."""
+        table = self.candidates[pattern]
+        kept  = sorted(table.items(), key=lambda item: item[1][0], reverse=True)[: self.capacity]
+        self.evicted[pattern] += len(table) - len(kept)
+        self.candidates[pattern] = dict(kept)
+
+    def shortlist(self) -> list[dict]:
+        """Candidates by descending estimate, each with its error bounds."""
+        rel = self.distinct["fan_in"].relative_error
+        out = []
+        for pattern in PATTERNS:
+            side  = "in" if pattern == "fan_in" else "out"
+            bound = 2 * self.activity[side].error_bound
+            for account, (value, count) in sorted(self.candidates[pattern].items(), key=lambda item: -item[1][0]):
+                out.append({
+                    "account":               account,
+                    "pattern":               pattern,
+                    "window_counterparties": round(value, 1),
+                    "counterparties_bounds": [round(value * max(1 - 3 * rel(value), 0.0), 1), round(value * (1 + 3 * rel(value)), 1)],
+                    "window_transactions":   int(count),
+                    "transactions_bounds":   [max(int(count - bound), 0), int(count)],
+                })
+        return out
+
+    def summary(self) -> dict:
+        activity = self.activity["out"]
+        distinct = self.distinct["fan_in"]
+        return {
+            "transactions":  self.transactions,
+            "threshold":     self.threshold,
+            "windows_hours": list(self.windows_hours),
+            "cutoff":        round(self.cutoff, 2),
+            "complete":      not any(self.evicted.values()),
+            "evicted":       dict(self.evicted),
+            "sketch_bytes":  self.nbytes,
+            "activity": {
+                "width":   activity.width,
+                "depth":   activity.depth,
+                "epsilon": activity.epsilon,
+                "delta":   activity.delta,
+                # One bucket's count overcounts by at most this (w.p. 1 - delta)
+                "max_overcount": {side: round(s.error_bound, 1) for side, s in self.activity.items()},
+            },
+            "distinct": {
+                "width":          distinct.width,
+                "depth":          distinct.depth,
+                "registers":      distinct.registers,
+                "bucket_hours":   max(self.windows_hours),
+                "relative_error": round(distinct.relative_error(self.threshold), 4),
+            },
+        }
+
+
+def exact_smurfing(
+    chunks:        Iterable[pd.DataFrame],
+    shortlist:     list[dict],
+    threshold:     int,
+    windows_hours: tuple,
+) -> tuple[list[dict], int]:
+    """
+    (detect_smurfing results for the shortlisted accounts, rows kept)
+    from a second pass over the same normalized chunks.
+    """
+    wanted = {
+        pattern: pd.Index([c["account"] for c in shortlist if c["pattern"] == pattern], dtype=object)
+        for pattern in PATTERNS
+    }
+    if not len(wanted["fan_in"]) and not len(wanted["fan_out"]):
+        return [], 0
+
+    frames = []
+    for frame in chunks:
+        keep = frame["receiver_id"].isin(wanted["fan_in"]) | frame["sender_id"].isin(wanted["fan_out"])
+        if keep.any():
+            frames.append(frame[keep.to_numpy()])
+    if not frames:
+        return [], 0
+
+    neighbourhood = pd.concat(frames, ignore_index=True)
+    engine = MainEngine(Graph.from_normalized(neighbourhood))
+    found  = engine.detect_smurfing(threshold=threshold, windows_hours=windows_hours)
+
+    # Only the shortlisted side of an account saw all of its rows
+    members = {pattern: set(index.tolist()) for pattern, index in wanted.items()}
+    return [hit for hit in found if hit["account"] in members[hit["pattern"]]], len(neighbourhood)
@@ -1,7 +1,10 @@
+import time
 import uvicorn
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from api.API import route
+from fastapi.middleware.gzip import GZipMiddleware
+from api.API import route, job_route, stream_route, cache_route, metrics_route, query_route, triage_route
+from api.metrics import metrics
 
 app = FastAPI(
     title="Money Laundering Detection API",
@@ -19,5 +22,30 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress JSON / NDJSON responses for clients that accept gzip (stored
+# reports that are already gzip'd and partial responses are left alone)
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=6)
+
 app.include_router(router=route)
+app.include_router(router=job_route)
+app.include_router(router=stream_route)
+app.include_router(router=cache_route)
+app.include_router(router=metrics_route)
+app.include_router(router=query_route)
+app.include_router(router=triage_route)
+
+
+@app.middleware("http")
+async def record_latency(request: Request, call_next):
+    start    = time.perf_counter()
+    response = await call_next(request)
+    # Route template, not the raw path, keeps label cardinality bounded
+    route    = request.scope.get("route")
+    metrics.observe_request(
+        request.method,
+        getattr(route, "path", "unmatched"),
+        response.status_code,
+        time.perf_counter() - start,
+    )
+    return response
 
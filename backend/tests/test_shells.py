@@ -0,0 +1,35 @@
+import pandas as pd
+
+from graphs.build_graph import Graph
+from graphs.engine import MainEngine
+
+
+def shells_of(rows: list[tuple]) -> list[dict]:
+    frame = pd.DataFrame(rows, columns=["sender_id", "receiver_id", "amount", "timestamp"])
+    frame.insert(0, "transaction_id", [f"T{i}" for i in range(len(rows))])
+    frame["timestamp"] = pd.to_datetime(frame["timestamp"])
+    return MainEngine(Graph(raw_dataframe=frame)).detect_layered_shells()
+
+
+CHAIN = [
+    ("A", "X", 99, "2024-01-01 01:00"),
+    ("X", "Y", 98, "2024-01-01 02:00"),
+    ("Y", "Z", 97, "2024-01-01 03:00"),
+    ("Z", "W", 96, "2024-01-01 04:00"),
+]
+
+
+def test_chain_is_found():
+    assert [s["accounts"] for s in shells_of(CHAIN)] == [["A", "X", "Y", "Z", "W"]]
+
+
+def test_chain_after_a_hop_that_would_revisit_is_found():
+    # X → A continues into A → X, which returns to X: no chain starts
+    # there, so A → X must still start one
+    shells = shells_of([("X", "A", 100, "2024-01-01 00:00")] + CHAIN)
+    assert [s["accounts"] for s in shells] == [["A", "X", "Y", "Z", "W"]]
+
+
+def test_chain_extended_by_an_earlier_hop_is_reported_once():
+    shells = shells_of([("V", "A", 100, "2024-01-01 00:00")] + CHAIN)
+    assert [s["accounts"] for s in shells] == [["V", "A", "X", "Y", "Z", "W"]]
@@ -13,10 +13,17 @@ const API = axios.create({
  * {
  *   "<filename.csv>": {
  *     report: {
- *       suspicious_accounts: [...],
+ *       suspicious_accounts: [...],   // {account_id, suspicion_score, risk_level, reasons[],
+ *                                     //  detected_patterns[], ring_id, network_risk,
+ *                                     //  in_amount, out_amount, pass_through, hold_hours}
  *       fraud_rings:         [...],   // {ring_id, pattern_type, member_accounts[], risk_score}
  *       summary: { total_accounts_analyzed, suspicious_accounts_flagged,
- *                  fraud_rings_detected, processing_time_seconds }
+ *                  fraud_rings_detected, processing_time_seconds },
+ *       parse_issues: { amount, timestamp: { format, missing, unparseable,
+ *                                             examples: [{ row, value }] } },
+ *       profile: { stages: { upload, read_csv, graph_build, …, json_write:
+ *                  { wall_seconds, cpu_seconds, peak_rss_mb, counts } },
+ *                  wall_seconds, cpu_seconds, peak_rss_mb }
  *     },
  *     summary: [   // ← summary_table rows as records
  *       {
@@ -26,9 +33,16 @@ const API = axios.create({
  *         "Ring Density", "Risk Category"
  *       }, ...
  *     ],
- *     saved_to: "output/filename_analysis.json"
- *   }
+ *     saved_to: "output/filename_<digest12>_analysis.ndjson.gz",
+ *     elapsed_seconds: 1.23,
+ *     cached: true          // only present when served from the result cache
+ *   },
+ *   "<failed.csv>": { error: "...", elapsed_seconds: 0.01 }   // other files unaffected
  * }
+ *
+ * With ?format=ndjson the same content is streamed as NDJSON instead: per
+ * file a {record: "file", file, summary, saved_to, …} line, then its
+ * report as {record: "header" | "account" | "ring", …} lines.
  */
 export const uploadFiles = (files) => {
   const fd = new FormData()
@@ -38,6 +52,47 @@ export const uploadFiles = (files) => {
   })
 }
 
+/**
+ * POST /input/files/events
+ * Same upload as uploadFiles, answered as server-sent events while the
+ * files are analyzed (fetch, not axios: no timeout, read as it arrives).
+ * onEvent(event, data) is called with:
+ *   start  { files[], stages[] }
+ *   stage  { file, stage, stages_done[], percent, partial? }
+ *          partial: graph_built { accounts, transactions }
+ *                   cycles | smurfing | shells { found }
+ *                   scores { threshold, top_accounts: [{account_id, suspicion_score, risk_level}] }
+ *                   rings  { found, top_rings: [{ring_id, pattern_type, member_count, risk_score}] }
+ *                   report { summary }
+ *   result { file, summary, saved_to, download_url, analysis_id, cached, elapsed_seconds }
+ *          (no report body: page it with downloadFile / fetchTopAccounts / fetchRings)
+ *   error  { file, error, elapsed_seconds }
+ *   done   { files, failed_files[], elapsed_seconds }
+ */
+export const streamFiles = async (files, onEvent) => {
+  const fd = new FormData()
+  for (const f of files) fd.append('files', f)
+  const res = await fetch(`${API.defaults.baseURL}/input/files/events`, { method: 'POST', body: fd })
+  if (!res.ok) throw new Error((await res.json()).detail)
+
+  const reader  = res.body.getReader()
+  const decoder = new TextDecoder()
+  let buffer = ''
+  for (;;) {
+    const { done, value } = await reader.read()
+    if (done) break
+    buffer += decoder.decode(value, { stream: true })
+    let end
+    while ((end = buffer.indexOf('\n\n')) >= 0) {
+      const block = buffer.slice(0, end)
+      buffer = buffer.slice(end + 2)
+      const event = block.match(/^event: (.*)$/m)
+      const data  = block.match(/^data: (.*)$/m)
+      if (event && data) onEvent(event[1], JSON.parse(data[1]))
+    }
+  }
+}
+
 /**
  * GET /show/output/files
  * Returns: { files: [{ name, download_url }] }
@@ -45,11 +100,140 @@ export const uploadFiles = (files) => {
 export const fetchFileList = () => API.get('/show/output/files')
 
 /**
- * GET /download/{file_name}
- * NOTE: backend appends ".json" itself, so pass without extension.
- * Returns: FileResponse (application/json blob)
+ * GET /download/{file_name}[?offset=&limit=]
+ * NOTE: backend resolves the extension itself, so pass without it.
+ * Returns: the report as NDJSON (header line, one line per suspicious
+ * account, one per fraud ring), sent gzip-encoded with byte-range support;
+ * offset / limit return a page of lines. Older reports are a JSON blob.
  */
 export const downloadFile = (fileName) =>
   API.get(`/download/${fileName}`, { responseType: 'blob' })
 
+/**
+ * POST /jobs/files
+ * Same multipart body as uploadFiles, but returns immediately.
+ * Returns: { job_id, status, files, progress, status_url, result_url, ... }
+ */
+export const submitJob = (files) => {
+  const fd = new FormData()
+  for (const f of files) fd.append('files', f)
+  return API.post('/jobs/files', fd, {
+    headers: { 'Content-Type': 'multipart/form-data' }
+  })
+}
+
+/**
+ * GET /jobs/{job_id}
+ * { job_id, status, files, failed_files, progress, error, created_at, finished_at, ... }
+ * status: queued | running | done | failed
+ * progress: { files_total, files_done, percent,
+ *             files: { [filename]: { stage, stages_done[], percent, cached? } } }
+ */
+export const fetchJobStatus = (jobId) => API.get(`/jobs/${jobId}`)
+
+/**
+ * GET /jobs/{job_id}/result
+ * Same shape as the /input/files response (409 while still running),
+ * also available as ?format=ndjson.
+ */
+export const fetchJobResult = (jobId) => API.get(`/jobs/${jobId}/result`)
+
+/**
+ * POST /streams/{stream_id}/transactions
+ * Appends a batch to a live stream (created on first use).
+ * Returns { stream_id, transactions, new_accounts, touched_accounts,
+ *           region_accounts, region_truncated, patterns_removed,
+ *           patterns_added, rescored_accounts, compacted, elapsed_seconds }
+ * (no patterns_* when the batch triggered a compaction). region_truncated:
+ * the search stopped at hubs; what lies past them is found at the next
+ * compaction.
+ */
+export const appendToStream = (streamId, files) => {
+  const fd = new FormData()
+  for (const f of files) fd.append('files', f)
+  return API.post(`/streams/${streamId}/transactions`, fd, {
+    headers: { 'Content-Type': 'multipart/form-data' }
+  })
+}
+
+/**
+ * GET /streams/{stream_id}/report
+ * { stream_id, batches, transactions, accounts, report } — `report` has
+ * the same shape as one file of the /input/files response.
+ */
+export const fetchStreamReport = (streamId) => API.get(`/streams/${streamId}/report`)
+
+/**
+ * POST /triage/files[?exact=false]
+ * One-pass sketch triage for fan-in / fan-out, per file:
+ * { summary: { transactions, threshold, windows_hours, cutoff, complete, evicted,
+ *              sketch_bytes, activity: { width, depth, epsilon, delta, max_overcount },
+ *              distinct: { width, depth, registers, bucket_hours, relative_error } },
+ *   shortlist: [{ account, pattern, window_counterparties, counterparties_bounds,
+ *                 window_transactions, transactions_bounds }],
+ *   patterns:  [...],   // exact detect_smurfing results for the shortlist (unless exact=false)
+ *   profile, elapsed_seconds }  — or { error, elapsed_seconds }
+ */
+export const triageFiles = (files, exact = true) => {
+  const fd = new FormData()
+  for (const f of files) fd.append('files', f)
+  return API.post('/triage/files', fd, {
+    params: { exact },
+    headers: { 'Content-Type': 'multipart/form-data' }
+  })
+}
+
+/**
+ * GET /query/analyses
+ * { analyses: [{ analysis_id, file_name, digest, report_path,
+ *                accounts_analyzed, suspicious_accounts, fraud_rings, indexed_at }] }
+ * Every saved report is indexed; upload / job results carry their analysis_id.
+ */
+export const fetchAnalyses = () => API.get('/query/analyses')
+
+/**
+ * GET /query/analyses/{analysis_id}/accounts?limit=&cursor=&risk_level=&min_score=
+ * Suspicious accounts by descending score (top-k = first page).
+ * { analysis_id, items: [{ account_id, suspicion_score, risk_level, ring_id,
+ *                          detected_patterns, reasons }], next_cursor }
+ * Pass next_cursor back for the following page (null on the last one).
+ */
+export const fetchTopAccounts = (analysisId, params = {}) =>
+  API.get(`/query/analyses/${analysisId}/accounts`, { params })
+
+/**
+ * GET /query/analyses/{analysis_id}/rings?limit=&cursor=
+ * { analysis_id, items: [{ ring_id, pattern_type, risk_score, member_count }], next_cursor }
+ */
+export const fetchRings = (analysisId, params = {}) =>
+  API.get(`/query/analyses/${analysisId}/rings`, { params })
+
+/**
+ * GET /query/analyses/{analysis_id}/rings/{ring_id}
+ * { ring_id, pattern_type, risk_score, member_count,
+ *   members: [{ account_id, suspicion_score, risk_level }] }   // score null if not flagged
+ */
+export const fetchRing = (analysisId, ringId) =>
+  API.get(`/query/analyses/${analysisId}/rings/${ringId}`)
+
+/**
+ * GET /query/accounts/{account_id}
+ * Across all analyses: { account_id, flagged: [account entries + analysis_id],
+ *                        rings: [{ analysis_id, ring_id }] }
+ */
+export const fetchAccount = (accountId) =>
+  API.get(`/query/accounts/${encodeURIComponent(accountId)}`)
+
+/**
+ * GET /query/analyses/{analysis_id}/subgraph?ring_id=|account_id=&hops=&max_nodes=&max_edges=
+ * k-hop neighbourhood of a ring or account, capped for rendering:
+ * { analysis_id, center, hops, limits, counts, truncated: { expansion, nodes, edges }, cached,
+ *   nodes: [{ id, kind: 'account', hop, seed, suspicion_score, risk_level, ring_id }
+ *         | { id, kind: 'aggregate', anchor, accounts, hop, max_score, risk_level,
+ *             internal_transactions }],
+ *   edges: [{ source, target, transactions, amount, first_seen, last_seen }] }
+ */
+export const fetchSubgraph = (analysisId, params = {}) =>
+  API.get(`/query/analyses/${analysisId}/subgraph`, { params })
+
 export default API